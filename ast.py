@@ -3,21 +3,31 @@ __author__ = 'Christian Mönch'
 
 
 class AST(object):
+    __slots__ = ('span',)
+
     def __init__(self, span):
         self.span = span
 
 
 # Objects of this class modify other types
 class BaseTypeModifier(AST):
+    # Canonical nodes of a TypeTable are frozen
+    __slots__ = ('modified_type', 'frozen')
+
     def __init__(self, span):
         super(BaseTypeModifier, self).__init__(span)
         self.modified_type = None
+        self.frozen = False
 
     def set_modified_type(self, modified_type):
+        if getattr(self, 'frozen', False):
+            raise Exception('canonical type nodes must not be modified')
         self.modified_type = modified_type
 
 
 class Pointer(BaseTypeModifier):
+    __slots__ = ('qualifier',)
+
     def __init__(self, modified_type, qualifier, span=None):
         super(Pointer, self).__init__(span)
         self.qualifier = qualifier
@@ -25,18 +35,25 @@ class Pointer(BaseTypeModifier):
 
 
 class Function(AST):
+    __slots__ = ('return_type', 'parameter', 'body', 'qualifier', 'frozen')
+
     def __init__(self, return_type, parameter, body, qualifier, span=None):
         super(Function, self).__init__(span)
         self.return_type = return_type
         self.parameter = parameter
         self.body = body
         self.qualifier = qualifier
+        self.frozen = False
 
     def set_return_type(self, return_type):
+        if getattr(self, 'frozen', False):
+            raise Exception('canonical type nodes must not be modified')
         self.return_type = return_type
 
 
 class ArrayDeclaration(BaseTypeModifier):
+    __slots__ = ('size', 'qualifier')
+
     def __init__(self, modified_type, size, qualifier, span=None):
         super(ArrayDeclaration, self).__init__(span)
         self.size = size
@@ -45,6 +62,8 @@ class ArrayDeclaration(BaseTypeModifier):
 
 
 class BasicType(AST):
+    __slots__ = ('type_name', 'qualifier')
+
     def __init__(self, type_name, qualifier, span=None):
         super(BasicType, self).__init__(span)
         self.type_name = type_name
@@ -52,12 +71,16 @@ class BasicType(AST):
 
 
 class Identifier(AST):
+    __slots__ = ('name',)
+
     def __init__(self, name, span=None):
         super(Identifier, self).__init__(span)
         self.name = name
 
 
 class TypeModifier(AST):
+    __slots__ = ('modifier', 'identifier')
+
     def __init__(self, modifier, identifier, span=None):
         super(TypeModifier, self).__init__(span)
         self.modifier = modifier
@@ -65,6 +88,8 @@ class TypeModifier(AST):
 
 
 class Declaration(AST):
+    __slots__ = ('basic_type', 'modifier', 'identifier')
+
     def __init__(self, basic_type, modifier, span=None):
         super(Declaration, self).__init__(span)
         self.basic_type = basic_type
@@ -73,7 +98,253 @@ class Declaration(AST):
 
 
 class DeclarationList(AST):
-    def __init__(self, basic_type, modifier_list, span=None):
+    __slots__ = ('basic_type', 'modifier_list', 'initializer_list')
+
+    def __init__(self, basic_type, modifier_list, initializer_list=None, span=None):
         super(DeclarationList, self).__init__(span)
         self.basic_type = basic_type
         self.modifier_list = modifier_list
+        # One initializer or None per entry of modifier_list
+        self.initializer_list = initializer_list if initializer_list is not None else [None] * len(modifier_list)
+
+
+# Expressions, identifiers in expressions are Identifier objects
+class Constant(AST):
+    __slots__ = ('constant_type', 'value')
+
+    def __init__(self, constant_type, value, span=None):
+        super(Constant, self).__init__(span)
+        # 'integer', 'character' or 'string', the value of characters and
+        # strings is the text with escape sequences decoded
+        self.constant_type = constant_type
+        self.value = value
+
+
+class UnaryOperation(AST):
+    __slots__ = ('operator', 'operand')
+
+    def __init__(self, operator, operand, span=None):
+        super(UnaryOperation, self).__init__(span)
+        self.operator = operator
+        self.operand = operand
+
+
+class PostfixOperation(AST):
+    __slots__ = ('operator', 'operand')
+
+    def __init__(self, operator, operand, span=None):
+        super(PostfixOperation, self).__init__(span)
+        self.operator = operator
+        self.operand = operand
+
+
+class BinaryOperation(AST):
+    __slots__ = ('operator', 'left', 'right')
+
+    def __init__(self, operator, left, right, span=None):
+        super(BinaryOperation, self).__init__(span)
+        self.operator = operator
+        self.left = left
+        self.right = right
+
+
+class Assignment(AST):
+    __slots__ = ('operator', 'target', 'value')
+
+    def __init__(self, operator, target, value, span=None):
+        super(Assignment, self).__init__(span)
+        self.operator = operator
+        self.target = target
+        self.value = value
+
+
+class Conditional(AST):
+    __slots__ = ('condition', 'true_value', 'false_value')
+
+    def __init__(self, condition, true_value, false_value, span=None):
+        super(Conditional, self).__init__(span)
+        self.condition = condition
+        self.true_value = true_value
+        self.false_value = false_value
+
+
+class Cast(AST):
+    __slots__ = ('basic_type', 'modifier', 'operand')
+
+    def __init__(self, basic_type, modifier, operand, span=None):
+        super(Cast, self).__init__(span)
+        self.basic_type = basic_type
+        self.modifier = modifier
+        self.operand = operand
+
+
+class SizeofType(AST):
+    __slots__ = ('basic_type', 'modifier')
+
+    def __init__(self, basic_type, modifier, span=None):
+        super(SizeofType, self).__init__(span)
+        self.basic_type = basic_type
+        self.modifier = modifier
+
+
+class FunctionCall(AST):
+    __slots__ = ('function', 'arguments')
+
+    def __init__(self, function, arguments, span=None):
+        super(FunctionCall, self).__init__(span)
+        self.function = function
+        self.arguments = arguments
+
+
+class ArrayReference(AST):
+    __slots__ = ('array', 'index')
+
+    def __init__(self, array, index, span=None):
+        super(ArrayReference, self).__init__(span)
+        self.array = array
+        self.index = index
+
+
+class MemberReference(AST):
+    __slots__ = ('operator', 'structure', 'member')
+
+    def __init__(self, operator, structure, member, span=None):
+        super(MemberReference, self).__init__(span)
+        self.operator = operator
+        self.structure = structure
+        self.member = member
+
+
+class ExpressionList(AST):
+    __slots__ = ('expressions',)
+
+    def __init__(self, expressions, span=None):
+        super(ExpressionList, self).__init__(span)
+        self.expressions = expressions
+
+
+class InitializerList(AST):
+    __slots__ = ('initializers',)
+
+    def __init__(self, initializers, span=None):
+        super(InitializerList, self).__init__(span)
+        self.initializers = initializers
+
+
+NodeFields = {}
+
+
+def node_fields(node_class, include_span=False):
+    """
+    Return the names of the slots of node_class without 'frozen', base class
+    slots first. 'span' is only included if include_span is set.
+    """
+    fields = NodeFields.get((node_class, include_span))
+    if fields is None:
+        excluded = ('frozen',) if include_span else ('span', 'frozen')
+        fields = []
+        for cls in reversed(node_class.__mro__):
+            fields.extend(field for field in cls.__dict__.get('__slots__', ()) if field not in excluded)
+        fields = NodeFields[node_class, include_span] = tuple(fields)
+    return fields
+
+
+def structure_key(value):
+    """
+    Return a hashable key that is equal for structurally identical values,
+    e.g. for the size expressions of arrays. Spans are ignored.
+    """
+    results = []
+    stack = [(value, False)]
+    while stack:
+        value, complete = stack.pop()
+        if isinstance(value, AST):
+            children = [getattr(value, field) for field in node_fields(type(value))]
+        elif isinstance(value, (list, tuple)):
+            children = value
+        else:
+            results.append(value)
+            continue
+        if complete:
+            start = len(results) - len(children)
+            results[start:] = [(type(value),) + tuple(results[start:])]
+        else:
+            stack.append((value, True))
+            stack.extend((child, False) for child in reversed(children))
+    return results[0]
+
+
+class TypeTable(object):
+    """
+    Interns type nodes. For all structurally identical types intern() returns
+    the same canonical node, so canonical types can be compared with 'is'.
+    Canonical nodes are shared, their set_modified_type() and
+    set_return_type() raise. Parameter names are not part of a function
+    type, the parameters of canonical functions have no names.
+    """
+    def __init__(self):
+        self.canonical_nodes = {}
+        self.canonical_ids = set()
+
+    def is_canonical(self, node):
+        return id(node) in self.canonical_ids
+
+    def parameter_key(self, parameter):
+        return tuple((self.intern(basic_type), self.intern(modifier)) for basic_type, _, modifier in parameter)
+
+    def key(self, node, modified_type):
+        """
+        Return the key of node, modified_type is the canonical node of the
+        type that node modifies or returns.
+        """
+        if isinstance(node, Pointer):
+            return Pointer, modified_type, node.qualifier
+        elif isinstance(node, ArrayDeclaration):
+            return ArrayDeclaration, modified_type, structure_key(node.size), node.qualifier
+        elif isinstance(node, Function):
+            return Function, modified_type, self.parameter_key(node.parameter), node.qualifier
+        elif isinstance(node, BasicType):
+            return BasicType, node.type_name, node.qualifier
+        elif isinstance(node, Identifier):
+            return Identifier, node.name
+        raise Exception('unexpected type node: %s' % str(node))
+
+    def create_node(self, key, node):
+        node_class = key[0]
+        if node_class is Pointer:
+            return Pointer(key[1], key[2])
+        elif node_class is ArrayDeclaration:
+            # The key only holds the structure of the size expression
+            return ArrayDeclaration(key[1], node.size, key[3])
+        elif node_class is Function:
+            unnamed = self.intern(Identifier(None))
+            return Function(key[1], tuple((basic_type, unnamed, modifier) for basic_type, modifier in key[2]),
+                            None, key[3])
+        elif node_class is BasicType:
+            return BasicType(key[1], key[2])
+        return Identifier(key[1])
+
+    def intern(self, node):
+        """
+        Return the canonical node for node. The modifier chain is interned
+        bottom-up without recursion, it is as deep as the declarator.
+        """
+        chain = []
+        while node is not None and id(node) not in self.canonical_ids:
+            chain.append(node)
+            if isinstance(node, BaseTypeModifier):
+                node = node.modified_type
+            elif isinstance(node, Function):
+                node = node.return_type
+            else:
+                node = None
+        for link in reversed(chain):
+            key = self.key(link, node)
+            canonical_node = self.canonical_nodes.get(key)
+            if canonical_node is None:
+                canonical_node = self.canonical_nodes[key] = self.create_node(key, link)
+                if isinstance(canonical_node, (BaseTypeModifier, Function)):
+                    canonical_node.frozen = True
+                self.canonical_ids.add(id(canonical_node))
+            node = canonical_node
+        return node
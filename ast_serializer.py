@@ -0,0 +1,402 @@
+# -*- encoding: utf-8 -*-
+"""
+A compact binary format for parsed ASTs.
+
+serialize() encodes a list of top-level nodes, e.g. the DeclarationLists
+returned by CParser.parse(), SerializedAST decodes them without running the
+lexer or the parser. Every top-level node is stored as a record of its own,
+SerializedAST decodes a record only when it is accessed, so single
+declarations of a large file can be loaded lazily.
+
+Layout (all counts and offsets are unsigned integers of the stored size):
+
+    header          magic, format version, offset size and section sizes
+    string ends     end offset of every string in the string data
+    string data     all distinct strings, UTF-8 encoded
+    line indices    input names and line starts for OffsetSpans
+    record ends     end offset of every record in the record data
+    record data     one encoded value per top-level node
+
+A value is a tag byte followed by its contents: nothing for None and the
+booleans, a varint for integers (zigzag encoded) and strings (an index into
+the string table), a count and the items for lists and tuples. AST nodes
+store a bit mask of their slots that are not None, followed by the values
+of these slots. A node that occurs a second time in the
+same record is stored as a reference to its first occurrence, so shared
+type nodes stay shared. Spans and coordinates are stored inline.
+
+NodeClasses must only be extended at the end. Changing the slots of a node
+class changes the format and requires a new FormatVersion.
+"""
+import struct
+from array import array
+import ast
+from c_lexer import OffsetSpan, Span
+from character_input import Coordinate, LineIndex
+
+
+__author__ = 'Christian Mönch'
+
+
+HeaderFormat = '<4sBBIIII'
+HeaderMagic = b'CAST'
+FormatVersion = 1
+NodeClasses = (ast.BasicType, ast.Identifier, ast.Pointer, ast.ArrayDeclaration, ast.Function, ast.TypeModifier,
+               ast.Declaration, ast.DeclarationList, ast.Constant, ast.UnaryOperation, ast.PostfixOperation,
+               ast.BinaryOperation, ast.Assignment, ast.Conditional, ast.Cast, ast.SizeofType, ast.FunctionCall,
+               ast.ArrayReference, ast.MemberReference, ast.ExpressionList, ast.InitializerList)
+NodeClassIndices = dict((node_class, index) for index, node_class in enumerate(NodeClasses))
+
+NoneTag = 0
+FalseTag = 1
+TrueTag = 2
+IntegerTag = 3
+StringTag = 4
+ListTag = 5
+TupleTag = 6
+ReferenceTag = 7
+SpanTag = 8
+OffsetSpanTag = 9
+CoordinateTag = 10
+NodeTagBase = 16
+
+NodeFields = tuple(ast.node_fields(node_class, include_span=True) for node_class in NodeClasses)
+
+
+def write_varint(output, value):
+    while value > 0x7f:
+        output.append(value & 0x7f | 0x80)
+        value >>= 7
+    output.append(value)
+
+
+def read_varint(data, position):
+    value = data[position]
+    if value < 0x80:
+        return value, position + 1
+    value &= 0x7f
+    shift = 7
+    while True:
+        position += 1
+        byte = data[position]
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, position + 1
+        shift += 7
+
+
+class ASTEncoder(object):
+
+    def __init__(self):
+        self.strings = []
+        self.string_ids = {}
+        self.line_indices = []
+        self.line_index_ids = {}
+        self.records = []
+
+    def string_id(self, value):
+        string_id = self.string_ids.get(value)
+        if string_id is None:
+            string_id = self.string_ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+    def line_index_id(self, line_index):
+        line_index_id = self.line_index_ids.get(id(line_index))
+        if line_index_id is None:
+            line_index_id = self.line_index_ids[id(line_index)] = len(self.line_indices)
+            self.line_indices.append(line_index)
+        return line_index_id
+
+    def write_coordinate(self, output, coordinate):
+        if coordinate is None:
+            output.append(NoneTag)
+            return
+        output.append(CoordinateTag)
+        write_varint(output, self.string_id(coordinate.name))
+        write_varint(output, coordinate.line)
+        write_varint(output, coordinate.column)
+
+    def add(self, node):
+        """
+        Encode node and everything it refers to as a new record.
+        """
+        output = bytearray()
+        memo = {}
+        stack = [node]
+        while stack:
+            value = stack.pop()
+            if value is None:
+                output.append(NoneTag)
+            elif value is True or value is False:
+                output.append(TrueTag if value else FalseTag)
+            elif isinstance(value, str):
+                output.append(StringTag)
+                write_varint(output, self.string_id(value))
+            elif isinstance(value, ast.AST):
+                reference = memo.get(id(value))
+                if reference is not None:
+                    output.append(ReferenceTag)
+                    write_varint(output, reference)
+                    continue
+                class_index = NodeClassIndices.get(type(value))
+                if class_index is None:
+                    raise Exception('cannot serialize node %s' % type(value).__name__)
+                memo[id(value)] = len(memo)
+                output.append(NodeTagBase + class_index)
+                values = [getattr(value, field) for field in NodeFields[class_index]]
+                present = 0
+                for index, field_value in enumerate(values):
+                    if field_value is not None:
+                        present |= 1 << index
+                write_varint(output, present)
+                stack.extend(field_value for field_value in reversed(values) if field_value is not None)
+            elif isinstance(value, OffsetSpan):
+                output.append(OffsetSpanTag)
+                write_varint(output, self.line_index_id(value.line_index))
+                write_varint(output, value.start_offset)
+                write_varint(output, value.end_offset)
+            elif isinstance(value, Span):
+                output.append(SpanTag)
+                self.write_coordinate(output, value.start)
+                self.write_coordinate(output, value.end)
+            elif isinstance(value, Coordinate):
+                self.write_coordinate(output, value)
+            elif isinstance(value, (list, tuple)):
+                output.append(ListTag if isinstance(value, list) else TupleTag)
+                write_varint(output, len(value))
+                stack.extend(reversed(value))
+            elif isinstance(value, int):
+                output.append(IntegerTag)
+                write_varint(output, value << 1 if value >= 0 else (-value << 1) - 1)
+            else:
+                raise Exception('cannot serialize value %s' % repr(value))
+        self.records.append(bytes(output))
+
+    def to_bytes(self):
+        encoded_strings = [value.encode('utf-8', 'surrogatepass') for value in self.strings]
+        string_ends = array('I')
+        end = 0
+        for encoded_string in encoded_strings:
+            end += len(encoded_string)
+            string_ends.append(end)
+        line_index_data = bytearray()
+        write_varint(line_index_data, len(self.line_indices))
+        for line_index in self.line_indices:
+            # Line indices of edited sources may have a pending shift
+            line_index.apply_shift()
+            write_varint(line_index_data, self.string_id(line_index.input_name))
+            write_varint(line_index_data, len(line_index.line_starts))
+            previous = 0
+            for line_start in line_index.line_starts:
+                write_varint(line_index_data, line_start - previous)
+                previous = line_start
+        # Names of line indices may have added strings
+        for value in self.strings[len(encoded_strings):]:
+            encoded_strings.append(value.encode('utf-8', 'surrogatepass'))
+            end += len(encoded_strings[-1])
+            string_ends.append(end)
+        record_ends = array('I')
+        end = 0
+        for record in self.records:
+            end += len(record)
+            record_ends.append(end)
+        return b''.join([
+            struct.pack(HeaderFormat, HeaderMagic, FormatVersion, string_ends.itemsize, len(encoded_strings),
+                        string_ends[-1] if string_ends else 0, len(line_index_data), len(self.records)),
+            string_ends.tobytes()] + encoded_strings + [
+            bytes(line_index_data), record_ends.tobytes()] + self.records)
+
+
+def serialize(nodes):
+    encoder = ASTEncoder()
+    for node in nodes:
+        encoder.add(node)
+    return encoder.to_bytes()
+
+
+class SerializedAST(object):
+    """
+    The top-level nodes of serialized data as a read only sequence, records
+    are decoded on first access. If a type table is given, the modifiers of
+    decoded DeclarationLists are interned in it.
+    """
+    def __init__(self, data, type_table=None):
+        if len(data) < struct.calcsize(HeaderFormat):
+            raise ValueError('truncated AST data')
+        magic, version, offset_size, string_count, string_size, line_index_size, record_count = \
+            struct.unpack_from(HeaderFormat, data)
+        if magic != HeaderMagic:
+            raise ValueError('not serialized AST data')
+        if version != FormatVersion:
+            raise ValueError('unsupported AST format version %d' % version)
+        self.data = data
+        self.type_table = type_table
+        self.string_ends = array('I')
+        self.record_ends = array('I')
+        if offset_size != self.string_ends.itemsize:
+            raise ValueError('AST data was stored with a different offset size')
+        position = struct.calcsize(HeaderFormat)
+        self.string_ends.frombytes(data[position:position + string_count * offset_size])
+        position += string_count * offset_size
+        self.string_start = position
+        position += string_size
+        self.line_index_start = position
+        position += line_index_size
+        self.record_ends.frombytes(data[position:position + record_count * offset_size])
+        position += record_count * offset_size
+        self.record_start = position
+        if len(self.string_ends) != string_count or len(self.record_ends) != record_count or \
+                position + (self.record_ends[-1] if record_count else 0) != len(data):
+            raise ValueError('truncated AST data')
+        self.strings = [None] * string_count
+        self.line_indices = None
+        self.nodes = [None] * record_count
+        self.field_cache = {}
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __getitem__(self, index):
+        node = self.nodes[index]
+        if node is None:
+            if index < 0:
+                index += len(self.nodes)
+            node = self.nodes[index] = self.decode(index)
+        return node
+
+    def __iter__(self):
+        for index in range(len(self.nodes)):
+            yield self[index]
+
+    def string(self, string_id):
+        value = self.strings[string_id]
+        if value is None:
+            start = self.string_start + (self.string_ends[string_id - 1] if string_id > 0 else 0)
+            end = self.string_start + self.string_ends[string_id]
+            value = self.strings[string_id] = self.data[start:end].decode('utf-8', 'surrogatepass')
+        return value
+
+    def line_index(self, line_index_id):
+        if self.line_indices is None:
+            self.line_indices = []
+            data = self.data
+            count, position = read_varint(data, self.line_index_start)
+            for _ in range(count):
+                name_id, position = read_varint(data, position)
+                line_count, position = read_varint(data, position)
+                line_starts = []
+                line_start = 0
+                for _ in range(line_count):
+                    delta, position = read_varint(data, position)
+                    line_start += delta
+                    line_starts.append(line_start)
+                self.line_indices.append(LineIndex(self.string(name_id), line_starts))
+        return self.line_indices[line_index_id]
+
+    def present_fields(self, class_index, present):
+        key = class_index, present
+        fields = self.field_cache.get(key)
+        if fields is None:
+            fields = self.field_cache[key] = tuple(
+                field for index, field in enumerate(NodeFields[class_index]) if present & (1 << index))
+        return fields
+
+    def read_coordinate(self, position):
+        data = self.data
+        if data[position] == NoneTag:
+            return None, position + 1
+        name_id, position = read_varint(data, position + 1)
+        line, position = read_varint(data, position)
+        column, position = read_varint(data, position)
+        return Coordinate(self.string(name_id), line, column), position
+
+    def decode(self, index):
+        data = self.data
+        position = self.record_start + (self.record_ends[index - 1] if index > 0 else 0)
+        nodes = []
+        root = [None]
+        # A frame is [target, fields, position, count, is_tuple], targets are
+        # nodes (filled via fields) or lists. Tuples are built as lists and
+        # handed to their parent when they are complete.
+        stack = [[root, None, 0, 1, False]]
+        while stack:
+            tag = data[position]
+            position += 1
+            frame = None
+            if tag >= NodeTagBase:
+                node_class = NodeClasses[tag - NodeTagBase]
+                value = node_class.__new__(node_class)
+                nodes.append(value)
+                present, position = read_varint(data, position)
+                fields = NodeFields[tag - NodeTagBase]
+                for field in fields:
+                    setattr(value, field, None)
+                fields = self.present_fields(tag - NodeTagBase, present)
+                frame = [value, fields, 0, len(fields), False]
+            elif tag == StringTag:
+                string_id, position = read_varint(data, position)
+                value = self.string(string_id)
+            elif tag == NoneTag:
+                value = None
+            elif tag == ReferenceTag:
+                reference, position = read_varint(data, position)
+                value = nodes[reference]
+            elif tag == ListTag or tag == TupleTag:
+                count, position = read_varint(data, position)
+                value = [None] * count
+                frame = [value, None, 0, count, tag == TupleTag]
+            elif tag == IntegerTag:
+                value, position = read_varint(data, position)
+                value = value >> 1 if not value & 1 else -((value + 1) >> 1)
+            elif tag == TrueTag or tag == FalseTag:
+                value = tag == TrueTag
+            elif tag == OffsetSpanTag:
+                line_index_id, position = read_varint(data, position)
+                start_offset, position = read_varint(data, position)
+                end_offset, position = read_varint(data, position)
+                value = OffsetSpan(self.line_index(line_index_id), start_offset, end_offset)
+            elif tag == SpanTag:
+                start, position = self.read_coordinate(position)
+                end, position = self.read_coordinate(position)
+                value = Span(start, end)
+            elif tag == CoordinateTag:
+                value, position = self.read_coordinate(position - 1)
+            else:
+                raise ValueError('unknown tag %d in AST data' % tag)
+            if frame is not None and frame[4]:
+                # The tuple is handed to the parent when it is complete
+                stack.append(frame)
+                if frame[3] > 0:
+                    continue
+                stack.pop()
+                value = tuple(frame[0])
+                frame = None
+            while True:
+                parent = stack[-1]
+                if parent[1] is not None:
+                    setattr(parent[0], parent[1][parent[2]], value)
+                else:
+                    parent[0][parent[2]] = value
+                parent[2] += 1
+                if frame is not None and frame[3] > 0:
+                    stack.append(frame)
+                    break
+                # Hand completed tuples to their parents
+                frame = None
+                while stack and stack[-1][2] == stack[-1][3]:
+                    completed = stack.pop()
+                    if completed[4]:
+                        value = tuple(completed[0])
+                        break
+                else:
+                    break
+        node = root[0]
+        if self.type_table is not None and isinstance(node, ast.DeclarationList):
+            node.modifier_list = [(identifier, self.type_table.intern(modifier))
+                                  for identifier, modifier in node.modifier_list]
+        return node
+
+
+def deserialize(data, type_table=None):
+    return list(SerializedAST(data, type_table))
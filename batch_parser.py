@@ -0,0 +1,74 @@
+# -*- encoding: utf-8 -*-
+"""
+Lex and parse many files in a pool of worker processes.
+
+parse_files() distributes the files over the workers and yields one
+FileResult per file as soon as it is finished. A FileResult contains only
+strings and numbers, i.e. the declarations are rendered as C source, so
+results are cheap to send between processes.
+"""
+import multiprocessing
+from collections import namedtuple
+from c_generator import CGenerator
+from c_parser import CParser
+from character_input import MappedFileCharacterInput
+from token_array import TokenArray
+from token_stream import TokenStream
+
+
+__author__ = 'Christian Mönch'
+
+
+FileResult = namedtuple('FileResult', ['path', 'token_count', 'declarations', 'error'])
+
+
+def parse_source(source, path):
+    tokens = TokenArray.from_source(source, path)
+    parser = CParser(TokenStream(tokens.reader()))
+    try:
+        declaration_lists = parser.parse()
+    except Exception as exception:
+        if parser.current_token is not None:
+            start = parser.current_token.location.start
+            return FileResult(path, len(tokens), (), '%s:%d:%d: %s' % (start.name, start.line, start.column, exception))
+        return FileResult(path, len(tokens), (), '%s: %s' % (path, exception))
+    generator = CGenerator()
+    return FileResult(path, len(tokens), tuple(
+        generator.show_declaration_list(
+            declaration_list.basic_type, declaration_list.modifier_list, declaration_list.initializer_list)
+        for declaration_list in declaration_lists), None)
+
+
+def parse_file(path):
+    try:
+        source = MappedFileCharacterInput(path).input_string
+        return parse_source(source, path)
+    except Exception as exception:
+        return FileResult(path, None, (), '%s: %s' % (path, exception))
+
+
+def parse_files(paths, workers=None, chunk_size=1):
+    """
+    Yield a FileResult for every path in the order in which they are finished.
+    workers is the number of processes, it defaults to the number of CPUs.
+    chunk_size is the number of paths that are sent to a worker at once.
+    """
+    pool = multiprocessing.Pool(workers)
+    try:
+        for result in pool.imap_unordered(parse_file, paths, chunk_size):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+if __name__ == '__main__':
+    import sys
+
+    for file_result in parse_files(sys.argv[1:]):
+        if file_result.error is not None:
+            sys.stderr.write(file_result.error + '\n')
+        else:
+            for declaration in file_result.declarations:
+                sys.stdout.write('%s: %s;\n' % (file_result.path, declaration))
@@ -0,0 +1,167 @@
+# -*- encoding: utf-8 -*-
+"""
+Memory benchmark for the node classes.
+
+For every class the number of bytes per instance is measured twice: for the
+class itself, which uses __slots__, and for a plain class with the same
+constructor and no __slots__, whose instances carry a __dict__ like the
+classes did before. The results
+are written as one JSON object per line.
+
+usage: python bench_memory.py [instance_count]
+"""
+import json
+import sys
+import tracemalloc
+import ast
+from c_lexer import OffsetSpan, Span, Token, TokenEnum
+from character_input import Character, Coordinate, LineIndex
+
+
+__author__ = 'Christian Mönch'
+
+
+# Classes without __slots__ that store the same attributes as the node
+# classes did before, their instances carry a __dict__
+class PlainAST(object):
+    def __init__(self, span):
+        self.span = span
+
+
+class PlainPointer(PlainAST):
+    def __init__(self, modified_type, qualifier, span=None):
+        super(PlainPointer, self).__init__(span)
+        self.modified_type = None
+        self.qualifier = qualifier
+        self.modified_type = modified_type
+
+
+class PlainFunction(PlainAST):
+    def __init__(self, return_type, parameter, body, qualifier, span=None):
+        super(PlainFunction, self).__init__(span)
+        self.return_type = return_type
+        self.parameter = parameter
+        self.body = body
+        self.qualifier = qualifier
+
+
+class PlainArrayDeclaration(PlainAST):
+    def __init__(self, modified_type, size, qualifier, span=None):
+        super(PlainArrayDeclaration, self).__init__(span)
+        self.modified_type = None
+        self.size = size
+        self.qualifier = qualifier
+        self.modified_type = modified_type
+
+
+class PlainBasicType(PlainAST):
+    def __init__(self, type_name, qualifier, span=None):
+        super(PlainBasicType, self).__init__(span)
+        self.type_name = type_name
+        self.qualifier = qualifier
+
+
+class PlainIdentifier(PlainAST):
+    def __init__(self, name, span=None):
+        super(PlainIdentifier, self).__init__(span)
+        self.name = name
+
+
+class PlainDeclaration(PlainAST):
+    def __init__(self, basic_type, modifier, span=None):
+        super(PlainDeclaration, self).__init__(span)
+        self.basic_type = basic_type
+        self.modifier = modifier
+        self.identifier = modifier.identifier
+
+
+class PlainDeclarationList(PlainAST):
+    def __init__(self, basic_type, modifier_list, initializer_list=None, span=None):
+        super(PlainDeclarationList, self).__init__(span)
+        self.basic_type = basic_type
+        self.modifier_list = modifier_list
+        self.initializer_list = initializer_list if initializer_list is not None else [None] * len(modifier_list)
+
+
+class PlainToken(object):
+    def __init__(self, token_type, token_value, span=None, symbol=None):
+        self.type = token_type
+        self.value = token_value
+        self.location = span
+        self.symbol = symbol
+
+
+class PlainSpan(object):
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+
+
+class PlainOffsetSpan(object):
+    def __init__(self, line_index, start_offset, end_offset):
+        self.line_index = line_index
+        self.start_offset = start_offset
+        self.end_offset = end_offset
+
+
+class PlainCharacter(object):
+    def __init__(self, value, representation=None, encoding=None, coordinate=None, offset=None, line_index=None):
+        self.value = value
+        self.representation = representation
+        self.encoding = encoding
+        self.offset = offset
+        self.line_index = line_index
+        self.fixed_coordinate = coordinate
+
+
+def node_factories():
+    """
+    Return (class, plain class, factory) triples. All arguments are created
+    once here, so a factory call allocates only the measured instance.
+    """
+    coordinate = Coordinate('<memory string>', 1, 1)
+    line_index = LineIndex('<memory string>')
+    basic_type = ast.BasicType('int', None)
+    modifier = ast.TypeModifier(None, ast.Identifier('x'))
+    modifier_list = [modifier]
+    initializer_list = [None]
+    parameter = []
+    return (
+        (ast.Pointer, PlainPointer, lambda cls: cls(None, None)),
+        (ast.Function, PlainFunction, lambda cls: cls(None, parameter, None, None)),
+        (ast.ArrayDeclaration, PlainArrayDeclaration, lambda cls: cls(None, None, None)),
+        (ast.BasicType, PlainBasicType, lambda cls: cls('int', None)),
+        (ast.Identifier, PlainIdentifier, lambda cls: cls('x')),
+        (ast.Declaration, PlainDeclaration, lambda cls: cls(basic_type, modifier)),
+        (ast.DeclarationList, PlainDeclarationList, lambda cls: cls(basic_type, modifier_list, initializer_list)),
+        (Token, PlainToken, lambda cls: cls(TokenEnum.ID, 'x')),
+        (Span, PlainSpan, lambda cls: cls(coordinate, coordinate)),
+        (OffsetSpan, PlainOffsetSpan, lambda cls: cls(line_index, 0, 0)),
+        (Character, PlainCharacter, lambda cls: cls('x', offset=0, line_index=line_index)))
+
+
+def bytes_per_instance(cls, factory, count):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        instances = [factory(cls) for _ in range(count)]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    # Do not count the list that holds the instances
+    return (after - before - sys.getsizeof(instances)) / float(len(instances))
+
+
+def main(count):
+    for cls, plain_cls, factory in node_factories():
+        before = bytes_per_instance(plain_cls, factory, count)
+        after = bytes_per_instance(cls, factory, count)
+        sys.stdout.write(json.dumps({
+            'class': cls.__name__,
+            'bytes_with_dict': round(before, 1),
+            'bytes_with_slots': round(after, 1),
+            'saving': round(1 - after / before, 3)}) + '\n')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
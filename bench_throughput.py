@@ -0,0 +1,143 @@
+# -*- encoding: utf-8 -*-
+"""
+Throughput benchmark for the stages of the lexer and the parser.
+
+A synthetic corpus from c_corpus_generator is run through every stage on
+its own: the character inputs, the lexers, the parser on tokens that were
+lexed in advance and the type rendering of the generator on the parsed
+declarations, as well as the output of whole declarations to a text stream.
+Every stage is run repeat times and the fastest run is reported. The results
+are written as one JSON object per line, they contain MB/s and, where a
+stage produces tokens, tokens/s.
+
+usage: python bench_throughput.py [size] [repeat] [seed]
+"""
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from c_corpus_generator import generate_corpus
+from c_generator import CGenerator
+from c_lexer import CLexer
+from c_parser import CParser
+from c_regex_lexer import CRegexLexer
+from character_input import FileCharacterInput, StringCharacterInput
+from object_stream import ObjectStream
+from token_array import TokenArray
+from token_stream import TokenStream
+
+
+__author__ = 'Christian Mönch'
+
+
+def count_characters(character_input):
+    count = 0
+    while character_input.get_next_object() is not None:
+        count += 1
+    return count
+
+
+def count_tokens(lexer):
+    count = 0
+    for _ in lexer:
+        count += 1
+    return count
+
+
+def read_file(path):
+    with open(path, encoding='utf-8', newline='') as input_file:
+        return count_characters(FileCharacterInput(input_file, path))
+
+
+def parse(tokens):
+    return CParser(TokenStream(tokens.reader())).parse()
+
+
+def show_types(declaration_lists):
+    generator = CGenerator()
+    count = 0
+    for declaration_list in declaration_lists:
+        for identifier, modifier in declaration_list.modifier_list:
+            generator.show_type(identifier.name or '', modifier)
+            count += 1
+    return count
+
+
+def write_declarations(declaration_lists):
+    return CGenerator().write_translation_unit(io.StringIO(), declaration_lists)
+
+
+def best_time(function, argument, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(argument)
+        seconds = time.perf_counter() - start
+        if best is None or seconds < best:
+            best = seconds
+    return best, result
+
+
+def report(stage, size, seconds, tokens=None, items=None):
+    result = {
+        'stage': stage,
+        'bytes': size,
+        'seconds': round(seconds, 6),
+        'mb_per_second': round(size / seconds / 1e6, 3)}
+    if tokens is not None:
+        result['tokens'] = tokens
+        result['tokens_per_second'] = round(tokens / seconds)
+    if items is not None:
+        result['items'] = items
+        result['items_per_second'] = round(items / seconds)
+    sys.stdout.write(json.dumps(result) + '\n')
+    sys.stdout.flush()
+
+
+def main(size, repeat, seed):
+    source = generate_corpus(size, seed)
+    size = len(source.encode('utf-8'))
+    handle, path = tempfile.mkstemp(suffix='.c')
+    try:
+        with os.fdopen(handle, 'w', encoding='utf-8', newline='') as output_file:
+            output_file.write(source)
+        seconds, _ = best_time(read_file, path, repeat)
+        report('FileCharacterInput', size, seconds)
+    finally:
+        os.remove(path)
+
+    seconds, _ = best_time(lambda text: count_characters(StringCharacterInput(text)), source, repeat)
+    report('StringCharacterInput', size, seconds)
+    seconds, count = best_time(lambda text: count_tokens(CLexer(ObjectStream(StringCharacterInput(text)), source=text)),
+                               source, repeat)
+    report('CLexer', size, seconds, tokens=count)
+    seconds, count = best_time(lambda text: count_tokens(CLexer(ObjectStream(StringCharacterInput(text)),
+                                                                skip_trivia=True, source=text)), source, repeat)
+    report('CLexer(skip_trivia)', size, seconds, tokens=count)
+    # Without the source, trivia is skipped character by character
+    seconds, count = best_time(lambda text: count_tokens(CLexer(ObjectStream(StringCharacterInput(text)),
+                                                                skip_trivia=True)), source, repeat)
+    report('CLexer(skip_trivia, no source)', size, seconds, tokens=count)
+    seconds, count = best_time(lambda text: count_tokens(CRegexLexer(text)), source, repeat)
+    report('CRegexLexer', size, seconds, tokens=count)
+    seconds, tokens = best_time(TokenArray.from_source, source, repeat)
+    report('TokenArray.from_source', size, seconds, tokens=len(tokens))
+
+    # The parser does not accept string constants at the top level
+    source = generate_corpus(size, seed, strings=False)
+    size = len(source.encode('utf-8'))
+    tokens = TokenArray.from_source(source)
+    seconds, declaration_lists = best_time(parse, tokens, repeat)
+    report('CParser', size, seconds, tokens=len(tokens), items=len(declaration_lists))
+    seconds, count = best_time(show_types, declaration_lists, repeat)
+    report('CGenerator.show_type', size, seconds, items=count)
+    seconds, count = best_time(write_declarations, declaration_lists, repeat)
+    report('CGenerator.write_translation_unit', size, seconds, items=count)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 256 * 1024,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 3,
+         int(sys.argv[3]) if len(sys.argv) > 3 else 0)
@@ -0,0 +1,123 @@
+# -*- encoding: utf-8 -*-
+"""
+A deterministic generator for large synthetic C inputs.
+
+The generated source consists of declarations with deeply nested
+declarators, block and line comments, preprocessor lines and, optionally,
+string and character constants with escape sequences. The parser does not
+read string constants at the top level, so inputs for the parser have to be
+generated with strings=False. The same size and seed always yield the same
+source.
+
+usage: python c_corpus_generator.py [size] [seed]
+"""
+import random
+
+
+__author__ = 'Christian Mönch'
+
+
+BasicTypes = ('int', 'char', 'long', 'short', 'unsigned int', 'signed char', 'const char', 'static long',
+              'static unsigned long')
+Words = ('the', 'size', 'of', 'a', 'bitmap', 'in', 'bits', 'is', 'stored', 'as', 'an', 'array', 'unsigned',
+         'long', 'words', 'with', 'big', 'endian', 'order', 'may', 'be', 'either', '32', 'or', '64')
+Names = tuple(word for word in Words if word[0].isalpha())
+Escapes = ('\\n', '\\t', '\\\\', '\\"', "\\'", '\\x4a', '\\101', '\\0', '\\12')
+Directives = ('#define %s %d', '#include <%s.h>', '#ifdef %s', '#endif', '#pragma %s', '#undef %s')
+
+
+class CorpusGenerator(object):
+
+    def __init__(self, seed=0, max_depth=4, strings=True):
+        self.random = random.Random(seed)
+        self.max_depth = max_depth
+        self.strings = strings
+        self.name_count = 0
+
+    def identifier(self):
+        self.name_count += 1
+        return '%s_%d' % (self.random.choice(Names), self.name_count)
+
+    def declarator(self, depth):
+        """
+        Return a declarator like '*(**foo[][])()', depth is the maximal
+        number of nested parentheses.
+        """
+        choice = self.random.random
+        result = '*' * self.random.randint(0, 2)
+        if depth > 0 and choice() < 0.6:
+            result += '(' + self.declarator(depth - 1) + ')'
+        else:
+            result += self.identifier()
+        if choice() < 0.3:
+            result += '(' + self.parameter_list(depth - 1) + ')'
+        return result + '[]' * self.random.randint(0, 2)
+
+    def parameter_list(self, depth):
+        return ', '.join(self.random.choice(BasicTypes) + ' ' + self.declarator(max(depth, 0))
+                         for _ in range(self.random.randint(0, 3)))
+
+    def declaration(self):
+        declarators = [self.declarator(self.random.randint(0, self.max_depth))
+                       for _ in range(self.random.randint(1, 3))]
+        return '%s %s;\n' % (self.random.choice(BasicTypes), ', '.join(declarators))
+
+    def text(self, word_count):
+        return ' '.join(self.random.choice(Words) for _ in range(word_count))
+
+    def block_comment(self):
+        lines = ['/* ' + self.text(10)]
+        lines.extend(' * ' + self.text(12) for _ in range(self.random.randint(0, 12)))
+        return '\n'.join(lines) + '\n */\n'
+
+    def line_comment(self):
+        return '// %s\n' % self.text(self.random.randint(1, 15))
+
+    def directive(self):
+        directive = self.random.choice(Directives)
+        if '%d' in directive:
+            return directive % (self.identifier().upper(), self.random.randint(0, 65535)) + '\n'
+        if '%s' in directive:
+            return directive % self.identifier() + '\n'
+        return directive + '\n'
+
+    def string_constants(self):
+        def content():
+            return ''.join(self.random.choice(Escapes) if self.random.random() < 0.3 else self.random.choice(Words)
+                           for _ in range(self.random.randint(1, 8)))
+        return '"%s" \'%s\'\n' % (content(), self.random.choice(Escapes + ('a', 'z')))
+
+    def element(self):
+        value = self.random.random()
+        if value < 0.55:
+            return self.declaration()
+        if value < 0.7:
+            return self.block_comment()
+        if value < 0.8:
+            return self.line_comment()
+        if value < 0.9 or not self.strings:
+            return self.directive()
+        return self.string_constants()
+
+    def generate(self, size):
+        """
+        Return a source of at least size characters.
+        """
+        elements = []
+        length = 0
+        while length < size:
+            element = self.element()
+            elements.append(element)
+            length += len(element)
+        return ''.join(elements)
+
+
+def generate_corpus(size, seed=0, strings=True):
+    return CorpusGenerator(seed, strings=strings).generate(size)
+
+
+if __name__ == '__main__':
+    import sys
+
+    sys.stdout.write(generate_corpus(int(sys.argv[1]) if len(sys.argv) > 1 else 1024 * 1024,
+                                     int(sys.argv[2]) if len(sys.argv) > 2 else 0))
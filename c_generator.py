@@ -3,11 +3,29 @@ __author__ = 'Christian Mönch'
 
 
 import ast
+from c_lexer import CLexer
+from c_parser import (ExpressionPrecedence, AssignmentPrecedence, ConditionalPrecedence, UnaryPrecedence,
+                      PostfixPrecedence, PrimaryPrecedence)
+
+
+OperatorPrecedence = dict(
+    (text, ExpressionPrecedence[token_type])
+    for text, token_type in list(CLexer.SingleToken.items()) + list(CLexer.DoubleToken.items())
+    if token_type in ExpressionPrecedence)
+CharacterEscapes = {
+    '\n': '\\n',
+    '\t': '\\t',
+    '\v': '\\v',
+    '\f': '\\f',
+    '\r': '\\r',
+    '\\': '\\\\'
+}
 
 
 class CGenerator(object):
-    def __init__(self):
-        pass
+    def __init__(self, type_table=None):
+        self.type_table = type_table
+        self.affix_cache = {}
 
     # Case function:
     # The difficult case is the function. E.g. <t> is function returning <r>:
@@ -20,27 +38,57 @@ class CGenerator(object):
     # E.g. we have an array of ... So the array is built from what we will read.
     # x is a pointer to an array of pointer:  *(*x)[]
     # <t> is an array of: <t>[]
+    #
+    # Every type wraps the type string into a prefix and a suffix, i.e.
+    # show_type(s, t) == prefix + s + suffix. The prefix of a type is the
+    # prefix of its modified type followed by its own prefix, its suffix is
+    # its own suffix followed by the suffix of the modified type. The chain of
+    # modified types is walked iteratively and the affixes are joined once.
+    # The affixes of canonical nodes from the type table are cached.
     def show_type(self, type_string, current_type):
         if current_type is None:
             return type_string
-        if isinstance(current_type, ast.Function):
-            return self.show_type(type_string + '(' + self.show_parameter(current_type.parameter) + ')', current_type.return_type)
-        elif isinstance(current_type, ast.ArrayDeclaration):
-            return self.show_type(type_string + '[]', current_type.modified_type)
-        elif isinstance(current_type, ast.Pointer):
-            if isinstance(current_type.modified_type, (ast.ArrayDeclaration, ast.Function)):
-                return self.show_type('(*' + type_string + ')', current_type.modified_type)
-            return self.show_type('*' + type_string, current_type.modified_type)
-        else:
-            raise Exception('unexpected type node: %s' % str(current_type))
-
-    def show_declaration_list(self, basic_type, identifier_modifier_list):
-        result = ''
-        for identifier, modifier in identifier_modifier_list:
-            if result != '':
-                result += ', '
-            result += self.show_type(identifier.name if identifier.name is not None else '', modifier)
-        return basic_type.type_name + ' ' + result
+        prefix, suffix = self.type_affixes(current_type)
+        return prefix + type_string + suffix
+
+    def type_affixes(self, current_type):
+        chain = []
+        prefix, suffix = '', ''
+        node = current_type
+        while node is not None:
+            if node in self.affix_cache:
+                prefix, suffix = self.affix_cache[node]
+                break
+            chain.append(node)
+            if isinstance(node, ast.Function):
+                node = node.return_type
+            elif isinstance(node, (ast.ArrayDeclaration, ast.Pointer)):
+                node = node.modified_type
+            else:
+                raise Exception('unexpected type node: %s' % str(node))
+        prefix_parts = [prefix]
+        # In reverse order, from the innermost to the outermost suffix
+        suffix_parts = [suffix]
+        for node in reversed(chain):
+            if isinstance(node, ast.Function):
+                suffix_parts.append('(' + self.show_parameter(node.parameter) + ')')
+            elif isinstance(node, ast.ArrayDeclaration):
+                suffix_parts.append('[' + (self.show_expression(node.size) if node.size is not None else '') + ']')
+            elif isinstance(node.modified_type, (ast.ArrayDeclaration, ast.Function)):
+                prefix_parts.append('(*')
+                suffix_parts.append(')')
+            else:
+                prefix_parts.append('*')
+        suffix_parts.reverse()
+        result = ''.join(prefix_parts), ''.join(suffix_parts)
+        if self.type_table is not None and self.type_table.is_canonical(current_type):
+            self.affix_cache[current_type] = result
+        return result
+
+    def show_declaration_list(self, basic_type, identifier_modifier_list, initializer_list=None):
+        parts = []
+        self.write_declaration_list(parts.append, basic_type, identifier_modifier_list, initializer_list)
+        return ''.join(parts)
 
     def show_declaration(self, basic_type, identifier, modifier):
         return basic_type.type_name + ' ' + self.show_type(identifier.name if identifier.name is not None else '', modifier)
@@ -48,3 +96,191 @@ class CGenerator(object):
     def show_parameter(self, parameter_list):
         result = ''
         return ', '.join([self.show_declaration(p[0], p[1], p[2]) for p in parameter_list])
+
+    def show_type_name(self, basic_type, modifier):
+        declarator = self.show_type('', modifier)
+        return basic_type.type_name + (' ' + declarator if declarator else '')
+
+    def show_initializer(self, initializer):
+        parts = []
+        self.write_initializer(parts.append, initializer)
+        return ''.join(parts)
+
+    def show_constant(self, constant):
+        if constant.constant_type == 'integer':
+            return constant.value
+        quote = '"' if constant.constant_type == 'string' else "'"
+        result = []
+        for character in constant.value:
+            if character in CharacterEscapes:
+                result.append(CharacterEscapes[character])
+            elif character == quote:
+                result.append('\\' + quote)
+            elif not character.isprintable() and ord(character) < 256:
+                result.append('\\%03o' % ord(character))
+            else:
+                result.append(character)
+        return quote + ''.join(result) + quote
+
+    def expression_precedence(self, expression):
+        if isinstance(expression, ast.BinaryOperation):
+            return OperatorPrecedence[expression.operator]
+        if isinstance(expression, (ast.Identifier, ast.Constant)):
+            return PrimaryPrecedence
+        if isinstance(expression, (ast.PostfixOperation, ast.FunctionCall, ast.ArrayReference, ast.MemberReference)):
+            return PostfixPrecedence
+        if isinstance(expression, (ast.UnaryOperation, ast.Cast, ast.SizeofType)):
+            return UnaryPrecedence
+        if isinstance(expression, ast.Conditional):
+            return ConditionalPrecedence
+        if isinstance(expression, ast.Assignment):
+            return AssignmentPrecedence
+        return 0
+
+    def show_expression(self, expression, minimal_precedence=0):
+        """
+        Render an expression, it is put into parentheses if it binds weaker
+        than minimal_precedence.
+        """
+        parts = []
+        self.write_expression(parts.append, expression, minimal_precedence)
+        return ''.join(parts)
+
+    # Writer mode:
+    # The write_* methods do not return strings, they hand the fragments of
+    # their output to a write callable, e.g. the write method of a text
+    # stream or the append method of a list. No intermediate strings are
+    # built for declaration lists, initializer lists and expressions, so the
+    # output time grows linearly with their size. Initializers and
+    # expressions are walked with explicit stacks, their depth is not
+    # limited by the Python stack.
+    def write_type(self, write, type_string, current_type):
+        if current_type is None:
+            write(type_string)
+            return
+        prefix, suffix = self.type_affixes(current_type)
+        write(prefix)
+        write(type_string)
+        write(suffix)
+
+    def write_declaration_list(self, write, basic_type, identifier_modifier_list, initializer_list=None):
+        write(basic_type.type_name)
+        write(' ')
+        for index, (identifier, modifier) in enumerate(identifier_modifier_list):
+            if index != 0:
+                write(', ')
+            self.write_type(write, identifier.name if identifier.name is not None else '', modifier)
+            if initializer_list is not None and initializer_list[index] is not None:
+                write(' = ')
+                self.write_initializer(write, initializer_list[index])
+
+    def write_initializer(self, write, initializer):
+        # A stack of fragments and initializers that are still to be written
+        stack = [initializer]
+        while stack:
+            item = stack.pop()
+            if item.__class__ is str:
+                write(item)
+            elif isinstance(item, ast.InitializerList):
+                parts = ['{']
+                for index, element in enumerate(item.initializers):
+                    if index != 0:
+                        parts.append(', ')
+                    parts.append(element)
+                parts.append('}')
+                parts.reverse()
+                stack.extend(parts)
+            else:
+                self.write_expression(write, item, AssignmentPrecedence)
+
+    def write_expression(self, write, expression, minimal_precedence=0):
+        """
+        Write an expression, it is put into parentheses if it binds weaker
+        than minimal_precedence. The tree is walked with a stack of fragments
+        and (expression, minimal_precedence) pairs instead of recursion.
+        """
+        stack = [(expression, minimal_precedence)]
+        # Keep e.g. '- -x' and '& &x' from turning into '--x' and '&&x': the
+        # next fragment is preceded by a blank if it starts with separate
+        separate = None
+        while stack:
+            item = stack.pop()
+            if item.__class__ is str:
+                if separate is not None and item:
+                    if item[0] == separate:
+                        write(' ')
+                    separate = None
+                write(item)
+                continue
+            expression, minimal_precedence = item
+            if expression is None:
+                separate = minimal_precedence
+                continue
+            precedence = self.expression_precedence(expression)
+            if isinstance(expression, ast.BinaryOperation):
+                parts = [(expression.left, precedence), ' %s ' % expression.operator,
+                         (expression.right, precedence + 1)]
+            elif isinstance(expression, ast.Identifier):
+                parts = [expression.name]
+            elif isinstance(expression, ast.Constant):
+                parts = [self.show_constant(expression)]
+            elif isinstance(expression, ast.UnaryOperation):
+                if expression.operator == 'sizeof':
+                    parts = ['sizeof ', (expression.operand, UnaryPrecedence)]
+                elif expression.operator[-1] in '+-&':
+                    parts = [expression.operator, (None, expression.operator[-1]),
+                             (expression.operand, UnaryPrecedence)]
+                else:
+                    parts = [expression.operator, (expression.operand, UnaryPrecedence)]
+            elif isinstance(expression, ast.PostfixOperation):
+                parts = [(expression.operand, PostfixPrecedence), expression.operator]
+            elif isinstance(expression, ast.FunctionCall):
+                parts = [(expression.function, PostfixPrecedence), '(']
+                for index, argument in enumerate(expression.arguments):
+                    if index != 0:
+                        parts.append(', ')
+                    parts.append((argument, AssignmentPrecedence))
+                parts.append(')')
+            elif isinstance(expression, ast.ArrayReference):
+                parts = [(expression.array, PostfixPrecedence), '[', (expression.index, 0), ']']
+            elif isinstance(expression, ast.MemberReference):
+                parts = [(expression.structure, PostfixPrecedence), expression.operator + expression.member]
+            elif isinstance(expression, ast.Cast):
+                parts = ['(%s)' % self.show_type_name(expression.basic_type, expression.modifier),
+                         (expression.operand, UnaryPrecedence)]
+            elif isinstance(expression, ast.SizeofType):
+                parts = ['sizeof(%s)' % self.show_type_name(expression.basic_type, expression.modifier)]
+            elif isinstance(expression, ast.Conditional):
+                parts = [(expression.condition, ConditionalPrecedence + 1), ' ? ', (expression.true_value, 0), ' : ',
+                         (expression.false_value, ConditionalPrecedence)]
+            elif isinstance(expression, ast.Assignment):
+                parts = [(expression.target, UnaryPrecedence), ' %s ' % expression.operator,
+                         (expression.value, AssignmentPrecedence)]
+            elif isinstance(expression, ast.ExpressionList):
+                parts = []
+                for index, element in enumerate(expression.expressions):
+                    if index != 0:
+                        parts.append(', ')
+                    parts.append((element, AssignmentPrecedence))
+            else:
+                raise Exception('unexpected expression node: %s' % str(expression))
+            if precedence < minimal_precedence:
+                parts.insert(0, '(')
+                parts.append(')')
+            parts.reverse()
+            stack.extend(parts)
+
+    def write_translation_unit(self, output, declaration_lists):
+        """
+        Write every declaration list, terminated by ';' and a newline, to
+        output. Output is either a text stream or a list that collects the
+        fragments. Return the number of written declaration lists.
+        """
+        write = output.write if hasattr(output, 'write') else output.append
+        count = 0
+        for declaration_list in declaration_lists:
+            self.write_declaration_list(write, declaration_list.basic_type, declaration_list.modifier_list,
+                                        declaration_list.initializer_list)
+            write(';\n')
+            count += 1
+        return count
@@ -2,16 +2,22 @@
 """
 A simple lexer for C
 """
+import re
 import string
+from collections import Counter
 from enum import Enum
 
 
 __author__ = 'Christian Mönch'
 
 
+# Change this whenever the token stream for a given source changes
+LexerVersion = '3'
 EndMarker = '$end'
 WordStarter = string.ascii_letters + '_'
 WordContinuation = string.ascii_letters + string.digits + '_'
+# A run of whitespace and the line continuations in it
+WhitespaceRunPattern = re.compile(r'(?:[%s]|\\\n)+' % re.escape(string.whitespace))
 
 
 class TokenEnum(Enum):
@@ -89,9 +95,26 @@ class TokenEnum(Enum):
     COMMENT = 'Comment'
     WHITESPACE = 'Whitespace'
     NUMBER_SIGN = '#'
+    NOT_EQUAL = 'Not_Equal'
+    LEFT_SHIFT = 'Left_Shift'
+    RIGHT_SHIFT = 'Right_Shift'
+    AND_ASSIGN = 'And_Assign'
+    OR_ASSIGN = 'Or_Assign'
+    EXOR_ASSIGN = 'Exor_Assign'
+    LEFT_SHIFT_ASSIGN = 'Left_Shift_Assign'
+    RIGHT_SHIFT_ASSIGN = 'Right_Shift_Assign'
+    SIZEOF = 'Sizeof'
+    TYPEID = 'Type_Id'
+
+
+# Small integer numbers of the token types, e.g. for token arrays
+TokenTypes = list(TokenEnum)
+TokenTypeNumbers = dict((token_type, number) for number, token_type in enumerate(TokenTypes))
 
 
 class Span(object):
+    __slots__ = ('start', 'end')
+
     def __init__(self, start, end):
         self.start = start
         self.end = end
@@ -100,17 +123,128 @@ class Span(object):
         return 'Span(%s, %s)' % (repr(self.start), repr(self.end))
 
 
+class OffsetSpan(Span):
+    """
+    A span that is given by the offsets of its first and last character.
+    The coordinates are looked up in the line index when they are read.
+    """
+    __slots__ = ('line_index', 'start_offset', 'end_offset')
+
+    def __init__(self, line_index, start_offset, end_offset):
+        self.line_index = line_index
+        self.start_offset = start_offset
+        self.end_offset = end_offset
+
+    @property
+    def start(self):
+        return self.line_index.coordinate(self.start_offset)
+
+    @property
+    def end(self):
+        return self.line_index.coordinate(self.end_offset)
+
+
 class Token(object):
+    __slots__ = ('type', 'value', 'location', 'symbol')
 
-    def __init__(self, token_type, token_value, span=None):
+    def __init__(self, token_type, token_value, span=None, symbol=None):
         self.type = token_type
         self.value = token_value
         self.location = span
+        self.symbol = symbol
 
     def __repr__(self):
         return 'Token(%s, %s, %s)' % (self.type, repr(self.value), repr(self.location))
 
 
+class SourceToken(Token):
+    """
+    A token whose value is the source text between start_offset and
+    end_offset. The text is sliced from the source on first access.
+    """
+    __slots__ = ('source', 'start_offset', 'end_offset', 'text')
+
+    def __init__(self, token_type, source, start_offset, end_offset, span=None):
+        self.type = token_type
+        self.source = source
+        self.start_offset = start_offset
+        self.end_offset = end_offset
+        self.text = None
+        self.location = span
+        self.symbol = None
+
+    @property
+    def value(self):
+        if self.text is None:
+            self.text = self.source[self.start_offset:self.end_offset]
+        return self.text
+
+    @value.setter
+    def value(self, value):
+        self.text = value
+
+
+class SymbolTable(object):
+    """
+    Interns the text of identifiers and keywords. Every distinct text is
+    stored once and gets a small integer symbol id, the keywords get the
+    first ids. A symbol table can be shared by many lexers.
+    """
+    def __init__(self, key_word_types=None):
+        self.symbol_ids = {}
+        self.symbols = []
+        self.token_types = []
+        if key_word_types is None:
+            key_word_types = CLexer.KeyWordTypes
+        for word, token_type in sorted(key_word_types.items()):
+            self.add(word, token_type)
+        self.key_word_count = len(self.symbols)
+
+    def add(self, text, token_type):
+        symbol = self.symbol_ids[text] = len(self.symbols)
+        self.symbols.append(text)
+        self.token_types.append(token_type)
+        return symbol
+
+    def intern(self, text):
+        symbol = self.symbol_ids.get(text)
+        if symbol is None:
+            return self.add(text, TokenEnum.ID)
+        return symbol
+
+    def text(self, symbol):
+        return self.symbols[symbol]
+
+    def token_type(self, symbol):
+        return self.token_types[symbol]
+
+
+class LexerStatistics(object):
+    """
+    Counters that an instrumented CLexer updates. Branches counts the hits
+    of the branches of get_next_token and of the trivia skipping, also if
+    the branch fails with an error. Continuation checks counts the
+    backslashes that were checked for a following newline.
+    """
+    def __init__(self):
+        self.token_counts = Counter()
+        self.token_characters = Counter()
+        self.branches = Counter()
+        self.calls = Counter()
+        self.characters = 0
+        self.continuations = 0
+        self.continuation_checks = 0
+
+    def as_dict(self):
+        return {
+            'tokens': dict((token_type.name, count) for token_type, count in self.token_counts.items()),
+            'characters': dict((token_type.name, count) for token_type, count in self.token_characters.items()),
+            'branches': dict(self.branches),
+            'calls': dict(self.calls),
+            'continuation_checks': self.continuation_checks,
+            'continuations': self.continuations}
+
+
 class CLexer(object):
 
     state_plain = 'plain'
@@ -130,7 +264,18 @@ class CLexer(object):
         '&&': TokenEnum.LOGIC_AND,
         '>=': TokenEnum.GREATER_EQUAL,
         '<=': TokenEnum.LESS_EQUAL,
-        '->': TokenEnum.STRUCTURE_DEREFERENCE
+        '->': TokenEnum.STRUCTURE_DEREFERENCE,
+        '!=': TokenEnum.NOT_EQUAL,
+        '<<': TokenEnum.LEFT_SHIFT,
+        '>>': TokenEnum.RIGHT_SHIFT,
+        '&=': TokenEnum.AND_ASSIGN,
+        '|=': TokenEnum.OR_ASSIGN,
+        '^=': TokenEnum.EXOR_ASSIGN
+    }
+
+    TripleToken = {
+        '<<=': TokenEnum.LEFT_SHIFT_ASSIGN,
+        '>>=': TokenEnum.RIGHT_SHIFT_ASSIGN
     }
 
     SingleToken = {
@@ -200,16 +345,47 @@ class CLexer(object):
         'short': TokenEnum.SHORT,
         'case': TokenEnum.CASE,
         'external': TokenEnum.EXTERNAL,
-        'static': TokenEnum.STATIC
+        'static': TokenEnum.STATIC,
+        'sizeof': TokenEnum.SIZEOF
     }
 
-    def __init__(self, character_stream):
+    # Punctuation tokens of a type share one value
+    PunctuationValues = dict((token_type, value) for token_values in (SingleToken, DoubleToken, TripleToken)
+                             for value, token_type in token_values.items())
+
+    # Token types whose value is the unchanged source text, unless a line
+    # continuation was removed
+    SourceTokenTypes = frozenset((TokenEnum.WHITESPACE, TokenEnum.COMMENT, TokenEnum.INTEGER_CONSTANT,
+                                  TokenEnum.PREPROCESSOR_DIRECTIVE, TokenEnum.UNKNOWN))
+
+    def __init__(self, character_stream, symbol_table=None, skip_trivia=False, collect_statistics=False,
+                 typedef_table=None, source=None):
+        """
+        If skip_trivia is set, whitespace and comments are skipped without
+        creating tokens, skipped_trivia counts the skipped characters. If
+        collect_statistics is set, the lexer counts tokens, branches and
+        calls, see stats(). If a typedef table is given, identifiers that
+        it knows as type names are returned as TYPEID tokens. If source is
+        given, it must be the complete text that the character stream
+        delivers, token values are then sliced from it.
+        """
         self.character_stream = character_stream
+        self.source = source
+        self.symbol_table = symbol_table if symbol_table is not None else SymbolTable()
+        self.typedef_table = typedef_table
+        self.skip_trivia = skip_trivia
+        self.skipped_trivia = 0
+        self.statistics = None
+        if collect_statistics:
+            self.instrument()
         self.current_character = None
         self.current_token_elements = []
         self.ignore_continuation = False
+        # Offsets of the last whitespace run and of the character behind it,
+        # see at_line_start()
+        self.whitespace_start = None
+        self.whitespace_end = None
         self.get_next_character()
-        self.waiting_tokens = []
 
     def match_value(self, value):
         if self.current_character:
@@ -218,13 +394,81 @@ class CLexer(object):
             raise Exception('unexpected character "%s", expected "%s"' % (self.current_character.value, value))
         raise Exception('unexpected end of file, expected character "%s"' % value)
 
+    def instrument(self):
+        """
+        Replace the hot methods of this lexer by counting wrappers. The
+        wrappers are only bound to this instance, lexers without statistics
+        do not pay for them. Branch hits and continuation checks are counted
+        where they happen, in get_next_token, skip_trivia_characters and
+        get_next_character.
+        """
+        statistics = self.statistics = LexerStatistics()
+        calls = statistics.calls
+        get_next_token = self.get_next_token
+        get_next_character = self.get_next_character
+        look_ahead = self.look_ahead
+        look_ahead_value = self.look_ahead_value
+
+        def counting_get_next_token():
+            characters, skipped_trivia = statistics.characters, self.skipped_trivia
+            token = get_next_token()
+            if token is not None:
+                statistics.token_counts[token.type] += 1
+                statistics.token_characters[token.type] += \
+                    statistics.characters - characters - (self.skipped_trivia - skipped_trivia)
+            return token
+
+        def counting_get_next_character():
+            statistics.characters += 1
+            return get_next_character()
+
+        def counting_look_ahead(count):
+            calls['look_ahead'] += 1
+            return look_ahead(count)
+
+        def counting_look_ahead_value(count):
+            calls['look_ahead_value'] += 1
+            return look_ahead_value(count)
+
+        self.get_next_token = counting_get_next_token
+        self.get_next_character = counting_get_next_character
+        self.look_ahead = counting_look_ahead
+        self.look_ahead_value = counting_look_ahead_value
+
+    def stats(self):
+        """
+        Return the collected statistics as a dictionary. Token counts and
+        consumed characters are given per token type, characters do not
+        include trivia that was skipped in skip_trivia mode.
+        """
+        if self.statistics is None:
+            raise Exception('statistics are not collected, create the lexer with collect_statistics=True')
+        result = self.statistics.as_dict()
+        result['calls']['get_next_character'] = self.statistics.characters
+        result['skipped_trivia'] = self.skipped_trivia
+        return result
+
     def get_next_character(self):
         self.current_character = self.character_stream.get_next_object()
         if not self.ignore_continuation:
-            # Check for continuation characters and remove them
-            while self.current_character and self.current_character.value == '\\' and self.look_ahead_value(1) == '\n':
-                self.current_character = self.character_stream.get_next_object()
-                self.current_character = self.character_stream.get_next_object()
+            return self.remove_continuations()
+        return self.current_character
+
+    def remove_continuations(self):
+        """
+        Skip the line continuations that start at the current character,
+        return the new current character.
+        """
+        # Check for continuation characters and remove them
+        while self.current_character and self.current_character.value == '\\':
+            if self.statistics is not None:
+                self.statistics.continuation_checks += 1
+            if self.look_ahead_value(1) != '\n':
+                break
+            if self.statistics is not None:
+                self.statistics.continuations += 1
+            self.current_character = self.character_stream.get_next_object()
+            self.current_character = self.character_stream.get_next_object()
         return self.current_character
 
     def get_next_value(self):
@@ -253,9 +497,25 @@ class CLexer(object):
             while self.current_value() in string.whitespace:
                 self.current_token_elements.append(self.current_character)
                 self.get_next_character()
+            self.whitespace_start = self.current_token_elements[0].offset
+            self.whitespace_end = self.current_token_elements[-1].offset + 1
             return self.create_token(TokenEnum.WHITESPACE)
         return None
 
+    def at_line_start(self):
+        """
+        Return True if only whitespace is in front of the current character
+        on its line, i.e. if a '#' there starts a directive. Line
+        continuations end a line here.
+        """
+        character = self.current_character
+        column = character.coordinate.column
+        if column == 1:
+            return True
+        # The run in front of the character has to start in an earlier line
+        # or in the first column
+        return self.whitespace_end == character.offset and self.whitespace_start <= character.offset - column + 1
+
     def skip_inline_whitespace(self):
         if self.current_value() in string.whitespace and self.current_value() != '\n':
             self.current_token_elements = []
@@ -265,72 +525,343 @@ class CLexer(object):
             return self.create_token(TokenEnum.WHITESPACE)
         return None
 
-    def create_token(self, token_type, start_coordinate=None, end_coordinate=None):
-        if start_coordinate is None:
-            start_coordinate = self.current_token_elements[0].coordinate
-        if end_coordinate is None:
-            end_coordinate = self.current_token_elements[-1].coordinate
-        return Token(token_type, ''.join([x.value for x in self.current_token_elements]), Span(
-            start_coordinate, end_coordinate))
+    def skip_trivia_characters(self, value):
+        """
+        Skip whitespace and comments in place, returns the value of the first
+        character behind them.
+        """
+        if self.source is not None and self.current_character is not None:
+            return self.skip_source_trivia()
+        get_next_character = self.get_next_character
+        current_value = self.current_value
+        whitespace = string.whitespace
+        branches = self.statistics.branches if self.statistics is not None else None
+        skipped = 0
+        while True:
+            if value in whitespace:
+                if branches is not None:
+                    branches['skipped_whitespace'] += 1
+                self.whitespace_start = self.current_character.offset
+                while value in whitespace:
+                    get_next_character()
+                    value = current_value()
+                    skipped += 1
+                if self.current_character is not None:
+                    self.whitespace_end = self.current_character.offset
+            elif value == '/' and self.look_ahead_value(1) == '*':
+                if branches is not None:
+                    branches['skipped_block_comment'] += 1
+                self.ignore_continuation = True
+                get_next_character()
+                get_next_character()
+                value = current_value()
+                skipped += 2
+                while not (value == '*' and self.look_ahead_value(1) == '/'):
+                    if value == EndMarker:
+                        self.ignore_continuation = False
+                        raise Exception('end of file in block comment')
+                    get_next_character()
+                    value = current_value()
+                    skipped += 1
+                get_next_character()
+                get_next_character()
+                self.ignore_continuation = False
+                value = current_value()
+                skipped += 2
+            elif value == '/' and self.look_ahead_value(1) == '/':
+                if branches is not None:
+                    branches['skipped_line_comment'] += 1
+                self.ignore_continuation = True
+                get_next_character()
+                get_next_character()
+                value = current_value()
+                skipped += 2
+                while value != '\n':
+                    if value == EndMarker:
+                        self.ignore_continuation = False
+                        raise Exception('end of file in line comment')
+                    get_next_character()
+                    value = current_value()
+                    skipped += 1
+                self.ignore_continuation = False
+            else:
+                self.skipped_trivia += skipped
+                return value
+
+    def skip_source_trivia(self):
+        """
+        Like skip_trivia_characters(), but whole runs of whitespace and
+        comments are found in the source string and the character stream
+        skips them at once.
+        """
+        source = self.source
+        whitespace = string.whitespace
+        branches = self.statistics.branches if self.statistics is not None else None
+        start = position = self.current_character.offset
+        skipped = 0
+        while True:
+            if position < len(source) and source[position] in whitespace:
+                if branches is not None:
+                    branches['skipped_whitespace'] += 1
+                end = WhitespaceRunPattern.match(source, position).end()
+                self.whitespace_start, self.whitespace_end = position, end
+                # Removed continuations do not count as skipped characters
+                skipped += end - position - 2 * source.count('\\\n', position, end)
+                position = end
+            elif source.startswith('/*', position):
+                if branches is not None:
+                    branches['skipped_block_comment'] += 1
+                end = source.find('*/', position + 2)
+                if end < 0:
+                    raise Exception('end of file in block comment')
+                skipped += end + 2 - position
+                position = end + 2
+            elif source.startswith('//', position):
+                if branches is not None:
+                    branches['skipped_line_comment'] += 1
+                end = source.find('\n', position + 2)
+                if end < 0:
+                    raise Exception('end of file in line comment')
+                skipped += end - position
+                position = end
+            else:
+                break
+        if position > start:
+            self.current_character = self.character_stream.skip_objects(position - start)
+        self.skipped_trivia += skipped
+        return self.current_value()
+
+    def create_span(self, start_character, end_character):
+        if start_character.line_index is None:
+            return Span(start_character.coordinate, end_character.coordinate)
+        return OffsetSpan(start_character.line_index, start_character.offset, end_character.offset)
+
+    def token_text(self):
+        """
+        Return the text of the current token elements. It is sliced from the
+        source if the elements are contiguous, i.e. no line continuation was
+        removed.
+        """
+        elements = self.current_token_elements
+        if self.source is not None and elements[-1].offset - elements[0].offset + 1 == len(elements):
+            return self.source[elements[0].offset:elements[-1].offset + 1]
+        return ''.join([x.value for x in elements])
+
+    def create_token(self, token_type, start_character=None, end_character=None):
+        elements = self.current_token_elements
+        if start_character is None:
+            start_character = elements[0]
+        if end_character is None:
+            end_character = elements[-1]
+        span = self.create_span(start_character, end_character)
+        value = self.PunctuationValues.get(token_type)
+        if value is not None:
+            return Token(token_type, value, span)
+        if token_type in self.SourceTokenTypes and self.source is not None and elements and \
+                elements[-1].offset - elements[0].offset + 1 == len(elements):
+            return SourceToken(token_type, self.source, elements[0].offset, elements[-1].offset + 1, span)
+        return Token(token_type, ''.join([x.value for x in elements]), span)
+
+    def create_word_token(self, word):
+        symbol = self.symbol_table.intern(word)
+        token_type = self.symbol_table.token_types[symbol]
+        if self.typedef_table is not None and token_type is TokenEnum.ID and self.typedef_table.is_type(word):
+            token_type = TokenEnum.TYPEID
+        return Token(token_type, self.symbol_table.symbols[symbol], self.create_span(
+            self.current_token_elements[0], self.current_token_elements[-1]), symbol)
+
+    def __iter__(self):
+        return self.iter_tokens()
+
+    def iter_tokens(self):
+        """
+        Generate the remaining tokens of the input. Whitespace, words, numbers
+        and operators are scanned here with the lexer state bound to local
+        variables, the rare token kinds are read by get_next_token. Lexers
+        that collect statistics generate the tokens of get_next_token, in
+        order to count all of them.
+        """
+        get_next_token = self.get_next_token
+        if self.statistics is not None:
+            token = get_next_token()
+            while token is not None:
+                yield token
+                token = get_next_token()
+            return
+
+        # Characters are read from the stream directly, continuations are
+        # only looked for at backslashes
+        next_character = self.character_stream.get_next_object
+        remove_continuations = self.remove_continuations
+        get_next_character = self.get_next_character
+        look_ahead_value = self.look_ahead_value
+        skip_trivia_characters = self.skip_trivia_characters if self.skip_trivia else None
+        create_token = self.create_token
+        create_span = self.create_span
+        create_word_token = self.create_word_token
+        token_text = self.token_text
+        whitespace = string.whitespace
+        digits = string.digits
+        single_tokens, double_tokens, triple_tokens = CLexer.SingleToken, CLexer.DoubleToken, CLexer.TripleToken
+        punctuation_values = CLexer.PunctuationValues
+        while True:
+            # The consumer may have called get_next_token in between
+            character = self.current_character
+            value = character.value if character is not None else EndMarker
+            if skip_trivia_characters is not None:
+                value = skip_trivia_characters(value)
+                character = self.current_character
+
+            if value in whitespace:
+                characters = whitespace
+            elif value in WordStarter:
+                characters = WordContinuation
+            elif value in digits:
+                characters = digits
+            else:
+                characters = None
+
+            if characters is not None:
+                elements = [character]
+                character = next_character()
+                while True:
+                    if character is not None and character.value == '\\':
+                        self.current_character = character
+                        character = remove_continuations()
+                    if character is None or character.value not in characters:
+                        break
+                    elements.append(character)
+                    character = next_character()
+                self.current_character = character
+                self.current_token_elements = elements
+                if characters is WordContinuation:
+                    yield create_word_token(token_text())
+                elif characters is whitespace:
+                    self.whitespace_start = elements[0].offset
+                    self.whitespace_end = elements[-1].offset + 1
+                    yield create_token(TokenEnum.WHITESPACE)
+                else:
+                    yield create_token(TokenEnum.INTEGER_CONSTANT)
+
+            elif value in single_tokens and value != '/':
+                # All double and triple character operators start with a
+                # single character operator
+                next_value = look_ahead_value(1)
+                double_value = value + next_value if next_value else None
+                if double_value in double_tokens:
+                    if double_value + '=' in triple_tokens and look_ahead_value(2) == '=':
+                        elements = [character, get_next_character(), get_next_character()]
+                        token_type = triple_tokens[double_value + '=']
+                    else:
+                        elements = [character, get_next_character()]
+                        token_type = double_tokens[double_value]
+                else:
+                    elements = [character]
+                    token_type = single_tokens[value]
+                get_next_character()
+                self.current_token_elements = elements
+                yield Token(token_type, punctuation_values[token_type], create_span(elements[0], elements[-1]))
+
+            elif value == EndMarker:
+                return
+
+            else:
+                # Directives, comments, constants, '/' and unknown characters
+                yield get_next_token()
 
     def get_next_token(self):
-        if self.waiting_tokens:
-            return self.waiting_tokens.pop(0)
+        # Branch hit counts, only collected by instrumented lexers
+        branches = self.statistics.branches if self.statistics is not None else None
+        value = self.current_value()
+        if self.skip_trivia:
+            value = self.skip_trivia_characters(value)
 
         # Eat whitespace
-        token = self.skip_whitespace()
-        if token:
-            return token
+        if value in string.whitespace:
+            if branches is not None:
+                branches['whitespace'] += 1
+            return self.skip_whitespace()
 
         # Check preprocessor commands
-        if self.current_value() == '#' and self.current_character.coordinate.column == 1:
+        if value == '#' and self.at_line_start():
+            if branches is not None:
+                branches['preprocessor_directive'] += 1
             return self.read_preprocessor_directive()
         # Check comments
-        if self.current_value() == '/' and self.look_ahead_value(1) == '*':
-            return self.read_block_comment()
-        if self.current_value() == '/' and self.look_ahead_value(1) == '/':
-            return self.read_line_comment()
+        if value == '/':
+            next_value = self.look_ahead_value(1)
+            if next_value == '*':
+                if branches is not None:
+                    branches['block_comment'] += 1
+                return self.read_block_comment()
+            if next_value == '/':
+                if branches is not None:
+                    branches['line_comment'] += 1
+                return self.read_line_comment()
 
         # Check identifier and keywords
-        if self.current_value() in WordStarter:
+        if value in WordStarter:
+            if branches is not None:
+                branches['word'] += 1
             self.current_token_elements = [self.current_character]
             while self.get_next_value() in WordContinuation:
                 self.current_token_elements.append(self.current_character)
-            word = ''.join(x.value for x in self.current_token_elements)
-            return self.create_token(self.KeyWordTypes.get(word, TokenEnum.ID))
+            return self.create_word_token(self.token_text())
 
         # Check numbers
-        if self.current_value() in string.digits:
+        if value in string.digits:
+            if branches is not None:
+                branches['number'] += 1
             self.current_token_elements = [self.current_character]
             while self.get_next_value() in string.digits:
                 self.current_token_elements.append(self.current_character)
             return self.create_token(TokenEnum.INTEGER_CONSTANT)
 
         # Check strings
-        if self.current_value() == '"':
+        if value == '"':
+            if branches is not None:
+                branches['string'] += 1
             return self.read_string_constant()
 
         # Check chars
-        if self.current_value() == '\'':
+        if value == '\'':
+            if branches is not None:
+                branches['character'] += 1
             return self.read_character_constant()
 
         # Check double and single character token
-        if self.look_ahead_value(1):
-            double_value = self.current_value() + self.look_ahead_value(1)
+        next_value = self.look_ahead_value(1)
+        if next_value:
+            double_value = value + next_value
             if double_value in CLexer.DoubleToken:
+                if self.look_ahead_value(2) == '=' and double_value + '=' in CLexer.TripleToken:
+                    if branches is not None:
+                        branches['triple_character'] += 1
+                    self.current_token_elements = [self.current_character, self.get_next_character(),
+                                                   self.get_next_character()]
+                    self.get_next_character()
+                    return self.create_token(CLexer.TripleToken[double_value + '='])
+                if branches is not None:
+                    branches['double_character'] += 1
                 self.current_token_elements = [self.current_character, self.get_next_character()]
                 self.get_next_character()
                 return self.create_token(CLexer.DoubleToken[double_value])
-        if self.current_value() in CLexer.SingleToken:
-            self.current_token_elements, key = [self.current_character], self.current_value()
+        if value in CLexer.SingleToken:
+            if branches is not None:
+                branches['single_character'] += 1
+            self.current_token_elements = [self.current_character]
             self.get_next_character()
-            return self.create_token(CLexer.SingleToken[key])
+            return self.create_token(CLexer.SingleToken[value])
 
         # Check for end
-        if self.current_value() == EndMarker:
+        if value == EndMarker:
+            if branches is not None:
+                branches['end'] += 1
             return None
 
         # Unknown token
+        if branches is not None:
+            branches['unknown'] += 1
         self.current_token_elements = [self.current_character]
         self.get_next_character()
         return self.create_token(TokenEnum.UNKNOWN)
@@ -348,22 +879,24 @@ class CLexer(object):
     def read_preprocessor_directive(self):
         """
         Read a preprocessor directive, assumes we are already on the '#'.
+        The directive is returned as a single token, its value is the rest
+        of the line without the '#' and the whitespace that follows it.
         """
-        if self.current_character:
-            if self.current_character.value == "#":
-                current_token = self.create_token(TokenEnum.NUMBER_SIGN)
-            else:
-                raise Exception('unexpected character "%s", expected "%s"' % (self.current_character.value, value))
-        else:
-            raise Exception('unexpected end of file, expected character "%s"' % value)
-
-        self.waiting_tokens.append(self.skip_inline_whitespace())
-        self.current_token_elements = self.read_word()
+        if self.current_character is None:
+            raise Exception('unexpected end of file, expected character "#"')
+        if self.current_character.value != '#':
+            raise Exception('unexpected character "%s", expected "#"' % self.current_character.value)
+        start_character = end_character = self.current_character
+        self.get_next_character()
+        while self.current_value() in string.whitespace and self.current_value() != '\n':
+            self.get_next_character()
+        self.current_token_elements = []
         while self.current_value() != '\n' and self.current_value() != EndMarker:
             self.current_token_elements.append(self.current_character)
             self.get_next_character()
-        self.waiting_tokens.append(self.create_token(TokenEnum.PREPROCESSOR_DIRECTIVE))
-        return current_token
+        if self.current_token_elements:
+            end_character = self.current_token_elements[-1]
+        return self.create_token(TokenEnum.PREPROCESSOR_DIRECTIVE, start_character, end_character)
 
     def read_block_comment(self):
         self.ignore_continuation = True
@@ -440,7 +973,7 @@ class CLexer(object):
 
     def read_string_constant(self):
         self.current_token_elements = []
-        start_coordinate = self.current_character.coordinate
+        start_character = self.current_character
         while self.get_next_value() != '"':
             if self.current_value() in ('\n', EndMarker):
                 raise Exception('string terminated by new line or end of file')
@@ -448,12 +981,12 @@ class CLexer(object):
                 self.read_escape_sequence()
             else:
                 self.current_token_elements.append(self.current_character)
-        end_coordinate = self.current_character.coordinate
+        end_character = self.current_character
         self.get_next_character()
-        return self.create_token(TokenEnum.STRING_CONSTANT, start_coordinate, end_coordinate)
+        return self.create_token(TokenEnum.STRING_CONSTANT, start_character, end_character)
 
     def read_character_constant(self):
-        start_coordinate = self.current_character.coordinate
+        start_character = self.current_character
         self.get_next_character()
         self.current_token_elements = []
         if self.current_value() == '\\':
@@ -464,20 +997,20 @@ class CLexer(object):
         if self.current_value() != '\'':
             raise Exception('unterminated string constant:')
         # skip the end tick
-        end_coordinate = self.current_character.coordinate
+        end_character = self.current_character
         self.get_next_character()
-        return self.create_token(TokenEnum.CHARACTER_CONSTANT, start_coordinate, end_coordinate)
+        return self.create_token(TokenEnum.CHARACTER_CONSTANT, start_character, end_character)
 
 
 if __name__ == '__main__':
     import sys
-    from character_input import FileCharacterInput
+    from character_input import FileCharacterInput, MappedFileCharacterInput
     from object_stream import ObjectStream
 
-    input_stream = ObjectStream(FileCharacterInput(sys.stdin, '<stdin>'))
-    lexer = CLexer(input_stream)
-    token = lexer.get_next_token()
-    while token is not None:
+    if len(sys.argv) > 1:
+        input_stream = ObjectStream(MappedFileCharacterInput(sys.argv[1]))
+    else:
+        input_stream = ObjectStream(FileCharacterInput(sys.stdin, '<stdin>'))
+    for token in CLexer(input_stream):
         sys.stderr.write(f"{token}\n")
         sys.stdout.write(token.value)
-        token = lexer.get_next_token()
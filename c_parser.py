@@ -315,16 +315,174 @@ from c_lexer import *
 import ast
 
 
+TypeSpecifierTokens = frozenset([
+    TokenEnum.EXTERNAL, TokenEnum.STATIC, TokenEnum.TYPEDEF,
+    TokenEnum.CONST,
+    TokenEnum.SIGNED, TokenEnum.UNSIGNED,
+    TokenEnum.CHAR, TokenEnum.SHORT, TokenEnum.INT, TokenEnum.LONG])
+# A typedef name is only a type specifier if none of these came before it
+BasicTypeTokens = frozenset([
+    TokenEnum.SIGNED, TokenEnum.UNSIGNED,
+    TokenEnum.CHAR, TokenEnum.SHORT, TokenEnum.INT, TokenEnum.LONG])
+
+# Precedence of the operators of assignment, conditional and binary
+# expressions, higher numbers bind stronger. Unary and postfix operators bind
+# stronger than all of them.
+AssignmentPrecedence = 1
+ConditionalPrecedence = 2
+UnaryPrecedence = 13
+PostfixPrecedence = 14
+PrimaryPrecedence = 15
+ExpressionPrecedence = {
+    TokenEnum.ASSIGN: AssignmentPrecedence,
+    TokenEnum.TIMES_ASSIGN: AssignmentPrecedence,
+    TokenEnum.DIVIDE_ASSIGN: AssignmentPrecedence,
+    TokenEnum.MODULE_ASSIGN: AssignmentPrecedence,
+    TokenEnum.PLUS_ASSIGN: AssignmentPrecedence,
+    TokenEnum.MINUS_ASSIGN: AssignmentPrecedence,
+    TokenEnum.LEFT_SHIFT_ASSIGN: AssignmentPrecedence,
+    TokenEnum.RIGHT_SHIFT_ASSIGN: AssignmentPrecedence,
+    TokenEnum.AND_ASSIGN: AssignmentPrecedence,
+    TokenEnum.EXOR_ASSIGN: AssignmentPrecedence,
+    TokenEnum.OR_ASSIGN: AssignmentPrecedence,
+    TokenEnum.QUESTION_MARK: ConditionalPrecedence,
+    TokenEnum.LOGIC_OR: 3,
+    TokenEnum.LOGIC_AND: 4,
+    TokenEnum.OR: 5,
+    TokenEnum.EXOR: 6,
+    TokenEnum.AND: 7,
+    TokenEnum.EQUAL: 8,
+    TokenEnum.NOT_EQUAL: 8,
+    TokenEnum.LESS: 9,
+    TokenEnum.GREATER: 9,
+    TokenEnum.LESS_EQUAL: 9,
+    TokenEnum.GREATER_EQUAL: 9,
+    TokenEnum.LEFT_SHIFT: 10,
+    TokenEnum.RIGHT_SHIFT: 10,
+    TokenEnum.PLUS: 11,
+    TokenEnum.MINUS: 11,
+    TokenEnum.TIMES: 12,
+    TokenEnum.DEVIDE: 12,
+    TokenEnum.MODULE: 12
+}
+AssignmentOperators = frozenset([
+    TokenEnum.ASSIGN, TokenEnum.TIMES_ASSIGN, TokenEnum.DIVIDE_ASSIGN, TokenEnum.MODULE_ASSIGN,
+    TokenEnum.PLUS_ASSIGN, TokenEnum.MINUS_ASSIGN, TokenEnum.LEFT_SHIFT_ASSIGN, TokenEnum.RIGHT_SHIFT_ASSIGN,
+    TokenEnum.AND_ASSIGN, TokenEnum.EXOR_ASSIGN, TokenEnum.OR_ASSIGN])
+# Operators of ExpressionPrecedence that group from right to left, all others
+# group from left to right
+RightAssociativeOperators = AssignmentOperators | frozenset([TokenEnum.QUESTION_MARK])
+PostfixOperators = frozenset([
+    TokenEnum.LEFT_BRACKET, TokenEnum.LEFT_PARENTHESIS, TokenEnum.DOT, TokenEnum.STRUCTURE_DEREFERENCE,
+    TokenEnum.INCREMENT, TokenEnum.DECREMENT])
+UnaryOperators = frozenset([
+    TokenEnum.AND, TokenEnum.TIMES, TokenEnum.PLUS, TokenEnum.MINUS, TokenEnum.INVERT, TokenEnum.NOT,
+    TokenEnum.INCREMENT, TokenEnum.DECREMENT])
+ConstantTypes = {
+    TokenEnum.INTEGER_CONSTANT: 'integer',
+    TokenEnum.CHARACTER_CONSTANT: 'character',
+    TokenEnum.STRING_CONSTANT: 'string'
+}
+
+# Entries of the operator stack of CParser.binary_expression()
+GroupFrame = 0
+PrefixFrame = 1
+CastFrame = 2
+BinaryFrame = 3
+ConditionalFrame = 4
+AssignmentFrame = 5
+
+
+def reduce_operators(operators, operand, precedence, right_associative=False):
+    """
+    Apply the operators on top of the stack that bind more strongly than an
+    operator of the given precedence to operand and return the result.
+    Operators of the same precedence are applied too, unless the operator
+    is right associative. Groups are never applied.
+    """
+    while operators:
+        frame = operators[-1]
+        kind = frame[0]
+        if kind == GroupFrame or frame[1] < precedence or (frame[1] == precedence and right_associative):
+            break
+        operators.pop()
+        if kind == BinaryFrame:
+            operand = ast.BinaryOperation(frame[2], frame[3], operand)
+        elif kind == AssignmentFrame:
+            operand = ast.Assignment(frame[2], frame[3], operand)
+        elif kind == PrefixFrame:
+            operand = ast.UnaryOperation(frame[2], operand)
+        elif kind == CastFrame:
+            operand = ast.Cast(frame[2], frame[3], operand)
+        else:
+            operand = ast.Conditional(frame[2], frame[3], operand)
+    return operand
+
+
 class CParserError(object):
     pass
 
 
+class TypedefTable(object):
+    """
+    A scoped table of typedef names. names maps every name that is, or was,
+    a typedef name to True if it currently is a type name and to False if it
+    is hidden by an ordinary identifier. Every change inside a scope is
+    recorded in an undo log, push_scope() remembers the length of the log and
+    pop_scope() undoes the changes that were made since then. Changes at file
+    scope are never undone and are not logged. If file_scope_changes is a
+    list, the names that are changed at file scope are appended to it. Lookups
+    are dictionary lookups, push_scope() is constant time and pop_scope() is
+    linear in the number of changes in the scope.
+    """
+    Missing = object()
+
+    def __init__(self):
+        self.names = {}
+        self.undo_log = []
+        self.scope_marks = []
+        self.file_scope_changes = None
+
+    def is_type(self, name):
+        return self.names.get(name, False)
+
+    def set(self, name, is_type):
+        if self.scope_marks:
+            self.undo_log.append((name, self.names.get(name, self.Missing)))
+        elif self.file_scope_changes is not None:
+            self.file_scope_changes.append(name)
+        self.names[name] = is_type
+
+    def add_type(self, name):
+        self.set(name, True)
+
+    def add_identifier(self, name):
+        # Ordinary identifiers only have to be recorded if they hide a type
+        if self.names.get(name, False):
+            self.set(name, False)
+
+    def push_scope(self):
+        self.scope_marks.append(len(self.undo_log))
+
+    def pop_scope(self):
+        mark = self.scope_marks.pop()
+        while len(self.undo_log) > mark:
+            name, previous = self.undo_log.pop()
+            if previous is self.Missing:
+                del self.names[name]
+            else:
+                self.names[name] = previous
+
+
 class CParser(object):
-    def __init__(self, token_stream):
+    def __init__(self, token_stream, type_table=None, typedef_table=None):
         self.token_stream = token_stream
+        self.type_table = type_table
+        self.typedef_table = typedef_table if typedef_table is not None else TypedefTable()
         self.current_token = None
         self.error = None
         self.name = ''
+        self.trivia = (TokenEnum.WHITESPACE, TokenEnum.COMMENT)
         self.first_token = {
             'preprocessor_directive': [TokenEnum.PREPROCESSOR_DIRECTIVE],
             'declaration': [TokenEnum.INT, TokenEnum.LONG, TokenEnum.CHAR, TokenEnum.SHORT],
@@ -341,6 +499,8 @@ class CParser(object):
 
     def get_next_token(self):
         self.current_token = self.token_stream.get_next_token()
+        while self.current_token is not None and self.current_token.type in self.trivia:
+            self.current_token = self.token_stream.get_next_token()
         return self.current_token
 
     def match_token(self, expected_token_type):
@@ -361,6 +521,10 @@ class CParser(object):
                 self.error = 'expected token %s, got end of file' % str(expected_token_type)
                 return False
 
+    def expect_token(self, expected_token_type):
+        if not self.match_token(expected_token_type):
+            raise Exception(self.error)
+
     def token_equals(self, compared_type):
         if self.current_token is None:
             return compared_type is None
@@ -369,14 +533,21 @@ class CParser(object):
 
     def parse(self):
         self.get_next_token()
-        self.translation_unit()
+        return self.translation_unit()
 
     def translation_unit(self):
+        """
+        translation_unit := { external_declaration }
+        """
+        result = []
         while self.current_token is not None:
-            self.external_declaration()
+            declaration = self.external_declaration()
+            if declaration is not None:
+                result.append(declaration)
+        return result
 
     def external_declaration(self):
-        if self.current_token in self.first_token['preprocessor_directive']:
+        if self.current_token.type in self.first_token['preprocessor_directive']:
             return self.preprocessor_directive()
         elif self.token_equals(TokenEnum.COMMENT):
             self.get_next_token()
@@ -388,7 +559,13 @@ class CParser(object):
             return self.declaration_or_definition()
 
     def declaration_or_definition(self):
-        pass
+        """
+        declaration_or_definition := declaration_list ';'
+        """
+        type_spec, variable_spec_list, initializer_list = self.init_declarator_list()
+        if not self.match_token(TokenEnum.SEMICOLON):
+            raise Exception(self.error)
+        return ast.DeclarationList(type_spec, variable_spec_list, initializer_list)
 
     def function_definition(self):
         pass
@@ -398,8 +575,15 @@ class CParser(object):
 
     def build_declaration_ast(self, modifier_spec):
         """
-        Converts a list into an AST
+        Converts a list into an AST. If the parser has a type table, the
+        canonical node for the type is returned.
         """
+        result = self.build_modifier_chain(modifier_spec)
+        if self.type_table is not None:
+            return self.type_table.intern(result)
+        return result
+
+    def build_modifier_chain(self, modifier_spec):
         if not modifier_spec:
             return None
         if len(modifier_spec) == 1:
@@ -427,63 +611,114 @@ class CParser(object):
         """
         declaration_list := type_specifier pointer_specifier { ',' pointer_specifier }
         """
+        type_spec, variable_spec_list, _ = self.init_declarator_list()
+        return type_spec, variable_spec_list
+
+    def init_declarator_list(self):
+        """
+        init_declarator_list := type_specifier init_declarator { ',' init_declarator }
+        init_declarator := pointer_specifier [ '=' initializer ]
+        """
         type_spec = self.type_specifier()
+        is_typedef = 'typedef' in type_spec.type_name.split(' ')
         variable_spec_list = []
+        initializer_list = []
         while True:
             modifier_spec = self.pointer_specifier()
+            # The name is in scope at the end of its declarator
+            self.declare_name(modifier_spec[0].name, is_typedef)
             variable_spec_list.append((modifier_spec[0], self.build_declaration_ast(modifier_spec[1:])))
+            if self.token_equals(TokenEnum.ASSIGN):
+                self.get_next_token()
+                initializer_list.append(self.initializer())
+            else:
+                initializer_list.append(None)
             if self.token_equals(TokenEnum.COMMA):
                 self.get_next_token()
                 continue
             break
-        return type_spec, variable_spec_list
+        return type_spec, variable_spec_list, initializer_list
 
     def type_specifier(self):
         """
         type_specifier := TOKEN_
         """
-        result = ''
-        while self.current_token.type in (
-                TokenEnum.EXTERNAL, TokenEnum.STATIC,
-                TokenEnum.CONST,
-                TokenEnum.SIGNED, TokenEnum.UNSIGNED,
-                TokenEnum.CHAR, TokenEnum.SHORT, TokenEnum.INT, TokenEnum.LONG):
-            result += self.current_token.value
+        result = []
+        has_type = False
+        while self.current_token is not None:
+            token = self.current_token
+            if token.type in TypeSpecifierTokens:
+                has_type = has_type or token.type in BasicTypeTokens
+            elif not has_type and self.is_type_name(token):
+                has_type = True
+            else:
+                break
+            result.append(token.value)
             self.get_next_token()
-        return ast.BasicType(result, None)
+        return ast.BasicType(' '.join(result), None)
+
+    def is_type_name(self, token):
+        if token.type == TokenEnum.TYPEID:
+            return True
+        return token.type == TokenEnum.ID and self.typedef_table.is_type(token.value)
+
+    def starts_type_name(self, token):
+        return token is not None and (token.type in TypeSpecifierTokens or self.is_type_name(token))
+
+    def declare_name(self, name, is_typedef):
+        if name is None:
+            return
+        if is_typedef:
+            self.typedef_table.add_type(name)
+        else:
+            self.typedef_table.add_identifier(name)
 
     def pointer_specifier(self):
-        if self.token_equals(TokenEnum.TIMES):
+        """
+        pointer_specifier := { '*' } variable_specifier
+        variable_specifier := name_specifier [ parameter_list ] { '[' [ assignment_expression ] ']' }
+        name_specifier := '(' pointer_specifier ')' | [ ID ]
+
+        Returns the identifier followed by the modifiers from the innermost
+        to the outermost one. Nested declarators are parsed with an explicit
+        stack of pointer counts, one entry per parenthesized level.
+        """
+        pointer_counts = []
+        while True:
+            pointer_count = 0
+            while self.token_equals(TokenEnum.TIMES):
+                self.get_next_token()
+                pointer_count += 1
+            pointer_counts.append(pointer_count)
+            if not self.token_equals(TokenEnum.LEFT_PARENTHESIS):
+                break
             self.get_next_token()
-            result = self.pointer_specifier()
-            result.append(ast.Pointer(None, None))
-        else:
-            result = self.variable_specifier()
-        return result
+        result = [self.name_specifier()]
+        while True:
+            self.variable_suffixes(result)
+            result.extend(ast.Pointer(None, None) for _ in range(pointer_counts.pop()))
+            if not pointer_counts:
+                return result
+            self.match_token(TokenEnum.RIGHT_PARENTHESIS)
 
-    def variable_specifier(self):
-        result = self.name_specifier()
+    def variable_suffixes(self, result):
         if self.token_equals(TokenEnum.LEFT_PARENTHESIS):
             parameter = self.parameter_list()
             result.append(ast.Function(None, parameter, None, None))
-        if self.token_equals(TokenEnum.LEFT_BRACKET):
-            while self.token_equals(TokenEnum.LEFT_BRACKET):
-                self.match_token(TokenEnum.LEFT_BRACKET)
-                result.append(ast.ArrayDeclaration(None, None, None))
-                self.match_token(TokenEnum.RIGHT_BRACKET)
-        return result
+        while self.token_equals(TokenEnum.LEFT_BRACKET):
+            self.match_token(TokenEnum.LEFT_BRACKET)
+            size = None
+            if not self.token_equals(TokenEnum.RIGHT_BRACKET):
+                size = self.assignment_expression()
+            result.append(ast.ArrayDeclaration(None, size, None))
+            self.match_token(TokenEnum.RIGHT_BRACKET)
 
     def name_specifier(self):
-        if self.token_equals(TokenEnum.LEFT_PARENTHESIS):
-            self.get_next_token()
-            result = self.pointer_specifier()
-            self.match_token(TokenEnum.RIGHT_PARENTHESIS)
-        elif self.token_equals(TokenEnum.ID):
-            result = [ast.Identifier(self.current_token.value)]
+        if self.token_equals(TokenEnum.ID) or self.token_equals(TokenEnum.TYPEID):
+            result = ast.Identifier(self.current_token.value)
             self.get_next_token()
-        else:
-            result = [ast.Identifier(None)]
-        return result
+            return result
+        return ast.Identifier(None)
 
     def parameter_list(self):
         """
@@ -494,15 +729,219 @@ class CParser(object):
         if self.token_equals(TokenEnum.RIGHT_PARENTHESIS):
             self.match_token(TokenEnum.RIGHT_PARENTHESIS)
             return result
-        result.append(self.declaration())
-        while self.token_equals(TokenEnum.COMMA):
-            self.get_next_token()
+        # Parameter names hide typedef names until the end of the parameter list
+        self.typedef_table.push_scope()
+        try:
             result.append(self.declaration())
+            self.declare_name(result[-1][1].name, False)
+            while self.token_equals(TokenEnum.COMMA):
+                self.get_next_token()
+                result.append(self.declaration())
+                self.declare_name(result[-1][1].name, False)
+        finally:
+            self.typedef_table.pop_scope()
         self.match_token(TokenEnum.RIGHT_PARENTHESIS)
         return result
 
+    def initializer(self):
+        """
+        initializer := assignment_expression | '{' initializer { ',' initializer } [ ',' ] '}'
+
+        Nested initializer lists are collected on an explicit stack.
+        """
+        if not self.token_equals(TokenEnum.LEFT_BRACE):
+            return self.assignment_expression()
+        self.get_next_token()
+        lists = [[]]
+        while True:
+            # At the start of an initializer or at the closing brace of a list
+            if self.token_equals(TokenEnum.LEFT_BRACE):
+                self.get_next_token()
+                lists.append([])
+                continue
+            if not self.token_equals(TokenEnum.RIGHT_BRACE):
+                lists[-1].append(self.assignment_expression())
+                if self.token_equals(TokenEnum.COMMA):
+                    self.get_next_token()
+                    continue
+            # Close lists until one of them continues after a comma
+            while True:
+                self.expect_token(TokenEnum.RIGHT_BRACE)
+                initializer_list = ast.InitializerList(lists.pop())
+                if not lists:
+                    return initializer_list
+                lists[-1].append(initializer_list)
+                if self.token_equals(TokenEnum.COMMA):
+                    self.get_next_token()
+                    break
+
+    def expression(self):
+        """
+        expression := assignment_expression { ',' assignment_expression }
+        """
+        return self.binary_expression(AssignmentPrecedence, True)
+
+    def assignment_expression(self):
+        return self.binary_expression(AssignmentPrecedence)
+
+    def constant_expression(self):
+        return self.binary_expression(ConditionalPrecedence)
+
+    def binary_expression(self, minimal_precedence, expression_list=False):
+        """
+        Parse an expression whose operators have at least minimal_precedence,
+        if expression_list is set, comma separated expressions give an
+        ExpressionList.
+
+        This is an operator precedence parser with an explicit operator
+        stack. Binary operators, prefix operators and casts wait on the stack
+        together with their left operand until an operator that binds less
+        strongly arrives. '(', '[', the arguments of a function call and the
+        part between '?' and ':' open a group on the stack that ends with
+        its closing token. Nesting therefore costs no Python stack frames.
+        """
+        operators = []
+        groups = 0
+        items = []
+        while True:
+            # Prefix operators, casts and group openers until a primary expression
+            token = self.current_token
+            if token is None:
+                raise Exception('expected expression, got end of file')
+            if token.type in UnaryOperators:
+                self.get_next_token()
+                operators.append((PrefixFrame, UnaryPrecedence, token.value))
+                continue
+            if token.type == TokenEnum.LEFT_PARENTHESIS or token.type == TokenEnum.SIZEOF:
+                self.get_next_token()
+                if token.type == TokenEnum.SIZEOF:
+                    if not self.token_equals(TokenEnum.LEFT_PARENTHESIS):
+                        operators.append((PrefixFrame, UnaryPrecedence, token.value))
+                        continue
+                    self.get_next_token()
+                if self.starts_type_name(self.current_token):
+                    basic_type, modifier = self.type_name()
+                    self.expect_token(TokenEnum.RIGHT_PARENTHESIS)
+                    if token.type == TokenEnum.LEFT_PARENTHESIS:
+                        operators.append((CastFrame, UnaryPrecedence, basic_type, modifier))
+                        continue
+                    operand = ast.SizeofType(basic_type, modifier)
+                else:
+                    if token.type == TokenEnum.SIZEOF:
+                        operators.append((PrefixFrame, UnaryPrecedence, token.value))
+                    operators.append((GroupFrame, 0, TokenEnum.RIGHT_PARENTHESIS, [], None))
+                    groups += 1
+                    continue
+            else:
+                operand = self.primary_expression()
+
+            # Postfix operators, then a binary operator, a comma or the end of a group
+            # 'sizeof' '(' type_name ')' takes no postfix operators
+            postfix = not isinstance(operand, ast.SizeofType)
+            while True:
+                token = self.current_token
+                token_type = token.type if token is not None else None
+                if postfix and token_type in PostfixOperators:
+                    self.get_next_token()
+                    if token_type == TokenEnum.LEFT_BRACKET:
+                        operators.append((GroupFrame, 0, TokenEnum.RIGHT_BRACKET, [], ast.ArrayReference, operand))
+                        groups += 1
+                        break
+                    if token_type == TokenEnum.LEFT_PARENTHESIS:
+                        if not self.token_equals(TokenEnum.RIGHT_PARENTHESIS):
+                            operators.append((GroupFrame, 0, TokenEnum.RIGHT_PARENTHESIS, [], ast.FunctionCall,
+                                              operand))
+                            groups += 1
+                            break
+                        self.get_next_token()
+                        operand = ast.FunctionCall(operand, [])
+                    elif token_type == TokenEnum.DOT or token_type == TokenEnum.STRUCTURE_DEREFERENCE:
+                        if not self.token_equals(TokenEnum.ID):
+                            raise Exception('expected member name after "%s"' % token.value)
+                        operand = ast.MemberReference(token.value, operand, self.current_token.value)
+                        self.get_next_token()
+                    else:
+                        operand = ast.PostfixOperation(token.value, operand)
+                    continue
+
+                precedence = ExpressionPrecedence.get(token_type)
+                if precedence is not None and (groups or precedence >= minimal_precedence):
+                    self.get_next_token()
+                    operand = reduce_operators(operators, operand, precedence, token_type in RightAssociativeOperators)
+                    if token_type == TokenEnum.QUESTION_MARK:
+                        operators.append((GroupFrame, 0, TokenEnum.COLON, [], ast.Conditional, operand))
+                        groups += 1
+                    elif token_type in AssignmentOperators:
+                        operators.append((AssignmentFrame, precedence, token.value, operand))
+                    else:
+                        operators.append((BinaryFrame, precedence, token.value, operand))
+                    break
+
+                # A comma or the end of the innermost group
+                operand = reduce_operators(operators, operand, 0)
+                if not groups:
+                    if token_type == TokenEnum.COMMA and expression_list:
+                        self.get_next_token()
+                        items.append(operand)
+                        break
+                    if items:
+                        items.append(operand)
+                        return ast.ExpressionList(items)
+                    return operand
+                group = operators[-1]
+                group[3].append(operand)
+                if token_type == TokenEnum.COMMA:
+                    self.get_next_token()
+                    break
+                self.expect_token(group[2])
+                operators.pop()
+                groups -= 1
+                postfix = True
+                group_items = group[3]
+                if group[4] is ast.FunctionCall:
+                    operand = ast.FunctionCall(group[5], group_items)
+                    continue
+                operand = group_items[0] if len(group_items) == 1 else ast.ExpressionList(group_items)
+                if group[4] is ast.ArrayReference:
+                    operand = ast.ArrayReference(group[5], operand)
+                elif group[4] is ast.Conditional:
+                    # The condition and the true value wait for the false value
+                    operators.append((ConditionalFrame, ConditionalPrecedence, group[5], operand))
+                    break
+
+    def type_name(self):
+        """
+        type_name := type_specifier pointer_specifier
+        """
+        basic_type, _, modifier = self.declaration()
+        return basic_type, modifier
+
+    def primary_expression(self):
+        """
+        primary_expression := ID | constant | STRING_CONSTANT { STRING_CONSTANT }
+
+        Parenthesized expressions are groups of binary_expression().
+        """
+        token = self.current_token
+        if token is None:
+            raise Exception('expected expression, got end of file')
+        if token.type == TokenEnum.ID:
+            self.get_next_token()
+            return ast.Identifier(token.value)
+        if token.type == TokenEnum.STRING_CONSTANT:
+            # Adjacent string constants are concatenated
+            values = [token.value]
+            while self.get_next_token() is not None and self.current_token.type == TokenEnum.STRING_CONSTANT:
+                values.append(self.current_token.value)
+            return ast.Constant('string', ''.join(values))
+        if token.type in ConstantTypes:
+            self.get_next_token()
+            return ast.Constant(ConstantTypes[token.type], token.value)
+        raise Exception('expected expression, got: %s' % str(token.type))
+
     def preprocessor_directive(self):
-        pass
+        self.get_next_token()
+        return None
 
     def comment(self):
         pass
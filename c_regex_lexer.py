@@ -0,0 +1,370 @@
+# -*- encoding: utf-8 -*-
+"""
+A regular expression based lexer for C.
+
+CRegexLexer scans a complete source string with one compiled master pattern
+instead of walking it character by character. It produces the same token
+stream as CLexer, i.e. the same token types, values and spans, and can be
+used wherever a CLexer is used. scan_into() stores the tokens in a
+TokenArray without creating Token objects, it is the fastest way to lex a
+source. Every token is still a match object, so the regular expression
+engine bounds the throughput.
+"""
+import re
+from c_lexer import CLexer, OffsetSpan, SymbolTable, Token, TokenEnum, TokenTypeNumbers
+from character_input import LineIndex
+
+
+__author__ = 'Christian Mönch'
+
+
+Continuation = '\\\n'
+InlineWhitespace = ' \t\r\x0b\x0c'
+Whitespace = InlineWhitespace + '\n'
+
+
+def build_master_pattern(continuation):
+    """
+    Build the master pattern. If continuation is True, line continuations
+    are accepted between the characters of multi character tokens, just like
+    CLexer.get_next_character() removes them.
+    """
+    c = r'(?:\\\n)*' if continuation else ''
+    operators = sorted(list(CLexer.TripleToken) + list(CLexer.DoubleToken) + list(CLexer.SingleToken), key=len,
+                       reverse=True)
+    return re.compile('|'.join((
+        r'(?P<whitespace>[%s](?:%s[%s])*)' % (re.escape(Whitespace), c, re.escape(Whitespace)),
+        r'(?P<word>[A-Za-z_](?:%s[A-Za-z0-9_])*)' % c,
+        r'(?P<number>[0-9](?:%s[0-9])*)' % c,
+        # Comments do not remove continuations, see CLexer.read_block_comment()
+        r'(?P<block_comment>/\*[\s\S]*?\*/)',
+        r'(?P<unterminated_block_comment>/\*)',
+        r'(?P<line_comment>//[^\n]*)',
+        r'(?P<string>"(?:%s(?:[^"\\\n]|\\%s[^\n]))*%s")' % (c, c, c),
+        r'(?P<unterminated_string>")',
+        r"(?P<character>'%s(?:\\%s(?:x%s[\s\S]%s[\s\S]|[0-7](?:%s[0-7]){0,2}|[^\n])|[^\\])%s')" % (
+            c, c, c, c, c, c),
+        r"(?P<unterminated_character>')",
+        # A '#' only starts a directive behind the whitespace at the start of
+        # a line, see CRegexLexer.at_line_start()
+        r'(?P<number_sign>\#)',
+        r'(?P<continuation>\\\n)',
+        r'(?P<operator>%s)' % '|'.join(re.escape(operator) for operator in operators),
+        r'(?P<unknown>[\s\S])')))
+
+
+# Only recognizes what can hide or start a directive, see CRegexLexer.skip_conditional_region().
+# A directive ends at the end of its line or at a comment.
+SkeletonLiteral = r'"(?:\\[\s\S]|[^"\\\n])*"?|\'(?:\\[\s\S]|[^\'\\\n])*\'?'
+SkeletonPattern = re.compile('|'.join((
+    r'(?P<comment>/\*(?:[\s\S]*?\*/|[\s\S]*)|//(?:\\\n|[^\n])*)',
+    r'(?P<literal>%s)' % SkeletonLiteral,
+    r'(?P<directive>(?<![^\n])[%s]*(?P<number_sign>\#)[%s]*(?P<name>\w*)(?:\\\n|%s|[^\n/"\']|/(?![*/]))*)' % (
+        re.escape(InlineWhitespace), re.escape(InlineWhitespace), SkeletonLiteral))))
+NonWhitespacePattern = re.compile(r'\S')
+PlainPattern = build_master_pattern(False)
+ContinuationPattern = build_master_pattern(True)
+DirectivePattern = re.compile(r'\#(?:\\\n|[^\n])*')
+DirectiveTextPattern = re.compile(r'\#(?:(?:\\\n)*[%s])*(?:\\\n)*' % re.escape(InlineWhitespace))
+EscapePattern = re.compile(r'\\(x..|[0-7]{1,3}|[\s\S])')
+OperatorTypes = dict(list(CLexer.TripleToken.items()) + list(CLexer.DoubleToken.items()) +
+                     list(CLexer.SingleToken.items()))
+OperatorTypeNumbers = dict((text, TokenTypeNumbers[token_type]) for text, token_type in OperatorTypes.items())
+
+
+def decode_escape_sequence(match):
+    sequence = match.group(1)
+    if sequence[0] == 'x':
+        if sequence[2] not in '0123456789abcdefABCDEF':
+            raise Exception('not a hexadecimal digit in escape sequence: %s' % sequence[2])
+        return chr(int(sequence[1:], 16))
+    if sequence[0] in '01234567':
+        return chr(int(sequence, 8))
+    escape_sequence = '\\' + sequence
+    if escape_sequence not in CLexer.EscapeSequences:
+        raise Exception('unknown escape sequence: "%s"' % escape_sequence)
+    return CLexer.EscapeSequences[escape_sequence]
+
+
+class CRegexLexer(object):
+
+    def __init__(self, source, input_name='<memory string>', symbol_table=None, line_index=None, typedef_table=None):
+        self.source = source
+        self.input_name = input_name
+        self.symbol_table = symbol_table if symbol_table is not None else SymbolTable()
+        self.typedef_table = typedef_table
+        if typedef_table is not None:
+            # Lexers without a typedef table do not pay for the lookup
+            self.create_token = self.create_typed_token
+        if Continuation in source:
+            self.master_pattern = ContinuationPattern
+        else:
+            self.master_pattern = PlainPattern
+        if line_index is None:
+            line_index = LineIndex.from_string(input_name, source)
+        self.line_index = line_index
+        self.scanner = self.scan()
+
+    def last_character(self, start, end):
+        """
+        Return the offset of the last character in source[start:end] that is
+        not part of a line continuation.
+        """
+        end -= 1
+        while end > start and self.source[end] == '\n' and self.source[end - 1] == '\\':
+            end -= 2
+        return end
+
+    def splice(self, text):
+        if '\\' in text:
+            return text.replace(Continuation, '')
+        return text
+
+    def at_line_start(self, offset):
+        """
+        Return True if only inline whitespace is in front of offset on its
+        line, i.e. if a '#' at offset starts a directive. Line continuations
+        end a line here, just like in CLexer.at_line_start().
+        """
+        line_start = self.source.rfind('\n', 0, offset) + 1
+        return not self.source[line_start:offset].strip(InlineWhitespace)
+
+    def scan(self, start_offset=0):
+        """
+        Generate (token_type, start_offset, end_offset, value, symbol) tuples,
+        end_offset is the offset of the last character of the token, symbol is
+        the symbol id of identifiers and keywords and None otherwise. Scanning
+        starts at start_offset, which has to be the start of a token.
+        """
+        source = self.source
+        splice = self.splice
+        match_token = self.match_token
+        symbol_table = self.symbol_table
+        symbol_ids, symbols, token_types = symbol_table.symbol_ids, symbol_table.symbols, symbol_table.token_types
+        position = start_offset
+        while True:
+            for match in self.master_pattern.finditer(source, position):
+                kind = match.lastgroup
+                if kind == 'whitespace':
+                    start, end = match.span()
+                    yield TokenEnum.WHITESPACE, start, end - 1, splice(match.group()), None
+                elif kind == 'word':
+                    start, end = match.span()
+                    word = splice(match.group())
+                    symbol = symbol_ids.get(word)
+                    if symbol is None:
+                        symbol = symbol_table.add(word, TokenEnum.ID)
+                    yield token_types[symbol], start, end - 1, symbols[symbol], symbol
+                elif kind == 'operator':
+                    start, end = match.span()
+                    yield OperatorTypes[match.group()], start, end - 1, match.group(), None
+                elif kind == 'number_sign' and self.at_line_start(match.start()):
+                    # The master pattern does not know the line, scanning
+                    # resumes behind the directive
+                    start = match.start()
+                    position = DirectivePattern.match(source, start).end()
+                    yield self.directive_token(start, position)
+                    break
+                else:
+                    token = match_token(match)
+                    if token is not None:
+                        yield token
+            else:
+                return
+
+    def scan_into(self, tokens, start_offset=0):
+        """
+        Append the tokens from start_offset on to the columns of the token
+        array tokens. The tokens are the same as those of scan(), but
+        identifiers, keywords, operators, whitespace and numbers that are
+        their source text are stored without creating a tuple or a value.
+        """
+        if tokens.shift_delta:
+            tokens.apply_shift()
+        source = self.source
+        continuations = self.master_pattern is ContinuationPattern
+        append_type, append_start, append_end, append_reference = (
+            tokens.types.append, tokens.starts.append, tokens.ends.append, tokens.value_references.append)
+        match_token = self.match_token
+        symbol_table = self.symbol_table
+        symbol_ids, token_types = symbol_table.symbol_ids, symbol_table.token_types
+        whitespace_number = TokenTypeNumbers[TokenEnum.WHITESPACE]
+        number_number = TokenTypeNumbers[TokenEnum.INTEGER_CONSTANT]
+        position = start_offset
+        while True:
+            for match in self.master_pattern.finditer(source, position):
+                kind = match.lastgroup
+                start, end = match.span()
+                if kind == 'whitespace' or kind == 'number':
+                    if not continuations or source.find('\\', start, end) < 0:
+                        append_type(whitespace_number if kind == 'whitespace' else number_number)
+                        append_start(start)
+                        append_end(end - 1)
+                        append_reference(-1)
+                        continue
+                elif kind == 'word':
+                    word = match.group()
+                    if not continuations or '\\' not in word:
+                        symbol = symbol_ids.get(word)
+                        if symbol is None:
+                            symbol = symbol_table.add(word, TokenEnum.ID)
+                        append_type(TokenTypeNumbers[token_types[symbol]])
+                        append_start(start)
+                        append_end(end - 1)
+                        append_reference(-1)
+                        continue
+                elif kind == 'operator':
+                    append_type(OperatorTypeNumbers[match.group()])
+                    append_start(start)
+                    append_end(end - 1)
+                    append_reference(-1)
+                    continue
+                elif kind == 'number_sign' and self.at_line_start(start):
+                    position = DirectivePattern.match(source, start).end()
+                    token = self.directive_token(start, position)
+                    tokens.append(token[0], token[1], token[2], token[3])
+                    break
+                token = match_token(match)
+                if token is not None:
+                    tokens.append(token[0], token[1], token[2], token[3])
+            else:
+                return
+
+    def match_token(self, match):
+        """
+        Return the (token_type, start_offset, end_offset, value, symbol) tuple
+        for a match of the master pattern, or None for a line continuation.
+        A '#' that starts a directive is not a single match, see scan().
+        """
+        source = self.source
+        kind = match.lastgroup
+        start, end = match.span()
+        if kind == 'whitespace':
+            return TokenEnum.WHITESPACE, start, end - 1, self.splice(match.group()), None
+        elif kind == 'word':
+            symbol = self.symbol_table.intern(self.splice(match.group()))
+            return self.symbol_table.token_types[symbol], start, end - 1, self.symbol_table.symbols[symbol], symbol
+        elif kind == 'operator':
+            return OperatorTypes[match.group()], start, end - 1, match.group(), None
+        elif kind == 'number':
+            return TokenEnum.INTEGER_CONSTANT, start, end - 1, self.splice(match.group()), None
+        elif kind == 'block_comment':
+            return TokenEnum.COMMENT, start, end - 1, match.group(), None
+        elif kind == 'line_comment':
+            if end == len(source):
+                raise Exception('end of file in line comment')
+            return TokenEnum.COMMENT, start, end - 1, match.group(), None
+        elif kind == 'string':
+            value = EscapePattern.sub(decode_escape_sequence, self.splice(match.group())[1:-1])
+            return TokenEnum.STRING_CONSTANT, start, end - 1, value, None
+        elif kind == 'character':
+            value = EscapePattern.sub(decode_escape_sequence, self.splice(match.group())[1:-1])
+            return TokenEnum.CHARACTER_CONSTANT, start, end - 1, value, None
+        elif kind == 'continuation':
+            return None
+        elif kind == 'unknown' or kind == 'number_sign':
+            return TokenEnum.UNKNOWN, start, start, match.group(), None
+        elif kind == 'unterminated_block_comment':
+            raise Exception('end of file in block comment')
+        elif kind == 'unterminated_string':
+            raise Exception('string terminated by new line or end of file')
+        raise Exception('unterminated string constant:')
+
+    def directive_token(self, start, end):
+        """
+        Return the token tuple of the directive in source[start:end], start
+        is the offset of its '#'.
+        """
+        source = self.source
+        text_start = DirectiveTextPattern.match(source, start).end()
+        if text_start == end:
+            return TokenEnum.PREPROCESSOR_DIRECTIVE, start, start, '', None
+        return (TokenEnum.PREPROCESSOR_DIRECTIVE, start, self.last_character(text_start, end),
+                self.splice(source[text_start:end]), None)
+
+    def skip_conditional_region(self, start_offset):
+        """
+        Skip the text of an inactive conditional region without tokenizing it.
+        Return the start offset, the end offset and the name of the '#elif',
+        '#else' or '#endif' directive that ends the region, nested
+        conditionals are skipped. Only comments, string and character
+        constants and directives are recognized, an unterminated constant
+        ends at the end of its line.
+        """
+        depth = 0
+        for match in SkeletonPattern.finditer(self.source, start_offset):
+            name = match.group('name')
+            if name is None:
+                continue
+            if name == 'if' or name == 'ifdef' or name == 'ifndef':
+                depth += 1
+            elif name == 'endif':
+                if depth == 0:
+                    return match.start('number_sign'), match.end(), name
+                depth -= 1
+            elif (name == 'elif' or name == 'else') and depth == 0:
+                return match.start('number_sign'), match.end(), name
+        raise Exception('end of file in conditional region')
+
+    def scan_skeleton(self, start_offset=0):
+        """
+        Generate (kind, start_offset, end_offset, text) tuples for the
+        comments, constants and directives of the source without tokenizing
+        it. kind is 'comment', 'literal', 'directive' or 'text', the latter
+        for anything else that is not whitespace. text is the directive text
+        as in the value of a directive token, and None for all other kinds.
+        """
+        source = self.source
+        position = start_offset
+        for match in SkeletonPattern.finditer(source, start_offset):
+            start, end = match.span()
+            if NonWhitespacePattern.search(source, position, start) is not None:
+                yield 'text', position, start, None
+            kind = match.lastgroup if match.lastgroup != 'name' else 'directive'
+            if kind == 'directive':
+                start = match.start('number_sign')
+                text_start = DirectiveTextPattern.match(source, start).end()
+                yield kind, start, end, self.splice(source[text_start:end])
+            else:
+                yield kind, start, end, None
+            position = end
+        if NonWhitespacePattern.search(source, position) is not None:
+            yield 'text', position, len(source), None
+
+    def create_token(self, token_type, start_offset, end_offset, value, symbol=None):
+        return Token(token_type, value, OffsetSpan(self.line_index, start_offset, end_offset), symbol)
+
+    def create_typed_token(self, token_type, start_offset, end_offset, value, symbol=None):
+        if token_type is TokenEnum.ID and self.typedef_table.is_type(value):
+            token_type = TokenEnum.TYPEID
+        return Token(token_type, value, OffsetSpan(self.line_index, start_offset, end_offset), symbol)
+
+    def __iter__(self):
+        return self.iter_tokens()
+
+    def iter_tokens(self):
+        """
+        Generate the remaining tokens of the source.
+        """
+        if self.typedef_table is not None:
+            create_token = self.create_token
+            for token_type, start_offset, end_offset, value, symbol in self.scanner:
+                yield create_token(token_type, start_offset, end_offset, value, symbol)
+            return
+        # Tokens are created inline, this is the hot loop of the lexer
+        line_index = self.line_index
+        for token_type, start_offset, end_offset, value, symbol in self.scanner:
+            yield Token(token_type, value, OffsetSpan(line_index, start_offset, end_offset), symbol)
+
+    def get_next_token(self):
+        for token_type, start_offset, end_offset, value, symbol in self.scanner:
+            return self.create_token(token_type, start_offset, end_offset, value, symbol)
+        return None
+
+
+if __name__ == '__main__':
+    import sys
+
+    for token in CRegexLexer(sys.stdin.read(), '<stdin>'):
+        sys.stderr.write(f"{token}\n")
+        sys.stdout.write(token.value)
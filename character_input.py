@@ -1,4 +1,7 @@
 # -*- encoding: utf-8 -*-
+import codecs
+import mmap
+from bisect import bisect_right
 from collections import namedtuple
 
 
@@ -8,12 +11,75 @@ __author__ = 'Christian Mönch'
 Coordinate = namedtuple('Coordinate', ['name', 'line', 'column'])
 
 
+class LineIndex(object):
+    """
+    Maps character offsets of an input to coordinates. Only the offsets at
+    which lines start are stored, coordinates are computed on demand. The
+    line starts from shift_line on may lack a pending shift_delta, which
+    edits leave to be added when they are read, see apply_shift().
+    """
+    def __init__(self, input_name, line_starts=None, shift_line=None, shift_delta=0):
+        self.input_name = input_name
+        self.line_starts = line_starts if line_starts is not None else [0]
+        self.shift_line = shift_line if shift_line is not None else len(self.line_starts)
+        self.shift_delta = shift_delta
+
+    @classmethod
+    def from_string(cls, input_name, input_string):
+        line_starts = [0]
+        position = input_string.find('\n')
+        while position != -1:
+            line_starts.append(position + 1)
+            position = input_string.find('\n', position + 1)
+        return cls(input_name, line_starts)
+
+    def add_line_start(self, offset):
+        if self.shift_delta:
+            self.apply_shift()
+        self.line_starts.append(offset)
+
+    def apply_shift(self):
+        """
+        Add the pending shift to the line starts.
+        """
+        if self.shift_delta:
+            line_starts, delta = self.line_starts, self.shift_delta
+            line_starts[self.shift_line:] = [line_start + delta for line_start in line_starts[self.shift_line:]]
+        self.shift_line, self.shift_delta = len(self.line_starts), 0
+
+    def line_start(self, line):
+        """
+        Return the offset at which line starts, line counts from 0.
+        """
+        if line >= self.shift_line:
+            return self.line_starts[line] + self.shift_delta
+        return self.line_starts[line]
+
+    def coordinate(self, offset):
+        line_starts, shift_line = self.line_starts, self.shift_line
+        if shift_line < len(line_starts) and offset - self.shift_delta >= line_starts[shift_line]:
+            line = bisect_right(line_starts, offset - self.shift_delta, shift_line)
+        else:
+            line = bisect_right(line_starts, offset, 0, shift_line)
+        return Coordinate(self.input_name, line, offset - self.line_start(line - 1) + 1)
+
+
 class Character(object):
-    def __init__(self, value, representation=None, encoding=None, coordinate=None):
+    __slots__ = ('value', 'representation', 'encoding', 'offset', 'line_index', 'fixed_coordinate')
+
+    def __init__(self, value, representation=None, encoding=None, coordinate=None, offset=None, line_index=None):
         self.value = value
         self.representation = representation
         self.encoding = encoding
-        self.coordinate = coordinate
+        self.offset = offset
+        self.line_index = line_index
+        self.fixed_coordinate = coordinate
+
+    @property
+    def coordinate(self):
+        if self.fixed_coordinate is None and self.line_index is not None:
+            return self.line_index.coordinate(self.offset)
+        return self.fixed_coordinate
 
     def __repr__(self):
         return 'Character(%s [%s:%d:%d])' % (
@@ -23,8 +89,8 @@ class Character(object):
 class BaseCharacterInput(object):
     def __init__(self, input_name):
         self.input_name = input_name
-        self.line = 1
-        self.column = 1
+        self.offset = 0
+        self.line_index = LineIndex(input_name)
         self.end_of_input = False
 
     def is_newline(self, character):
@@ -40,36 +106,59 @@ class BaseCharacterInput(object):
         if character is None:
             self.end_of_input = True
             return None
-        result = Character(character, coordinate=Coordinate(self.input_name, self.line, self.column))
+        result = Character(character, offset=self.offset, line_index=self.line_index)
+        self.offset += 1
         if self.is_newline(character):
-            self.column = 1
-            self.line += 1
-        else:
-            self.column += 1
+            self.line_index.add_line_start(self.offset)
         return result
 
+    def skip_objects(self, count):
+        """
+        Skip count characters without creating Character objects.
+        """
+        for _ in range(count):
+            if self.get_next_object() is None:
+                break
+
 
 class FileCharacterInput(BaseCharacterInput):
-    def __init__(self, input_file, file_name='<unknown>'):
+    """
+    Reads characters from a file object in chunks of buffer_size. Text files
+    are read as they are, binary files are decoded with the given encoding.
+    """
+    def __init__(self, input_file, file_name='<unknown>', buffer_size=65536, encoding='utf-8'):
         super(FileCharacterInput, self).__init__(file_name)
         self.input_file = input_file
         self.file_name = file_name
-        self.waiting_characters = ""
+        self.buffer_size = buffer_size
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+        self.buffer = ''
+        self.position = 0
+
+    def fill_buffer(self):
+        self.buffer, self.position = '', 0
+        while not self.buffer:
+            data = self.input_file.read(self.buffer_size)
+            if isinstance(data, bytes):
+                self.buffer = self.decoder.decode(data, final=not data)
+            else:
+                self.buffer = data
+            if not data:
+                break
+        return self.buffer != ''
 
     def read_character(self):
-        if self.waiting_characters:
-            result, self.waiting_characters = self.waiting_characters[0], self.waiting_characters[1:]
-            return result
-        self.waiting_characters = self.input_file.read(1)
-        if self.waiting_characters == '':
-            return None
-        result, self.waiting_characters = self.waiting_characters[0], self.waiting_characters[1:]
-        return result
+        if self.position == len(self.buffer):
+            if not self.fill_buffer():
+                return None
+        character = self.buffer[self.position]
+        self.position += 1
+        return character
 
 
 class StringCharacterInput(BaseCharacterInput):
-    def __init__(self, input_string):
-        super(StringCharacterInput, self).__init__('<memory string>')
+    def __init__(self, input_string, input_name='<memory string>'):
+        super(StringCharacterInput, self).__init__(input_name)
         self.input_string = input_string
         self.position = 0
 
@@ -79,3 +168,33 @@ class StringCharacterInput(BaseCharacterInput):
         character = self.input_string[self.position]
         self.position += 1
         return character
+
+    def skip_objects(self, count):
+        input_string = self.input_string
+        end = min(self.position + count, len(input_string))
+        newline = input_string.find('\n', self.position, end)
+        while newline >= 0:
+            self.line_index.add_line_start(self.offset + newline - self.position + 1)
+            newline = input_string.find('\n', newline + 1, end)
+        self.offset += end - self.position
+        self.position = end
+
+
+class MappedFileCharacterInput(StringCharacterInput):
+    """
+    Memory maps the file with the given name and decodes it at once.
+    """
+    def __init__(self, file_name, encoding='utf-8'):
+        with open(file_name, 'rb') as input_file:
+            try:
+                mapped_file = mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files can not be mapped
+                input_string = ''
+            else:
+                try:
+                    input_string = codecs.decode(mapped_file, encoding)
+                finally:
+                    mapped_file.close()
+        super(MappedFileCharacterInput, self).__init__(input_string, file_name)
+        self.file_name = file_name
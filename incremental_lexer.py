@@ -0,0 +1,151 @@
+# -*- encoding: utf-8 -*-
+"""
+Incremental relexing of a TokenArray after a text edit.
+
+An edit replaces removed_length characters at offset by inserted_text.
+Relexing starts at a token boundary before the edit and stops as soon as a
+new token starts, behind the edit, at the shifted start of an old token.
+The lexer state at a token boundary is just the position, so all following
+tokens are the old tokens with shifted offsets. Multi line tokens, e.g.
+block comments that are opened or closed by the edit, and line
+continuations are handled because relexing continues until the streams
+line up again.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from c_regex_lexer import CRegexLexer
+from character_input import LineIndex
+from token_array import TokenArray, TokenTypeNumbers
+
+
+__author__ = 'Christian Mönch'
+
+
+# tokens[first_index:new_end_index] replace old_tokens[first_index:old_end_index]
+RelexResult = namedtuple('RelexResult', ['tokens', 'first_index', 'old_end_index', 'new_end_index'])
+
+
+def shifted(column, delta):
+    if delta == 0:
+        return column
+    return array(column.typecode, map(delta.__add__, column))
+
+
+def edited_line_index(line_index, offset, removed_length, inserted_text):
+    """
+    Return the line index of the edited text. The line starts behind the
+    edit are copied by reference, their shift is left pending. Only the
+    line starts between the pending shift of line_index and the edit are
+    shifted here.
+    """
+    line_starts, shift_line, shift_delta = line_index.line_starts, line_index.shift_line, line_index.shift_delta
+    delta = len(inserted_text) - removed_length
+    if not shift_delta:
+        shift_line = 0
+    # Line starts are compared as stored, i.e. without the pending shift
+    first_line = bisect_right(line_starts, offset, 0, shift_line)
+    if first_line == shift_line:
+        first_line = bisect_right(line_starts, offset - shift_delta, shift_line)
+    end_line = bisect_right(line_starts, offset + removed_length, 0, shift_line)
+    if end_line == shift_line:
+        end_line = bisect_right(line_starts, offset + removed_length - shift_delta, shift_line)
+
+    new_line_starts = line_starts[:first_line]
+    if shift_delta and shift_line < first_line:
+        new_line_starts[shift_line:] = [line_start + shift_delta for line_start in new_line_starts[shift_line:]]
+    position = inserted_text.find('\n')
+    while position != -1:
+        new_line_starts.append(offset + position + 1)
+        position = inserted_text.find('\n', position + 1)
+    new_shift_line = len(new_line_starts)
+    if end_line < shift_line:
+        # Between the edit and the old pending shift
+        new_line_starts.extend([line_start + delta for line_start in line_starts[end_line:shift_line]])
+        new_shift_line = len(new_line_starts)
+        new_line_starts.extend(line_starts[shift_line:])
+    else:
+        new_line_starts.extend(line_starts[end_line:])
+    return LineIndex(line_index.input_name, new_line_starts, new_shift_line, shift_delta + delta)
+
+
+def relex_edit(tokens, offset, removed_length, inserted_text):
+    """
+    Relex tokens after an edit and return a RelexResult.
+
+    The edited array shares the value table with tokens, values are only
+    appended to it. The offsets of the tokens behind the relexed ones are
+    not changed, their shift is left pending, see TokenArray.apply_shift().
+    Python code runs for the relexed tokens and for the tokens and lines
+    between the edit and the pending shift of the previous edit, i.e. for
+    edits close to each other it does not depend on the size of the source.
+    The columns, the line starts and the source string are still copied,
+    in time linear in the size of the source, but at the speed of memory
+    copies.
+    """
+    old_source = tokens.source
+    if not 0 <= offset <= offset + removed_length <= len(old_source):
+        raise Exception('edit range %d:%d outside of source' % (offset, offset + removed_length))
+    source = old_source[:offset] + inserted_text + old_source[offset + removed_length:]
+    delta = len(inserted_text) - removed_length
+    inserted_end = offset + len(inserted_text)
+    line_index = edited_line_index(tokens.line_index, offset, removed_length, inserted_text)
+
+    # Restart one token before the last token that starts in front of the edit,
+    # that token might be extended by the edit.
+    first_index = max(tokens.bisect_start(offset) - 2, 0)
+    # Text in front of the first token, e.g. a continuation, may be edited too
+    restart_offset = tokens.start_offset(first_index) if first_index > 0 else 0
+
+    result = TokenArray(source, line_index)
+    result.values = tokens.values
+    result.value_numbers = tokens.value_numbers
+    result.types = tokens.types[:first_index]
+    result.starts = tokens.starts[:first_index]
+    result.ends = tokens.ends[:first_index]
+    result.value_references = tokens.value_references[:first_index]
+    # The pending shift of tokens in front of the edit is applied
+    shift_index, shift_delta = (tokens.shift_index, tokens.shift_delta) if tokens.shift_delta else (0, 0)
+    if shift_delta and shift_index < first_index:
+        result.shift_index, result.shift_delta = shift_index, shift_delta
+        result.apply_shift()
+
+    old_types = tokens.types
+    old_index = first_index
+    old_end_index = len(tokens)
+    lexer = CRegexLexer(source, line_index.input_name, line_index=line_index)
+    for token_type, start_offset, end_offset, value, _ in lexer.scan(restart_offset):
+        # The character in front of the token must be old text too. An edit
+        # that turns a '#' into a directive or back changes its token type.
+        if start_offset > inserted_end:
+            old_start = start_offset - delta
+            old_index = tokens.bisect_start(old_start, old_index)
+            if old_index < len(tokens) and tokens.start_offset(old_index) == old_start \
+                    and old_types[old_index] == TokenTypeNumbers[token_type]:
+                old_end_index = old_index
+                break
+        result.append(token_type, start_offset, end_offset, value)
+    new_end_index = len(result)
+
+    result.types.extend(old_types[old_end_index:])
+    result.value_references.extend(tokens.value_references[old_end_index:])
+    if old_end_index < shift_index:
+        # Between the edit and the old pending shift
+        result.starts.extend(shifted(tokens.starts[old_end_index:shift_index], delta))
+        result.ends.extend(shifted(tokens.ends[old_end_index:shift_index], delta))
+        result.shift_index = len(result.starts)
+        result.starts.extend(tokens.starts[shift_index:])
+        result.ends.extend(tokens.ends[shift_index:])
+    else:
+        result.shift_index = new_end_index
+        result.starts.extend(tokens.starts[old_end_index:])
+        result.ends.extend(tokens.ends[old_end_index:])
+    result.shift_delta = shift_delta + delta
+    return RelexResult(result, first_index, old_end_index, new_end_index)
+
+
+def relex(tokens, offset, removed_length, inserted_text):
+    """
+    Return a new TokenArray for the edited source of tokens.
+    """
+    return relex_edit(tokens, offset, removed_length, inserted_text).tokens
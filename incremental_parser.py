@@ -0,0 +1,132 @@
+# -*- encoding: utf-8 -*-
+"""
+Incremental reparsing of the top level declarations of a TokenArray.
+
+The parser records the range of tokens that every external declaration
+covers. The ranges tile the token array, i.e. trivia in front of a
+declaration belongs to the previous one. After an edit the tokens are
+relexed incrementally and only the declarations whose token range
+intersects the changed tokens are parsed again. Parsing stops as soon as a
+declaration ends at the shifted start of an old declaration behind the
+change, from there on the old declarations are reused. Typedef names change
+how the following declarations are parsed, so the typedef names that every
+declaration declares are recorded too, and parsing only stops where the
+new declarations declared the same typedef names as the old ones.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from c_parser import CParser, TypedefTable
+from incremental_lexer import relex_edit, shifted
+from token_stream import TokenStream
+
+
+__author__ = 'Christian Mönch'
+
+
+class IncrementalParser(object):
+
+    def __init__(self, tokens, type_table=None):
+        self.tokens = tokens
+        self.type_table = type_table
+        self.first_indices, self.end_indices, self.external_declarations, self.typedef_changes, _ = \
+            self.parse_from(tokens, 0, TypedefTable())
+
+    def declarations(self):
+        return [declaration for declaration in self.external_declarations if declaration is not None]
+
+    def typedef_table_at(self, position):
+        """
+        Return the typedef table in front of the external declaration at position.
+        """
+        typedef_table = TypedefTable()
+        for changes in self.typedef_changes[:position]:
+            typedef_table.names.update(changes)
+        return typedef_table
+
+    def parse_from(self, tokens, start_index, typedef_table, sync=None):
+        """
+        Parse external declarations starting at token start_index. sync is
+        None or a tuple (sync_index, first_position, shift). In the latter
+        case parsing stops at the first declaration that ends at or behind
+        sync_index and at the shifted start of an old declaration, if the
+        new declarations changed the typedef names in the same way as the
+        old declarations from first_position on. Returns the ranges, the
+        declarations, the typedef changes of every declaration and the
+        index of the old declaration at which parsing stopped.
+        """
+        first_indices, end_indices, declarations, typedef_changes = array('I'), array('I'), [], []
+        parser = CParser(TokenStream(tokens.reader(start_index)), self.type_table, typedef_table)
+        parser.get_next_token()
+        first_index = start_index
+        # The typedef names changed by the new declarations and by the old
+        # declarations from first_position to old_position, and the names
+        # in which they differ. The old changes advance with old_position,
+        # every change is compared once.
+        changed_names, old_changed_names, differences = {}, {}, set()
+        old_cursor = sync[1] if sync is not None else 0
+        missing = TypedefTable.Missing
+
+        def compare(name):
+            if changed_names.get(name, missing) == old_changed_names.get(name, missing):
+                differences.discard(name)
+            else:
+                differences.add(name)
+
+        while parser.current_token is not None:
+            typedef_table.file_scope_changes = []
+            declaration = parser.external_declaration()
+            end_index = parser.current_token.index if parser.current_token is not None else len(tokens)
+            first_indices.append(first_index)
+            end_indices.append(end_index)
+            declarations.append(declaration)
+            # The typedef names that the declaration added or hid
+            changes = tuple((name, typedef_table.names[name])
+                            for name in dict.fromkeys(typedef_table.file_scope_changes))
+            typedef_changes.append(changes)
+            for name, is_type in changes:
+                changed_names[name] = is_type
+                compare(name)
+            first_index = end_index
+            if sync is not None and end_index >= sync[0]:
+                sync_index, first_position, shift = sync
+                old_position = bisect_left(self.first_indices, end_index - shift)
+                while old_cursor < old_position:
+                    for name, is_type in self.typedef_changes[old_cursor]:
+                        old_changed_names[name] = is_type
+                        compare(name)
+                    old_cursor += 1
+                if old_position < len(self.first_indices) and self.first_indices[old_position] == end_index - shift \
+                        and not differences:
+                    return first_indices, end_indices, declarations, typedef_changes, old_position
+        return first_indices, end_indices, declarations, typedef_changes, len(self.external_declarations) if sync else 0
+
+    def edit(self, offset, removed_length, inserted_text):
+        """
+        Apply an edit to the source and update tokens and declarations.
+        Returns the number of declarations that were parsed again. If the
+        edited source can not be lexed or parsed, an exception is raised
+        and the parser keeps its old state.
+        """
+        relexed = relex_edit(self.tokens, offset, removed_length, inserted_text)
+        shift = relexed.new_end_index - relexed.old_end_index
+
+        # The first declaration that covers a changed token
+        first_position = bisect_right(self.end_indices, relexed.first_index)
+        if first_position < len(self.external_declarations):
+            start_index = self.first_indices[first_position]
+        else:
+            first_position, start_index = 0, 0
+        first_indices, end_indices, declarations, typedef_changes, old_position = self.parse_from(
+            relexed.tokens, start_index, self.typedef_table_at(first_position),
+            (relexed.new_end_index, first_position, shift))
+
+        self.tokens = relexed.tokens
+        self.first_indices = self.first_indices[:first_position] + first_indices + shifted(
+            self.first_indices[old_position:], shift)
+        self.end_indices = self.end_indices[:first_position] + end_indices + shifted(
+            self.end_indices[old_position:], shift)
+        self.external_declarations = self.external_declarations[:first_position] + declarations + \
+            self.external_declarations[old_position:]
+        self.typedef_changes = self.typedef_changes[:first_position] + typedef_changes + \
+            self.typedef_changes[old_position:]
+        return len(declarations)
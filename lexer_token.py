@@ -9,12 +9,16 @@ Coordinate = namedtuple('Coordinate', ['file', 'line', 'column'])
 
 
 class Span(object):
+    __slots__ = ('start', 'end')
+
     def __init__(self, start, end):
         self.start = start
         self.end = end
 
 
 class Token(object):
+    __slots__ = ('type', 'value', 'location')
+
     def __init__(self, token_type, token_value, span=None):
         self.type = token_type
         self.value = token_value
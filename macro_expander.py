@@ -0,0 +1,458 @@
+# -*- encoding: utf-8 -*-
+"""
+A macro table and a macro expander for token streams.
+
+MacroExpander reads tokens from any iterable of tokens, e.g. a CLexer, a
+TokenArray or Preprocessor.tokens(). '#define' and '#undef' directives
+update its MacroTable, all other tokens are passed on with macro invocations
+replaced by their expansions. Object-like and function-like macros, variadic
+macros, '#' and '##' are supported. Expansion follows the hide set algorithm
+of Dave Prosser: every token that is produced by an expansion carries the
+set of macro names that must not be expanded again, which stops recursion
+without losing tokens that are expanded later in a different context.
+
+Expanded tokens are MacroTokens, they have the location of the directive
+that defined them. Whitespace and comments inside expansions are dropped.
+
+The full expansion of an object-like macro does not depend on its context,
+so the MacroTable caches it. Each cache entry records the names that were
+looked up while it was computed; defining or undefining one of these names
+drops the entry. The only exception to context independence is a trailing
+function-like macro name, which may be invoked with arguments that follow
+the invocation. It is pushed back and rescanned. Expansions that contain an
+unterminated invocation are not cached.
+"""
+import re
+from c_lexer import CLexer, TokenEnum
+from token_array import TokenArray
+
+
+__author__ = 'Christian Mönch'
+
+
+EmptyHideSet = frozenset()
+WordTypes = frozenset([TokenEnum.ID, TokenEnum.TYPEID] + list(CLexer.KeyWordTypes.values()))
+TriviaTypes = frozenset((TokenEnum.WHITESPACE, TokenEnum.COMMENT))
+DirectiveNamePattern = re.compile(r'\w*')
+DefinePattern = re.compile(r'define\s+([A-Za-z_]\w*)(\()?')
+UndefPattern = re.compile(r'undef\s+([A-Za-z_]\w*)')
+ParameterPattern = re.compile(r'\s*([A-Za-z_]\w*|\.\.\.)\s*$')
+PPNumberPattern = re.compile(r'[0-9](?:[eEpP][+-]|[0-9A-Za-z_.])*')
+Escapes = {
+    '\n': '\\n',
+    '\t': '\\t',
+    '\v': '\\v',
+    '\f': '\\f',
+    '\r': '\\r',
+    '\\': '\\\\'
+}
+
+
+class IncompleteMacroInvocation(Exception):
+    pass
+
+
+class MacroToken(object):
+    __slots__ = ('type', 'value', 'location', 'hide_set', 'space_before')
+
+    def __init__(self, token_type, token_value, span=None, hide_set=EmptyHideSet, space_before=False):
+        self.type = token_type
+        self.value = token_value
+        self.location = span
+        self.hide_set = hide_set
+        self.space_before = space_before
+
+    def __repr__(self):
+        return 'MacroToken(%s, %s)' % (self.type, repr(self.value))
+
+
+class PasteOperator(MacroToken):
+    """
+    A '##' operator of a macro body. A '##' that results from pasting '#' and
+    '#' is a plain MacroToken, it is not applied when it is rescanned.
+    """
+    __slots__ = ()
+
+
+def position(token):
+    start = token.location.start
+    return '%s:%d:%d' % (start.name, start.line, start.column)
+
+
+def spelling(token):
+    """
+    Return the source text of a token, constants are escaped again.
+    """
+    if token.type is TokenEnum.STRING_CONSTANT or token.type is TokenEnum.CHARACTER_CONSTANT:
+        quote = '"' if token.type is TokenEnum.STRING_CONSTANT else "'"
+        return quote + ''.join(Escapes.get(character, '\\' + character if character == quote else character)
+                               for character in token.value) + quote
+    return token.value
+
+
+def lex_text(text, location):
+    """
+    Return the tokens of text as MacroTokens without whitespace and comments.
+    Numbers are preprocessing numbers, e.g. '0x1fUL' is a single
+    INTEGER_CONSTANT token.
+    """
+    result = []
+    space_before = False
+    number_end = 0
+    # A '#' behind a comment does not start a directive
+    text = '/**/' + text
+    for token in TokenArray.from_source(text):
+        if token.start_offset < number_end:
+            continue
+        if token.type in TriviaTypes:
+            space_before = True
+            continue
+        value = token.value
+        if token.type is TokenEnum.INTEGER_CONSTANT:
+            number_end = PPNumberPattern.match(text, token.end_offset).end()
+            value += text[token.end_offset + 1:number_end]
+        result.append(MacroToken(token.type, value, location, EmptyHideSet, space_before))
+        space_before = False
+    return result
+
+
+def is_paste(token):
+    return isinstance(token, PasteOperator)
+
+
+class Macro(object):
+    """
+    A macro definition. parameters is None for object-like macros, otherwise
+    a tuple of parameter names; the last parameter of a variadic macro is
+    '__VA_ARGS__'.
+    """
+    def __init__(self, name, parameters, body, variadic=False):
+        self.name = name
+        self.parameters = parameters
+        self.body = body
+        self.variadic = variadic
+        self.parameter_indices = dict((parameter, index) for index, parameter in enumerate(parameters or ()))
+
+    @classmethod
+    def from_directive(cls, token):
+        """
+        Create a macro from a '#define' directive token.
+        """
+        value = token.value
+        match = DefinePattern.match(value)
+        if match is None:
+            raise Exception('%s: invalid macro definition "#%s"' % (position(token), value))
+        name, parameters, variadic = match.group(1), None, False
+        body_start = match.end()
+        if match.group(2) is not None:
+            body_start = value.find(')', body_start)
+            if body_start == -1:
+                raise Exception('%s: missing ")" in the parameter list of macro "%s"' % (position(token), name))
+            parameters = []
+            parameter_text = value[match.end():body_start]
+            for parameter in parameter_text.split(',') if parameter_text.strip() else ():
+                parameter_match = ParameterPattern.match(parameter)
+                if parameter_match is None or variadic or parameter_match.group(1) in parameters:
+                    raise Exception('%s: invalid parameter list of macro "%s"' % (position(token), name))
+                parameter = parameter_match.group(1)
+                if parameter == '...':
+                    parameter, variadic = '__VA_ARGS__', True
+                parameters.append(parameter)
+            parameters = tuple(parameters)
+            body_start += 1
+        body = []
+        for body_token in lex_text(value[body_start:], token.location):
+            # '##' is lexed as two '#'-tokens
+            if body and body_token.value == '#' and body[-1].value == '#' and not body_token.space_before and \
+                    body_token.type is TokenEnum.UNKNOWN and body[-1].type is TokenEnum.UNKNOWN:
+                body[-1] = PasteOperator(TokenEnum.UNKNOWN, '##', token.location, EmptyHideSet,
+                                         body[-1].space_before)
+            else:
+                body.append(body_token)
+        macro = cls(name, parameters, tuple(body), variadic)
+        macro.check(token)
+        return macro
+
+    def check(self, token):
+        if self.body and (is_paste(self.body[0]) or is_paste(self.body[-1])):
+            raise Exception('%s: "##" at the border of macro "%s"' % (position(token), self.name))
+        if self.parameters is not None:
+            for index, body_token in enumerate(self.body):
+                if body_token.type is TokenEnum.UNKNOWN and body_token.value == '#' and (
+                        index + 1 == len(self.body) or self.body[index + 1].value not in self.parameter_indices):
+                    raise Exception('%s: "#" is not followed by a parameter of macro "%s"' % (position(token),
+                                                                                             self.name))
+
+    def definition(self):
+        return (self.parameters, self.variadic,
+                tuple((token.type, token.value, token.space_before) for token in self.body))
+
+
+class MacroTable(object):
+
+    def __init__(self):
+        self.macros = {}
+        self.expansions = {}
+        self.dependents = {}
+
+    def __contains__(self, name):
+        return name in self.macros
+
+    def get(self, name):
+        return self.macros.get(name)
+
+    def define(self, macro):
+        previous = self.macros.get(macro.name)
+        if previous is not None and previous.definition() == macro.definition():
+            return
+        self.macros[macro.name] = macro
+        self.invalidate(macro.name)
+
+    def undefine(self, name):
+        if self.macros.pop(name, None) is not None:
+            self.invalidate(name)
+
+    def invalidate(self, name):
+        for dependent in self.dependents.pop(name, ()):
+            self.expansions.pop(dependent, None)
+
+    def clear(self):
+        self.macros.clear()
+        self.expansions.clear()
+        self.dependents.clear()
+
+    def directive(self, token):
+        """
+        Process a '#define' or '#undef' directive token, other directives are
+        ignored.
+        """
+        name = DirectiveNamePattern.match(token.value).group()
+        if name == 'define':
+            self.define(Macro.from_directive(token))
+        elif name == 'undef':
+            match = UndefPattern.match(token.value)
+            if match is None:
+                raise Exception('%s: invalid directive "#%s"' % (position(token), token.value))
+            self.undefine(match.group(1))
+
+    def expansion(self, macro, looked_up=None):
+        """
+        Return the cached expansion of an object-like macro as a tuple of
+        tokens, or None if the expansion depends on its context.
+        """
+        entry = self.expansions.get(macro.name)
+        if entry is None:
+            names = set()
+            expander = MacroExpander((), self, False, names)
+            expander.push_back(expander.substitute(macro, (), frozenset((macro.name,))))
+            try:
+                tokens = tuple(expander)
+            except IncompleteMacroInvocation:
+                if looked_up is not None:
+                    looked_up.update(names)
+                return None
+            names.add(macro.name)
+            entry = self.expansions[macro.name] = (tokens, frozenset(names))
+            for name in names:
+                self.dependents.setdefault(name, set()).add(macro.name)
+        if looked_up is not None:
+            looked_up.update(entry[1])
+        return entry[0]
+
+
+class MacroExpander(object):
+    """
+    Yields the tokens of tokens with all macros expanded. If directives is
+    True, '#define' and '#undef' directives update the macro table. If
+    looked_up is a set, every name that is looked up in the macro table is
+    added to it.
+    """
+    def __init__(self, tokens, macro_table=None, directives=True, looked_up=None):
+        self.tokens = iter(tokens)
+        self.macro_table = macro_table if macro_table is not None else MacroTable()
+        self.directives = directives
+        self.looked_up = looked_up
+        self.pending = []
+
+    def __iter__(self):
+        return self.expand()
+
+    def next_token(self):
+        if self.pending:
+            return self.pending.pop()
+        return next(self.tokens, None)
+
+    def push_back(self, tokens):
+        self.pending.extend(reversed(tokens))
+
+    def expand(self):
+        macros = self.macro_table.macros
+        next_token = self.next_token
+        looked_up = self.looked_up
+        token = next_token()
+        while token is not None:
+            token_type = token.type
+            if token_type in WordTypes:
+                name = token.value
+                if looked_up is not None:
+                    looked_up.add(name)
+                macro = macros.get(name)
+                if macro is not None:
+                    hide_set = getattr(token, 'hide_set', EmptyHideSet)
+                    if name not in hide_set:
+                        if macro.parameters is None:
+                            expansion = self.macro_table.expansion(macro, looked_up) if not hide_set else None
+                            if expansion is None:
+                                self.push_back(self.substitute(macro, (), hide_set | frozenset((name,))))
+                            elif expansion:
+                                for expanded_token in expansion[:-1]:
+                                    yield expanded_token
+                                tail = expansion[-1]
+                                if tail.type in WordTypes and tail.value in macros and \
+                                        macros[tail.value].parameters is not None and \
+                                        tail.value not in tail.hide_set:
+                                    self.pending.append(tail)
+                                else:
+                                    yield tail
+                            token = next_token()
+                            continue
+                        invocation = self.read_arguments(macro, token)
+                        if invocation is not None:
+                            arguments, closing_token = invocation
+                            hide_set = (hide_set & getattr(closing_token, 'hide_set', EmptyHideSet)) | \
+                                frozenset((name,))
+                            self.push_back(self.substitute(macro, arguments, hide_set))
+                            token = next_token()
+                            continue
+            elif token_type is TokenEnum.PREPROCESSOR_DIRECTIVE and self.directives:
+                self.macro_table.directive(token)
+            yield token
+            token = next_token()
+
+    def read_arguments(self, macro, name_token):
+        """
+        Read the arguments of an invocation of a function-like macro. Return
+        the arguments and the closing parenthesis, or None and leave the
+        input untouched if the name is not followed by '('.
+        """
+        skipped = []
+        token = self.next_token()
+        while token is not None and token.type in TriviaTypes:
+            skipped.append(token)
+            token = self.next_token()
+        if token is None or token.type is not TokenEnum.LEFT_PARENTHESIS:
+            if token is not None:
+                skipped.append(token)
+            self.push_back(skipped)
+            return None
+        arguments = [[]]
+        depth = 0
+        space_before = False
+        while True:
+            token = self.next_token()
+            if token is None:
+                raise IncompleteMacroInvocation('%s: unterminated invocation of macro "%s"' % (position(name_token),
+                                                                                               macro.name))
+            token_type = token.type
+            if token_type in TriviaTypes:
+                space_before = True
+                continue
+            if token_type is TokenEnum.PREPROCESSOR_DIRECTIVE:
+                raise Exception('%s: directive in the arguments of macro "%s"' % (position(token), macro.name))
+            if token_type is TokenEnum.LEFT_PARENTHESIS:
+                depth += 1
+            elif token_type is TokenEnum.RIGHT_PARENTHESIS:
+                if depth == 0:
+                    break
+                depth -= 1
+            elif token_type is TokenEnum.COMMA and depth == 0 and not (
+                    macro.variadic and len(arguments) == len(macro.parameters)):
+                arguments.append([])
+                space_before = False
+                continue
+            # Rescanned expansions have no whitespace tokens, their tokens
+            # know whether they follow a space
+            arguments[-1].append(MacroToken(token_type, token.value, token.location,
+                                            getattr(token, 'hide_set', EmptyHideSet),
+                                            space_before or getattr(token, 'space_before', False)))
+            space_before = False
+        if not macro.parameters and arguments == [[]]:
+            arguments = []
+        elif macro.variadic and len(arguments) == len(macro.parameters) - 1:
+            arguments.append([])
+        if len(arguments) != len(macro.parameters):
+            raise Exception('%s: macro "%s" expects %d arguments, got %d' % (
+                position(name_token), macro.name, len(macro.parameters), len(arguments)))
+        return arguments, token
+
+    def expand_argument(self, argument):
+        return list(MacroExpander(argument, self.macro_table, False, self.looked_up))
+
+    def substitute(self, macro, arguments, hide_set):
+        """
+        Return the body of macro with the arguments substituted, '#' and '##'
+        applied and hide_set added to the hide set of every token. None
+        stands for an empty argument next to '##', i.e. a placemarker.
+        """
+        body = macro.body
+        parameter_indices = macro.parameter_indices
+        expanded_arguments = {}
+        result = []
+        index = 0
+        while index < len(body):
+            token = body[index]
+            if token.type is TokenEnum.UNKNOWN:
+                if token.value == '#' and macro.parameters is not None:
+                    argument = arguments[parameter_indices[body[index + 1].value]]
+                    result.append(self.stringize(argument, token))
+                    index += 2
+                    continue
+                if is_paste(token):
+                    right = body[index + 1]
+                    if right.value in parameter_indices and right.type in WordTypes:
+                        right_tokens = arguments[parameter_indices[right.value]]
+                    else:
+                        right_tokens = [right]
+                    left = result.pop()
+                    if left is None:
+                        result.extend(right_tokens or [None])
+                    elif right_tokens:
+                        result.append(self.paste(left, right_tokens[0]))
+                        result.extend(right_tokens[1:])
+                    else:
+                        result.append(left)
+                    index += 2
+                    continue
+            if token.type in WordTypes and token.value in parameter_indices:
+                parameter_index = parameter_indices[token.value]
+                if index + 1 < len(body) and is_paste(body[index + 1]):
+                    result.extend(arguments[parameter_index] or [None])
+                else:
+                    if parameter_index not in expanded_arguments:
+                        expanded_arguments[parameter_index] = self.expand_argument(arguments[parameter_index])
+                    result.extend(expanded_arguments[parameter_index])
+            else:
+                result.append(token)
+            index += 1
+        return [MacroToken(token.type, token.value, token.location, token.hide_set | hide_set, token.space_before)
+                for token in result if token is not None]
+
+    def stringize(self, argument, hash_token):
+        text = ''.join((' ' if token.space_before and index > 0 else '') + spelling(token)
+                       for index, token in enumerate(argument))
+        return MacroToken(TokenEnum.STRING_CONSTANT, text, hash_token.location, EmptyHideSet, hash_token.space_before)
+
+    def paste(self, left, right):
+        text = spelling(left) + spelling(right)
+        if text == '##':
+            # Not lexed, that would give two '#' tokens
+            tokens = [MacroToken(TokenEnum.UNKNOWN, text, left.location)]
+        else:
+            tokens = lex_text(text, left.location)
+        if len(tokens) != 1:
+            raise Exception('%s: pasting "%s" and "%s" does not give a valid token' % (
+                position(left), spelling(left), spelling(right)))
+        token = tokens[0]
+        token.space_before = left.space_before
+        token.hide_set = left.hide_set & right.hide_set
+        return token
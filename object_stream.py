@@ -2,10 +2,20 @@
 __author__ = 'Christian Mönch'
 
 
+from collections import deque
+
+
 class ObjectStream(object):
-    def __init__(self, object_stream):
+    """
+    Provides look ahead and push back on top of an object source. The queue
+    holds the current object followed by the objects that were looked at in
+    advance. If max_look_ahead is given, the queue never holds more than
+    max_look_ahead + 1 objects.
+    """
+    def __init__(self, object_stream, max_look_ahead=None):
         self.object_stream = object_stream
-        self.object_queue = []
+        self.object_queue = deque()
+        self.max_look_ahead = max_look_ahead
 
     def get_current_object(self):
         if len(self.object_queue) == 0:
@@ -14,7 +24,7 @@ class ObjectStream(object):
 
     def get_next_object(self):
         if self.object_queue:
-            del self.object_queue[0]
+            self.object_queue.popleft()
         if len(self.object_queue) == 0:
             new_object = self.object_stream.get_next_object()
             if new_object is None:
@@ -22,7 +32,41 @@ class ObjectStream(object):
             self.object_queue.append(new_object)
         return self.object_queue[0]
 
+    def skip_objects(self, count):
+        """
+        Advance by count objects like count calls of get_next_object() and
+        return the new current object. Sources with a skip_objects() method
+        skip the objects without delivering them.
+        """
+        queue = self.object_queue
+        if not queue:
+            # The first call of get_next_object() does not drop an object
+            if count == 0:
+                return None
+            count -= 1
+        elif count < len(queue):
+            for _ in range(count):
+                queue.popleft()
+            return queue[0]
+        else:
+            count -= len(queue)
+            queue.clear()
+        skip_objects = getattr(self.object_stream, 'skip_objects', None)
+        if skip_objects is not None:
+            skip_objects(count)
+        else:
+            for _ in range(count):
+                if self.object_stream.get_next_object() is None:
+                    return None
+        new_object = self.object_stream.get_next_object()
+        if new_object is None:
+            return None
+        queue.append(new_object)
+        return new_object
+
     def look_ahead(self, count):
+        if self.max_look_ahead is not None and count > self.max_look_ahead:
+            raise Exception('look ahead of %d exceeds the maximum of %d' % (count, self.max_look_ahead))
         while len(self.object_queue) < count + 1:
             next_object = self.object_stream.get_next_object()
             if next_object is None:
@@ -31,4 +75,6 @@ class ObjectStream(object):
         return self.object_queue[count]
 
     def push_object(self, an_object):
-        self.object_queue.insert(0, an_object)
+        if self.max_look_ahead is not None and len(self.object_queue) > self.max_look_ahead:
+            raise Exception('push back exceeds the maximum look ahead of %d' % self.max_look_ahead)
+        self.object_queue.appendleft(an_object)
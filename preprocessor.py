@@ -0,0 +1,451 @@
+# -*- encoding: utf-8 -*-
+"""
+An #include and conditional compilation stage in front of the parser.
+
+Preprocessor.tokens(path) yields the tokens of a source file in which every
+#include directive is replaced by the tokens of the included file. Quoted
+names are searched in the directory of the including file first and then in
+the include paths, names in angle brackets are only searched in the include
+paths.
+
+Every file is read only once per Preprocessor, contents and tokens are
+cached by resolved path. When a file is loaded, it is checked for
+'#pragma once' and for a classic include guard, i.e. a file that is enclosed
+in '#ifndef X', '#define X', ..., '#endif'. A file with '#pragma once' is
+included only once, a guarded file is skipped as long as its guard macro is
+defined. Such repeated includes do not touch the file system.
+
+Conditional directives are evaluated. The tokens of a file are lexed on
+demand in segments that end after a conditional directive, the text of
+inactive regions is skipped by CRegexLexer.skip_conditional_region() and
+never tokenized. Segments and skipped regions are cached by offset, so the
+same file can be included again with different macro definitions.
+
+All other directives are passed on as PREPROCESSOR_DIRECTIVE tokens. '#define'
+and '#undef' update the MacroTable of the preprocessor, which is also used
+to check the guard macros. expanded_tokens() and lexer() run the tokens
+through a MacroExpander that uses this table.
+
+usage: python preprocessor.py [-I<directory>...] file
+"""
+import os
+import re
+import ast
+from c_lexer import TokenEnum
+from c_parser import CParser
+from c_regex_lexer import CRegexLexer
+from character_input import MappedFileCharacterInput
+from macro_expander import MacroExpander, MacroTable, MacroToken, WordTypes, lex_text, position
+from token_array import TokenArray, TokenTypeNumbers
+from token_filters import IteratorLexer
+from token_stream import TokenStream
+
+
+__author__ = 'Christian Mönch'
+
+
+MaxIncludeDepth = 200
+DirectivePattern = re.compile(r'(\w*)\s*(\w*)')
+IncludePattern = re.compile(r'include\s*(?:"([^"\n]*)"|<([^>\n]*)>)')
+NotDefinedPattern = re.compile(r'if\s*!\s*defined\s*(?:\(\s*(\w+)\s*\)|(\w+))\s*$')
+ConditionalDirectives = frozenset(('if', 'ifdef', 'ifndef', 'elif', 'else', 'endif'))
+DirectiveNumber = TokenTypeNumbers[TokenEnum.PREPROCESSOR_DIRECTIVE]
+IntegerPattern = re.compile(r'(?:0[xX](?P<hexadecimal>[0-9a-fA-F]+)|(?P<octal>0[0-7]*)|(?P<decimal>[1-9][0-9]*))'
+                            r'(?:[uU](?:ll|LL|[lL])?|(?:ll|LL|[lL])[uU]?)?$')
+
+
+def directive_parts(value):
+    """
+    Return the name of a directive and the first word of its argument, e.g.
+    ('ifndef', 'X') for the value 'ifndef X /* guard */'.
+    """
+    return DirectivePattern.match(value).groups()
+
+
+def find_guard(lexer):
+    """
+    Return the name of the include guard macro of the source of lexer or None
+    if the source is not guarded. The first two significant elements have to
+    be '#ifndef X' (or '#if !defined(X)') and '#define X', the last one has to
+    be the '#endif' that belongs to the '#ifndef'.
+    """
+    elements = (element for element in lexer.scan_skeleton() if element[0] != 'comment')
+    first, second = next(elements, None), next(elements, None)
+    if second is None or first[0] != 'directive' or second[0] != 'directive':
+        return None
+    name, guard = directive_parts(first[3])
+    if name == 'if':
+        match = NotDefinedPattern.match(first[3])
+        guard = (match.group(1) or match.group(2)) if match is not None else ''
+    elif name != 'ifndef':
+        return None
+    if not guard or directive_parts(second[3]) != ('define', guard):
+        return None
+    depth = 1
+    for kind, _, _, text in elements:
+        if depth == 0:
+            # Something follows the '#endif'
+            return None
+        if kind != 'directive':
+            continue
+        name = directive_parts(text)[0]
+        if name in ('if', 'ifdef', 'ifndef'):
+            depth += 1
+        elif name == 'endif':
+            depth -= 1
+        elif name in ('else', 'elif') and depth == 1:
+            return None
+    return guard if depth == 0 else None
+
+
+def has_pragma_once(lexer):
+    for kind, _, _, text in lexer.scan_skeleton():
+        if kind == 'directive' and directive_parts(text) == ('pragma', 'once'):
+            return True
+    return False
+
+
+def divide(left, right):
+    # C division truncates towards zero
+    if right == 0:
+        raise Exception('division by zero')
+    quotient = abs(left) // abs(right)
+    return quotient if (left < 0) == (right < 0) else -quotient
+
+
+UnaryOperators = {
+    '-': lambda operand: -operand,
+    '+': lambda operand: operand,
+    '!': lambda operand: int(not operand),
+    '~': lambda operand: ~operand
+}
+BinaryOperators = {
+    '*': lambda left, right: left * right,
+    '/': divide,
+    '%': lambda left, right: left - right * divide(left, right),
+    '+': lambda left, right: left + right,
+    '-': lambda left, right: left - right,
+    '<<': lambda left, right: left << right,
+    '>>': lambda left, right: left >> right,
+    '<': lambda left, right: int(left < right),
+    '>': lambda left, right: int(left > right),
+    '<=': lambda left, right: int(left <= right),
+    '>=': lambda left, right: int(left >= right),
+    '==': lambda left, right: int(left == right),
+    '!=': lambda left, right: int(left != right),
+    '&': lambda left, right: left & right,
+    '^': lambda left, right: left ^ right,
+    '|': lambda left, right: left | right
+}
+
+
+def integer_value(text):
+    """
+    Return the value of a decimal, octal or hexadecimal integer constant with
+    an optional 'u' and 'l' or 'll' suffix.
+    """
+    match = IntegerPattern.match(text)
+    if match is None:
+        raise Exception('invalid integer constant "%s"' % text)
+    if match.group('hexadecimal') is not None:
+        return int(match.group('hexadecimal'), 16)
+    if match.group('octal') is not None:
+        return int(match.group('octal'), 8)
+    return int(match.group('decimal'))
+
+
+def evaluate(expression):
+    """
+    Evaluate the expression of an '#if' or '#elif' directive.
+    """
+    if isinstance(expression, ast.Constant):
+        if expression.constant_type == 'integer':
+            return integer_value(expression.value)
+        if expression.constant_type == 'character' and len(expression.value) == 1:
+            return ord(expression.value)
+    elif isinstance(expression, ast.UnaryOperation) and expression.operator in UnaryOperators:
+        return UnaryOperators[expression.operator](evaluate(expression.operand))
+    elif isinstance(expression, ast.BinaryOperation):
+        if expression.operator == '&&':
+            return int(bool(evaluate(expression.left)) and bool(evaluate(expression.right)))
+        if expression.operator == '||':
+            return int(bool(evaluate(expression.left)) or bool(evaluate(expression.right)))
+        return BinaryOperators[expression.operator](evaluate(expression.left), evaluate(expression.right))
+    elif isinstance(expression, ast.Conditional):
+        return evaluate(expression.true_value if evaluate(expression.condition) else expression.false_value)
+    raise Exception('unexpected %s' % type(expression).__name__)
+
+
+class SourceFile(object):
+    """
+    A cached source file. guard is the name of its include guard macro or
+    None, once is True if the file contains '#pragma once'. If tokens is
+    given, segments are sliced from it instead of being lexed.
+    """
+    def __init__(self, path, source, tokens=None):
+        self.path = path
+        self.directory = os.path.dirname(path)
+        self.source = source
+        self.lexer = CRegexLexer(source, path)
+        self.tokens = tokens
+        self.segments = {}
+        self.region_ends = {}
+        self.guard = find_guard(self.lexer)
+        self.once = has_pragma_once(self.lexer)
+
+    def segment(self, offset):
+        """
+        Return the tokens from offset up to and including the next
+        conditional directive, or up to the end of the file.
+        """
+        segment = self.segments.get(offset)
+        if segment is None:
+            if self.tokens is not None:
+                segment = self.slice_segment(offset)
+            else:
+                segment = self.lex_segment(offset)
+            self.segments[offset] = segment
+        return segment
+
+    def lex_segment(self, offset):
+        tokens = TokenArray(self.source, self.lexer.line_index)
+        for token_type, start_offset, end_offset, value, _ in self.lexer.scan(offset):
+            tokens.append(token_type, start_offset, end_offset, value)
+            if token_type is TokenEnum.PREPROCESSOR_DIRECTIVE and directive_parts(value)[0] in ConditionalDirectives:
+                break
+        return tokens
+
+    def slice_segment(self, offset):
+        tokens = self.tokens
+        first = end = tokens.bisect_start(offset)
+        while end < len(tokens):
+            end += 1
+            if tokens.types[end - 1] == DirectiveNumber and \
+                    directive_parts(tokens.value(end - 1))[0] in ConditionalDirectives:
+                break
+        return tokens[first:end]
+
+    def skip_region(self, offset):
+        """
+        Return the start offset, the end offset and the name of the directive
+        that ends the inactive region at offset.
+        """
+        region_end = self.region_ends.get(offset)
+        if region_end is None:
+            region_end = self.region_ends[offset] = self.lexer.skip_conditional_region(offset)
+        return region_end
+
+
+class Preprocessor(object):
+
+    def __init__(self, include_paths=(), token_cache=None):
+        self.include_paths = [os.path.abspath(include_path) for include_path in include_paths]
+        self.token_cache = token_cache
+        self.files = {}
+        self.resolved_paths = {}
+        self.included_once = set()
+        self.macros = MacroTable()
+        self.include_count = 0
+        self.skipped_include_count = 0
+
+    def read(self, path):
+        return MappedFileCharacterInput(path).input_string
+
+    def lex(self, source, path):
+        """
+        Return the tokens of a whole file from the token cache, or None if
+        there is no token cache, i.e. if tokens are lexed on demand.
+        """
+        if self.token_cache is not None:
+            return self.token_cache.tokens_for(source, path)
+        return None
+
+    def load(self, path):
+        """
+        Return the SourceFile for a resolved path, the file is read only on
+        the first call.
+        """
+        source_file = self.files.get(path)
+        if source_file is None:
+            source = self.read(path)
+            source_file = self.files[path] = SourceFile(path, source, self.lex(source, path))
+        return source_file
+
+    def resolve(self, name, angled, directory):
+        key = (name, angled, None if angled else directory)
+        path = self.resolved_paths.get(key)
+        if path is None:
+            for include_directory in (self.include_paths if angled else [directory] + self.include_paths):
+                candidate = os.path.join(include_directory, name)
+                if os.path.isfile(candidate):
+                    path = self.resolved_paths[key] = os.path.realpath(candidate)
+                    break
+        return path
+
+    def include(self, token, source_file):
+        """
+        Return the SourceFile that is included by the directive token, or
+        None if the inclusion can be skipped.
+        """
+        match = IncludePattern.match(token.value)
+        if match is None:
+            raise Exception('%s: unsupported include directive "#%s"' % (position(token), token.value))
+        angled = match.group(1) is None
+        name = match.group(2) if angled else match.group(1)
+        path = self.resolve(name, angled, source_file.directory)
+        if path is None:
+            raise Exception('%s: cannot find include file "%s"' % (position(token), name))
+        self.include_count += 1
+        if path in self.included_once:
+            self.skipped_include_count += 1
+            return None
+        included_file = self.files.get(path)
+        if included_file is not None and included_file.guard is not None and included_file.guard in self.macros:
+            self.skipped_include_count += 1
+            return None
+        return self.load(path)
+
+    def is_true(self, token, text):
+        """
+        Evaluate the expression text of an '#if' or '#elif' directive token.
+        """
+        tokens = []
+        source_tokens = lex_text(text, token.location)
+        index = 0
+        while index < len(source_tokens):
+            source_token = source_tokens[index]
+            index += 1
+            if source_token.value != 'defined' or source_token.type is not TokenEnum.ID:
+                tokens.append(source_token)
+                continue
+            parenthesized = index < len(source_tokens) and source_tokens[index].value == '('
+            name_index = index + 1 if parenthesized else index
+            if name_index >= len(source_tokens) or source_tokens[name_index].type not in WordTypes or (
+                    parenthesized and (name_index + 1 >= len(source_tokens) or
+                                       source_tokens[name_index + 1].value != ')')):
+                raise Exception('%s: "defined" without a macro name' % position(token))
+            tokens.append(MacroToken(TokenEnum.INTEGER_CONSTANT,
+                                     '1' if source_tokens[name_index].value in self.macros else '0', token.location))
+            index = name_index + 2 if parenthesized else name_index + 1
+        # Identifiers that are left after the expansion are replaced by 0
+        tokens = [expanded_token if expanded_token.type not in WordTypes else
+                  MacroToken(TokenEnum.INTEGER_CONSTANT, '0', expanded_token.location)
+                  for expanded_token in MacroExpander(tokens, self.macros, directives=False)]
+        if not tokens:
+            raise Exception('%s: missing expression in "#%s"' % (position(token), token.value))
+        parser = CParser(TokenStream(IteratorLexer(tokens)))
+        parser.get_next_token()
+        try:
+            expression = parser.constant_expression()
+            if parser.current_token is not None:
+                raise Exception('unexpected "%s"' % parser.current_token.value)
+            return evaluate(expression) != 0
+        except Exception as exception:
+            raise Exception('%s: invalid expression in "#%s": %s' % (position(token), token.value, exception))
+
+    def conditional(self, token, name, conditions, source_file):
+        """
+        Process a conditional directive token and return the offset at which
+        the tokens of source_file continue. conditions holds a list
+        [taken, token] for every open conditional of source_file, taken is
+        True once a branch of the conditional was active.
+        """
+        if name == 'if' or name == 'ifdef' or name == 'ifndef':
+            if name == 'if':
+                active = self.is_true(token, token.value[2:])
+            else:
+                macro_name = directive_parts(token.value)[1]
+                if not macro_name:
+                    raise Exception('%s: missing macro name in "#%s"' % (position(token), token.value))
+                active = (macro_name in self.macros) == (name == 'ifdef')
+            conditions.append([active, token])
+        elif not conditions:
+            raise Exception('%s: "#%s" without "#if"' % (position(token), name))
+        elif name == 'endif':
+            conditions.pop()
+            return token.end_offset + 1
+        elif not conditions[-1][0]:
+            # The preceding inactive region ends at this directive
+            active = name == 'else' or self.is_true(token, token.value[4:])
+            conditions[-1][0] = active
+        else:
+            active = False
+        if active:
+            return token.end_offset + 1
+        return self.skip(source_file, token.end_offset + 1, conditions)
+
+    def skip(self, source_file, offset, conditions):
+        """
+        Skip inactive regions from offset on and return the offset of the
+        directive that may end them.
+        """
+        while True:
+            start_offset, end_offset, name = source_file.skip_region(offset)
+            if name == 'endif' or not conditions[-1][0]:
+                return start_offset
+            # A branch was already taken, '#elif' and '#else' are skipped
+            offset = end_offset
+
+    def tokens(self, path):
+        """
+        Yield the tokens of the file at path with all includes expanded and
+        inactive regions removed.
+        """
+        stack = []
+        source_file = self.load(os.path.realpath(path))
+        while source_file is not None:
+            if len(stack) >= MaxIncludeDepth:
+                raise Exception('%s: includes nested too deeply' % source_file.path)
+            if source_file.once:
+                self.included_once.add(source_file.path)
+            stack.append([source_file, iter(source_file.segment(0)), []])
+            source_file = None
+            while stack and source_file is None:
+                frame = stack[-1]
+                current_file, tokens, conditions = frame
+                for token in tokens:
+                    if token.type is TokenEnum.PREPROCESSOR_DIRECTIVE:
+                        name, argument = directive_parts(token.value)
+                        if name in ConditionalDirectives:
+                            yield token
+                            frame[1] = iter(current_file.segment(self.conditional(token, name, conditions,
+                                                                                  current_file)))
+                            break
+                        if name == 'include':
+                            source_file = self.include(token, current_file)
+                            if source_file is not None:
+                                break
+                            continue
+                        if name == 'define' or name == 'undef':
+                            self.macros.directive(token)
+                    yield token
+                else:
+                    if conditions:
+                        raise Exception('%s: unterminated "#%s"' % (position(conditions[-1][1]),
+                                                                    conditions[-1][1].value))
+                    stack.pop()
+
+    def expanded_tokens(self, path):
+        """
+        Yield the tokens of the file at path with all includes and macros
+        expanded.
+        """
+        return iter(MacroExpander(self.tokens(path), self.macros, directives=False))
+
+    def lexer(self, path):
+        """
+        Return an object with get_next_token() for TokenStream and CParser,
+        it reads the expanded tokens of the file at path.
+        """
+        return IteratorLexer(self.expanded_tokens(path))
+
+
+if __name__ == '__main__':
+    import sys
+    from c_generator import CGenerator
+
+    arguments = sys.argv[1:]
+    preprocessor = Preprocessor([argument[2:] for argument in arguments if argument.startswith('-I')])
+    for argument in arguments:
+        if not argument.startswith('-I'):
+            CGenerator().write_translation_unit(sys.stdout, CParser(TokenStream(preprocessor.lexer(argument))).parse())
@@ -1,7 +1,8 @@
 # -*- encoding: utf-8 -*-
+import io
 from unittest import TestCase
-from c_lexer import CLexer
-from character_input import StringCharacterInput
+from c_lexer import CLexer, SourceToken, SymbolTable, TokenEnum
+from character_input import FileCharacterInput, StringCharacterInput
 from object_stream import ObjectStream
 
 
@@ -63,7 +64,7 @@ continuation line"
         lexer = CLexer(input_stream)
         token = lexer.get_next_token()
         while token is not None:
-            print token
+            print(token)
             token = lexer.get_next_token()
 
     def process_block_comment(self, block_comment):
@@ -226,3 +227,131 @@ continuation line"
         self.assertEqual(token.value, '++')
         token = lexer.get_next_token()
         self.assertEqual(token.value, '+')
+
+    def test_token_span(self):
+        input_stream = ObjectStream(StringCharacterInput('a\n  bc "d"'))
+        lexer = CLexer(input_stream)
+        tokens = [lexer.get_next_token() for _ in range(5)]
+        self.assertEqual([t.value for t in tokens], ['a', '\n  ', 'bc', ' ', 'd'])
+        self.assertEqual((tokens[2].location.start.line, tokens[2].location.start.column), (2, 3))
+        self.assertEqual((tokens[2].location.end.line, tokens[2].location.end.column), (2, 4))
+        self.assertEqual((tokens[4].location.start.column, tokens[4].location.end.column), (6, 8))
+
+    def test_symbols(self):
+        symbol_table = SymbolTable()
+        lexer = CLexer(ObjectStream(StringCharacterInput('int size_t x size_t')), symbol_table)
+        tokens = [lexer.get_next_token() for _ in range(7)]
+        self.assertEqual(tokens[0].type, TokenEnum.INT)
+        self.assertLess(tokens[0].symbol, symbol_table.key_word_count)
+        self.assertEqual(tokens[2].symbol, tokens[6].symbol)
+        self.assertIs(tokens[2].value, tokens[6].value)
+        self.assertNotEqual(tokens[2].symbol, tokens[4].symbol)
+        self.assertIsNone(tokens[1].symbol)
+        self.assertEqual(symbol_table.text(tokens[4].symbol), 'x')
+
+        lexer = CLexer(ObjectStream(StringCharacterInput('x')), symbol_table)
+        self.assertEqual(lexer.get_next_token().symbol, tokens[4].symbol)
+
+    def test_source_values(self):
+        source = 'x = 12 /* a */ + y\\\nz <<= 3\\\n4;\n#define A 1\n'
+        tokens = list(CLexer(ObjectStream(StringCharacterInput(source)), source=source))
+        comment = tokens[6]
+        self.assertIsInstance(comment, SourceToken)
+        self.assertIsNone(comment.text)
+        self.assertEqual((comment.start_offset, comment.end_offset), (7, 14))
+        self.assertIs(comment.value, comment.value)
+        self.assertEqual([t.value for t in tokens if t.type is not TokenEnum.WHITESPACE],
+                         ['x', '=', '12', '/* a */', '+', 'yz', '<<=', '34', ';', 'define A 1'])
+        # A removed continuation inside the token gives a joined value
+        self.assertNotIsInstance(tokens[14], SourceToken)
+        self.assertIs(tokens[2].value, list(CLexer(ObjectStream(StringCharacterInput('a=b'))))[1].value)
+
+        # Without the complete source the values are joined
+        for character_input in (FileCharacterInput(io.StringIO(source), 'a.c'), StringCharacterInput(source)):
+            joined_tokens = list(CLexer(ObjectStream(character_input)))
+            self.assertFalse([t for t in joined_tokens if isinstance(t, SourceToken)])
+            self.assertEqual([(t.type, t.value) for t in joined_tokens], [(t.type, t.value) for t in tokens])
+
+    def test_iter_tokens(self):
+        source = 'ab\\\ncd 1\\\n2 <\\\n<= "x" /y #\n#define z\n \\\n @'
+        tokens = list(CLexer(ObjectStream(StringCharacterInput(source))))
+        lexer = CLexer(ObjectStream(StringCharacterInput(source)))
+        expected = [lexer.get_next_token() for _ in range(len(tokens) + 1)]
+        self.assertIsNone(expected.pop())
+        self.assertEqual([(t.type, t.value, t.location.start, t.location.end) for t in tokens],
+                         [(t.type, t.value, t.location.start, t.location.end) for t in expected])
+        self.assertEqual([t.value for t in tokens if t.type is not TokenEnum.WHITESPACE],
+                         ['abcd', '12', '<', '<=', 'x', '/', 'y', '#', 'define z', '@'])
+
+        # Tokens can be taken from the lexer between the generated ones
+        lexer = CLexer(ObjectStream(StringCharacterInput('a b c')))
+        iterator = iter(lexer)
+        self.assertEqual(next(iterator).value, 'a')
+        self.assertEqual(lexer.get_next_token().value, ' ')
+        self.assertEqual([t.value for t in iterator], ['b', ' ', 'c'])
+
+    def test_indented_directives(self):
+        # Only whitespace may be in front of the '#' of a directive in its line
+        source = '  #if A\nx # y\n\t/* c */ #z\n \\\n  # define B\n'
+        for skip_trivia, lexer_source in ((False, None), (False, source), (True, None), (True, source)):
+            lexer = CLexer(ObjectStream(StringCharacterInput(source)), skip_trivia=skip_trivia, source=lexer_source)
+            tokens = [t for t in lexer if t.type not in (TokenEnum.WHITESPACE, TokenEnum.COMMENT)]
+            self.assertEqual([(t.type, t.value) for t in tokens],
+                             [(TokenEnum.PREPROCESSOR_DIRECTIVE, 'if A'), (TokenEnum.ID, 'x'), (TokenEnum.UNKNOWN, '#'),
+                              (TokenEnum.ID, 'y'), (TokenEnum.UNKNOWN, '#'), (TokenEnum.ID, 'z'),
+                              (TokenEnum.PREPROCESSOR_DIRECTIVE, 'define B')])
+
+    def test_skip_trivia(self):
+        source = '/* a */ int\n// b\n  x; /*/ c */\n#define y\n'
+        # With the source, whole runs of trivia are found in the source
+        for lexer_source in (None, source):
+            lexer = CLexer(ObjectStream(StringCharacterInput(source)), skip_trivia=True, source=lexer_source)
+            tokens = list(lexer)
+            self.assertEqual([t.value for t in tokens], ['int', 'x', ';', 'define y'])
+            self.assertEqual((tokens[1].location.start.line, tokens[1].location.start.column), (3, 3))
+            self.assertEqual(lexer.skipped_trivia, len(source) - len('intx;#define y'))
+
+            lexer = CLexer(ObjectStream(StringCharacterInput('a /* b')), skip_trivia=True,
+                           source=lexer_source and 'a /* b')
+            self.assertEqual(lexer.get_next_token().value, 'a')
+            self.assertRaises(Exception, lexer.get_next_token)
+
+        # Continuations in whitespace are removed, behind comments they are not
+        source = 'a \\\n \\\nb/**/\\\nc // d\\\n e'
+        expected = [(t.value, tuple(t.location.start))
+                    for t in CLexer(ObjectStream(StringCharacterInput(source)), skip_trivia=True)]
+        self.assertEqual(expected[:3], [('a', ('<memory string>', 1, 1)), ('b', ('<memory string>', 3, 1)),
+                                        ('\\', ('<memory string>', 3, 6))])
+        lexer = CLexer(ObjectStream(StringCharacterInput(source)), skip_trivia=True, source=source)
+        self.assertEqual([(t.value, tuple(t.location.start)) for t in lexer], expected)
+
+    def test_statistics(self):
+        lexer = CLexer(ObjectStream(StringCharacterInput('int ab; /* c */ "d\\\ne" +=\n')), collect_statistics=True)
+        self.assertEqual(len(list(lexer)), 11)
+        stats = lexer.stats()
+        self.assertEqual(stats['tokens']['WHITESPACE'], 5)
+        self.assertEqual(stats['characters']['ID'], 2)
+        self.assertEqual(stats['characters']['STRING_CONSTANT'], 4)
+        self.assertEqual(stats['branches'], {'word': 2, 'whitespace': 5, 'single_character': 1, 'block_comment': 1,
+                                             'string': 1, 'double_character': 1, 'end': 1})
+        self.assertEqual(stats['continuations'], 1)
+        self.assertEqual(stats['continuation_checks'], 1)
+        self.assertEqual(stats['calls']['get_next_character'], 25)
+
+        lexer = CLexer(ObjectStream(StringCharacterInput('a /* b */ c')), skip_trivia=True, collect_statistics=True)
+        list(lexer)
+        self.assertEqual(lexer.stats()['characters'], {'ID': 2})
+        self.assertEqual(lexer.stats()['skipped_trivia'], 9)
+        self.assertEqual(lexer.stats()['branches'], {'word': 2, 'skipped_whitespace': 2, 'skipped_block_comment': 1,
+                                                     'end': 1})
+
+        # Branches that fail and backslashes without a newline are counted
+        lexer = CLexer(ObjectStream(StringCharacterInput('"\\n" <<= a \\ /* b')), collect_statistics=True)
+        self.assertRaises(Exception, list, lexer)
+        stats = lexer.stats()
+        self.assertEqual(stats['branches'], {'string': 1, 'whitespace': 4, 'triple_character': 1, 'word': 1,
+                                             'unknown': 1, 'block_comment': 1})
+        self.assertEqual(stats['continuation_checks'], 2)
+        self.assertEqual(stats['continuations'], 0)
+
+        self.assertRaises(Exception, CLexer(ObjectStream(StringCharacterInput('a'))).stats)
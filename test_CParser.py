@@ -4,7 +4,9 @@ from unittest import TestCase
 __author__ = 'Christian Mönch'
 
 
+import io
 import logging
+import ast
 from c_parser import *
 from object_stream import ObjectStream
 from character_input import StringCharacterInput
@@ -13,10 +15,10 @@ import c_generator
 
 class TestCParser(TestCase):
 
-    def parser_for(self, source):
+    def parser_for(self, source, type_table=None):
         input_stream = ObjectStream(StringCharacterInput(source))
         lexer = CLexer(input_stream)
-        return CParser(lexer)
+        return CParser(lexer, type_table)
 
     def test_declaration_list(self):
         # TODO: compare results from parser output directly in order to isolate
@@ -47,15 +49,228 @@ class TestCParser(TestCase):
         parser = self.parser_for('()')
         parser.get_next_token()
         pl = parser.parameter_list()
-        print pl
+        print(pl)
         self.assertEqual(pl, [])
 
         parser = self.parser_for('(int argc)')
         parser.get_next_token()
         pl = parser.parameter_list()
-        print pl
+        print(pl)
 
         parser = self.parser_for('(int argc, char *argv[])')
         parser.get_next_token()
         pl = parser.parameter_list()
-        print pl
+        print(pl)
+
+    def test_type_table(self):
+        type_table = ast.TypeTable()
+        parser = CParser(CLexer(ObjectStream(StringCharacterInput('char**a,**b,*c,*(*d)(int,char**)'))), type_table)
+        parser.get_next_token()
+        basic_type, variable_spec_list = parser.declaration_list()
+        self.assertIs(variable_spec_list[0][1], variable_spec_list[1][1])
+        self.assertIsNot(variable_spec_list[0][1], variable_spec_list[2][1])
+        self.assertIs(variable_spec_list[3][1].modified_type.parameter[1][2], variable_spec_list[0][1])
+        generator = c_generator.CGenerator(type_table)
+        self.assertEqual(generator.show_declaration_list(basic_type, variable_spec_list),
+                         'char **a, **b, *c, *(*d)(int , char **)')
+        self.assertIn(variable_spec_list[0][1], generator.affix_cache)
+
+        # Array sizes are compared by structure
+        parser = self.parser_for('int a[N], b[N], c[3], d[3], e[N + 1], f[N + 1], g[N - 1], h[], i[], (*j)[3]',
+                                 type_table)
+        parser.get_next_token()
+        a, b, c, d, e, f, g, h, i, j = [modifier for _, modifier in parser.declaration_list()[1]]
+        self.assertIs(a, b)
+        self.assertIs(c, d)
+        self.assertIs(e, f)
+        self.assertIs(h, i)
+        self.assertIsNot(a, c)
+        self.assertIsNot(e, g)
+        self.assertIsNot(a, h)
+        self.assertIs(j.modified_type, c)
+
+        # Parameter names are not part of a function type
+        parser = self.parser_for('int (*a)(int x, char *y), (*b)(int z, char *), (*c)(long x, char *y)', type_table)
+        parser.get_next_token()
+        basic_type, variable_spec_list = parser.declaration_list()
+        a, b, c = [modifier for _, modifier in variable_spec_list]
+        self.assertIs(a, b)
+        self.assertIsNot(a, c)
+        self.assertEqual(generator.show_declaration_list(basic_type, variable_spec_list),
+                         'int (*a)(int , char *), (*b)(int , char *), (*c)(long , char *)')
+
+        # Canonical nodes are shared and can not be modified
+        self.assertRaises(Exception, a.set_modified_type, None)
+        self.assertRaises(Exception, a.modified_type.set_return_type, None)
+        pointer = ast.Pointer(None, None)
+        pointer.set_modified_type(a)
+        self.assertIs(type_table.intern(pointer).modified_type, a)
+
+    def parse_expression(self, source):
+        parser = self.parser_for(source)
+        parser.get_next_token()
+        expression = parser.expression()
+        self.assertIsNone(parser.current_token)
+        return expression
+
+    def test_expressions(self):
+        generator = c_generator.CGenerator()
+        for source_code in ('a + b * c - d',
+                            '(a + b) * (c - d)',
+                            'a - (b - c)',
+                            'a = b += c <<= 1',
+                            'a ? b : c ? d : e',
+                            '(a ? b : c) ? d : e',
+                            'x != y && z << 2 >= 4 || !w',
+                            '*p++ = -*q-- & ~mask ^ bits | flag',
+                            'f(a, (b, c), g())[i]->next.value',
+                            'sizeof(char **) + sizeof x + (long)&y',
+                            '- -a + - - -b',
+                            '"a\\n\\"b" [0] == \'\\\'\'',
+                            'a, b = c'):
+            expression = self.parse_expression(source_code)
+            shown = generator.show_expression(expression)
+            self.assertEqual(generator.show_expression(self.parse_expression(shown)), shown)
+
+        expression = self.parse_expression('a - b - c')
+        self.assertIsInstance(expression.left, ast.BinaryOperation)
+        self.assertEqual(generator.show_expression(self.parse_expression('(a) * ((b + c))')), 'a * (b + c)')
+        self.assertRaises(Exception, self.parse_expression, 'a + ')
+        self.assertRaises(Exception, self.parse_expression, '(a')
+
+    def test_long_and_deep_expressions(self):
+        expression = self.parse_expression(' + '.join(['1'] * 5000))
+        self.assertEqual(expression.operator, '+')
+        depth = 5000
+        expression = self.parse_expression('(' * depth + 'a' + ')' * depth)
+        self.assertEqual(expression.name, 'a')
+        expression = self.parse_expression('- ' * depth + '(char)!a')
+        for _ in range(depth):
+            self.assertEqual(expression.operator, '-')
+            expression = expression.operand
+        self.assertIsInstance(expression, ast.Cast)
+        expression = self.parse_expression('a ? ' * depth + 'b' + ' : c' * depth)
+        for _ in range(depth):
+            self.assertEqual(expression.false_value.name, 'c')
+            expression = expression.true_value
+        self.assertEqual(expression.name, 'b')
+        expression = self.parse_expression('a ? b : ' * depth + 'c')
+        for _ in range(depth):
+            self.assertEqual(expression.condition.name, 'a')
+            expression = expression.false_value
+        self.assertEqual(expression.name, 'c')
+        expression = self.parse_expression('f(x[' * depth + '1' + '])' * depth)
+        for _ in range(depth):
+            expression = expression.arguments[0].index
+        self.assertEqual(expression.value, '1')
+
+        parser = self.parser_for('int a = %s1, 2%s;' % ('{' * depth, '}' * depth))
+        initializer = parser.parse()[0].initializer_list[0]
+        for _ in range(depth - 1):
+            self.assertEqual(len(initializer.initializers), 1)
+            initializer = initializer.initializers[0]
+        self.assertEqual([constant.value for constant in initializer.initializers], ['1', '2'])
+
+    def test_initializers(self):
+        generator = c_generator.CGenerator()
+        parser = self.parser_for('int a = 1, b[N * 2] = {1, {2, 3}, -4,}, c;')
+        declaration_list = parser.parse()[0]
+        self.assertIsNone(declaration_list.initializer_list[2])
+        self.assertEqual(generator.show_declaration_list(declaration_list.basic_type, declaration_list.modifier_list,
+                                                         declaration_list.initializer_list),
+                         'int a = 1, b[N * 2] = {1, {2, 3}, -4}, c')
+
+    def test_typedef_table(self):
+        typedef_table = TypedefTable()
+        typedef_table.file_scope_changes = []
+        typedef_table.add_type('T')
+        typedef_table.push_scope()
+        typedef_table.add_identifier('T')
+        typedef_table.add_type('U')
+        typedef_table.add_identifier('x')
+        self.assertFalse(typedef_table.is_type('T'))
+        self.assertTrue(typedef_table.is_type('U'))
+        typedef_table.pop_scope()
+        self.assertTrue(typedef_table.is_type('T'))
+        self.assertFalse(typedef_table.is_type('U'))
+        self.assertNotIn('U', typedef_table.names)
+        # Only changes inside a scope are logged
+        self.assertEqual(typedef_table.undo_log, [])
+        self.assertEqual(typedef_table.file_scope_changes, ['T'])
+
+    def test_typedefs(self):
+        generator = c_generator.CGenerator()
+        parser = self.parser_for('typedef unsigned long size_t, *size_p;\n'
+                                 'static size_t a, (*f)(size_t size_t, char *b);\n'
+                                 'size_p c = (size_t)d + sizeof(size_t);\n'
+                                 'int size_t;\n'
+                                 'long e = size_t;\n')
+        declaration_lists = parser.parse()
+        self.assertEqual([generator.show_declaration_list(d.basic_type, d.modifier_list, d.initializer_list)
+                          for d in declaration_lists],
+                         ['typedef unsigned long size_t, *size_p',
+                          'static size_t a, (*f)(size_t size_t, char *b)',
+                          'size_p c = (size_t)d + sizeof(size_t)',
+                          'int size_t',
+                          'long e = size_t'])
+        self.assertFalse(parser.typedef_table.is_type('size_t'))
+        self.assertTrue(parser.typedef_table.is_type('size_p'))
+
+    def test_typedef_lexer_feedback(self):
+        typedef_table = TypedefTable()
+        lexer = CLexer(ObjectStream(StringCharacterInput('typedef int T; T x; int T;')), typedef_table=typedef_table)
+        tokens = []
+
+        class RecordingLexer(object):
+            def get_next_token(self):
+                token = lexer.get_next_token()
+                tokens.append(token)
+                return token
+
+        parser = CParser(RecordingLexer(), typedef_table=typedef_table)
+        self.assertEqual(len(parser.parse()), 3)
+        self.assertEqual([t.type for t in tokens if t is not None and t.value == 'T'],
+                         [TokenEnum.ID, TokenEnum.TYPEID, TokenEnum.TYPEID])
+
+    def test_many_typedefs(self):
+        source = ''.join('typedef int t%d;\nt%d v%d;\n' % (i, i, i) for i in range(5000))
+        parser = self.parser_for(source)
+        self.assertEqual(len(parser.parse()), 10000)
+        self.assertTrue(parser.typedef_table.is_type('t4999'))
+
+    def test_deep_declarators(self):
+        depth = 3000
+        for type_table in (None, ast.TypeTable()):
+            generator = c_generator.CGenerator(type_table)
+            source_code = 'char ' + '(*' * depth + 'x' + ')[]' * depth
+            parser = self.parser_for(source_code, type_table)
+            parser.get_next_token()
+            basic_type, variable_spec_list = parser.declaration_list()
+            self.assertEqual(generator.show_declaration_list(basic_type, variable_spec_list), source_code)
+            parser = self.parser_for('int ' + '*' * depth + 'y, ' + '*' * depth + 'z', type_table)
+            parser.get_next_token()
+            basic_type, variable_spec_list = parser.declaration_list()
+            self.assertEqual(generator.show_type('y', variable_spec_list[0][1]), '*' * depth + 'y')
+            if type_table is not None:
+                self.assertIs(variable_spec_list[0][1], variable_spec_list[1][1])
+
+    def test_translation_unit_writer(self):
+        generator = c_generator.CGenerator()
+        source = 'int a, *(*b)[3] = 0;\nchar c[] = {1, {2, 3}, "x"};\nlong (*d)(int e), f;\n'
+        declaration_lists = self.parser_for(source).parse()
+        stream = io.StringIO()
+        self.assertEqual(generator.write_translation_unit(stream, declaration_lists), 3)
+        self.assertEqual(stream.getvalue(), source)
+        fragments = []
+        generator.write_translation_unit(fragments, declaration_lists)
+        self.assertEqual(''.join(fragments), source)
+        fragments = []
+        generator.write_type(fragments.append, 'g', declaration_lists[0].modifier_list[1][1])
+        self.assertEqual(''.join(fragments), '*(*g)[3]')
+
+        # Deep initializers and expressions are written without recursion
+        source = 'int x[] = %s1%s;\nint y = %s;\nint z = %s0%s;\n' % (
+            '{' * 3000, '}' * 3000, ' + '.join(['a'] * 20000), '-(a + ' * 3000, ')' * 3000)
+        stream = io.StringIO()
+        self.assertEqual(generator.write_translation_unit(stream, self.parser_for(source).parse()), 3)
+        self.assertEqual(stream.getvalue(), source)
@@ -0,0 +1,84 @@
+# -*- encoding: utf-8 -*-
+from unittest import TestCase
+from c_lexer import CLexer, TokenEnum
+from c_regex_lexer import CRegexLexer
+from character_input import StringCharacterInput
+from object_stream import ObjectStream
+
+
+__author__ = 'Christian Mönch'
+
+
+class TestCRegexLexer(TestCase):
+
+    def token_list(self, lexer):
+        result = []
+        token = lexer.get_next_token()
+        while token is not None:
+            result.append((token.type, token.value, token.location.start, token.location.end))
+            token = lexer.get_next_token()
+        return result
+
+    def assertSameTokens(self, source):
+        self.assertEqual(
+            self.token_list(CRegexLexer(source)),
+            self.token_list(CLexer(ObjectStream(StringCharacterInput(source)))))
+
+    def test_same_tokens_as_clexer(self):
+        for source in ('int x;',
+                       'a+++b /= c->d',
+                       'char (*(**foo[][])())[];',
+                       '/* block\n * comment */ x // line comment\n',
+                       '/**/ /*/*/',
+                       '"abc\\n\\x2f\\234" \'c\' \'\\0\' \'\\\'\'',
+                       '#define X 1\n#include <a.h>\n  # x\n#\n',
+                       '#pragma a\\\nb\n',
+                       'x # y\n  #  if A\n\t/**/ # z\n \\\n  #endif\n\\\n#\n x\\\n # y',
+                       'ab\\\n\\\ncd 12\\\n34 +\\\n+ "ab\\\ncd"',
+                       '/* x \\\n y */ // x \\\ny\n',
+                       '@ $ ` \xe9'):
+            self.assertSameTokens(source)
+
+    def test_preprocessor_directive(self):
+        lexer = CRegexLexer('#  pragma abc\nx')
+        token = lexer.get_next_token()
+        self.assertEqual(token.type, TokenEnum.PREPROCESSOR_DIRECTIVE)
+        self.assertEqual(token.value, 'pragma abc')
+        self.assertEqual((token.location.start.line, token.location.start.column), (1, 1))
+        self.assertEqual((token.location.end.line, token.location.end.column), (1, 13))
+
+        lexer = CRegexLexer('x;\n \t#  pragma abc\n x # y')
+        tokens = [token for token in lexer if token.type is not TokenEnum.WHITESPACE]
+        self.assertEqual([(token.type, token.value) for token in tokens],
+                         [(TokenEnum.ID, 'x'), (TokenEnum.SEMICOLON, ';'),
+                          (TokenEnum.PREPROCESSOR_DIRECTIVE, 'pragma abc'), (TokenEnum.ID, 'x'),
+                          (TokenEnum.UNKNOWN, '#'), (TokenEnum.ID, 'y')])
+        self.assertEqual((tokens[2].location.start.line, tokens[2].location.start.column), (2, 3))
+
+    def test_errors(self):
+        for source in ('/* abc', '// abc', '"abc', '"abc\ndef"', '"\\q"', "'a", "'ab'"):
+            self.assertRaises(Exception, self.token_list, CRegexLexer(source))
+
+    def test_skip_conditional_region(self):
+        source = ('int a; /* #endif */ "#endif\\" \\\n#endif" // #endif \\\n#endif\n'
+                  "don't #endif\n#if X\n#else\n#endif\nx #endif\n  #if Y\n\t#endif\n#elif 1\n#endif\n")
+        lexer = CRegexLexer(source)
+        start_offset, end_offset, name = lexer.skip_conditional_region(0)
+        self.assertEqual((source[start_offset:end_offset], name), ('#elif 1', 'elif'))
+        self.assertEqual(lexer.skip_conditional_region(end_offset)[2], 'endif')
+        self.assertEqual(lexer.skip_conditional_region(source.index('#if X') + 5)[2], 'else')
+        self.assertRaises(Exception, CRegexLexer('#if X\n#endif /* \n#endif */').skip_conditional_region, 0)
+
+        source = '#ifdef A\n  #if B\n    #ifdef C\n    #endif\n  #else\n  #endif\n  #  else /* x */\n  #endif\n'
+        lexer = CRegexLexer(source)
+        start_offset, end_offset, name = lexer.skip_conditional_region(source.index('\n'))
+        self.assertEqual((source[start_offset:end_offset], name), ('#  else ', 'else'))
+        start_offset, end_offset, name = lexer.skip_conditional_region(end_offset)
+        self.assertEqual((source[start_offset:end_offset], name), ('#endif', 'endif'))
+        self.assertEqual(start_offset, len(source) - 7)
+
+    def test_scan_skeleton(self):
+        lexer = CRegexLexer('/* a */\n#  ifndef \\\nX\nint x = "y";\n#endif\n')
+        self.assertEqual([(kind, text) for kind, _, _, text in lexer.scan_skeleton()],
+                         [('comment', None), ('directive', 'ifndef X'), ('text', None), ('literal', None),
+                          ('text', None), ('directive', 'endif')])
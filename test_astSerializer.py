@@ -0,0 +1,97 @@
+# -*- encoding: utf-8 -*-
+from unittest import TestCase
+import ast
+from ast_serializer import SerializedAST, deserialize, serialize
+from c_generator import CGenerator
+from c_lexer import OffsetSpan, Span
+from c_parser import CParser
+from character_input import Coordinate, LineIndex
+from token_array import TokenArray
+from token_stream import TokenStream
+
+
+__author__ = 'Christian Mönch'
+
+
+class TestASTSerializer(TestCase):
+    source = ('int a, *(*b)[3] = 0;\nchar c[] = {1, {2, 3}, "x\\n"};\nlong (*d)(int e, char *), f;\n'
+              'unsigned g = -1 + sizeof(int *) * (long)h[2] - i.j->k(1, 2) ? l++ : (m, n);\n')
+
+    def parse(self, source, type_table=None):
+        return CParser(TokenStream(TokenArray.from_source(source).reader()), type_table).parse()
+
+    def show(self, declaration_lists):
+        fragments = []
+        CGenerator().write_translation_unit(fragments, declaration_lists)
+        return ''.join(fragments)
+
+    def test_round_trip(self):
+        declaration_lists = self.parse(self.source)
+        loaded = deserialize(serialize(declaration_lists))
+        self.assertEqual(len(loaded), 4)
+        self.assertEqual(self.show(loaded), self.show(declaration_lists))
+        self.assertEqual(self.show(loaded), self.source)
+        self.assertIsInstance(loaded[3].initializer_list[0], ast.Conditional)
+        self.assertEqual(deserialize(serialize([])), [])
+
+    def test_deep_nodes(self):
+        declarator = '%sx%s' % ('(*' * 3000, ')[]' * 3000)
+        loaded = deserialize(serialize(self.parse('int a = %s;\nchar %s;\n' % (' + '.join(['1'] * 5000), declarator))))
+        expression = loaded[0].initializer_list[0]
+        depth = 0
+        while isinstance(expression, ast.BinaryOperation):
+            self.assertEqual(expression.right.value, '1')
+            expression = expression.left
+            depth += 1
+        self.assertEqual(depth, 4999)
+        self.assertEqual(self.show(loaded[1:]), 'char %s;\n' % declarator)
+
+    def test_shared_nodes_and_type_table(self):
+        pointer = ast.Pointer(ast.BasicType('int', None), None)
+        declaration_list = ast.DeclarationList(
+            ast.BasicType('int', None), [(ast.Identifier('a'), pointer), (ast.Identifier('b'), pointer)])
+        loaded = deserialize(serialize([declaration_list, declaration_list]))
+        self.assertIs(loaded[0].modifier_list[0][1], loaded[0].modifier_list[1][1])
+        self.assertIsNot(loaded[0], loaded[1])
+
+        type_table = ast.TypeTable()
+        parsed = self.parse('int *a;\nint *b;\n', type_table)
+        loaded = deserialize(serialize(parsed), type_table)
+        self.assertIs(loaded[0].modifier_list[0][1], parsed[1].modifier_list[0][1])
+        self.assertIs(loaded[1].modifier_list[0][1], parsed[0].modifier_list[0][1])
+
+    def test_lazy_access(self):
+        serialized_ast = SerializedAST(serialize(self.parse(self.source)))
+        self.assertEqual(len(serialized_ast), 4)
+        self.assertEqual(serialized_ast.nodes, [None] * 4)
+        self.assertEqual(self.show([serialized_ast[-2]]), 'long (*d)(int e, char *), f;\n')
+        self.assertEqual(serialized_ast.nodes.count(None), 3)
+        self.assertIs(serialized_ast[2], serialized_ast[-2])
+        self.assertEqual(self.show(serialized_ast), self.source)
+
+    def test_spans(self):
+        line_index = LineIndex('a.c', [0, 10, 25])
+        nodes = [ast.Identifier('a', OffsetSpan(line_index, 12, 13)),
+                 ast.Identifier('b', Span(Coordinate('b.c', 2, 3), Coordinate('b.c', 2, 4))),
+                 ast.Constant('integer', '-1', Span(None, None)),
+                 ast.Identifier('c', OffsetSpan(line_index, 3, 4))]
+        loaded = deserialize(serialize(nodes))
+        self.assertEqual([node.name for node in loaded[:2]], ['a', 'b'])
+        self.assertEqual(tuple(loaded[0].span.start), ('a.c', 2, 3))
+        self.assertEqual(loaded[0].span.end_offset, 13)
+        self.assertEqual(loaded[1].span.end, ('b.c', 2, 4))
+        self.assertIsNone(loaded[2].span.start)
+        self.assertIs(loaded[0].span.line_index, loaded[3].span.line_index)
+        self.assertEqual(loaded[3].span.line_index.line_starts, [0, 10, 25])
+
+    def test_bad_data(self):
+        data = serialize(self.parse(self.source))
+        for bad_data, message in (
+                (b'CA', 'truncated AST data'),
+                (b'XAST' + data[4:], 'not serialized AST data'),
+                (data[:4] + b'\x09' + data[5:], 'unsupported AST format version 9'),
+                (data[:-1], 'truncated AST data')):
+            with self.assertRaises(ValueError) as context:
+                SerializedAST(bad_data)
+            self.assertIn(message, str(context.exception))
+        self.assertRaises(Exception, serialize, [ast.Identifier(object())])
@@ -0,0 +1,45 @@
+# -*- encoding: utf-8 -*-
+import os
+import pickle
+import shutil
+import tempfile
+from unittest import TestCase
+from batch_parser import parse_files, parse_source
+
+
+__author__ = 'Christian Mönch'
+
+
+class TestBatchParser(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write_file(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as output_file:
+            output_file.write(content)
+        return path
+
+    def test_parse_source(self):
+        result = parse_source('#include <a.h>\n/* c */ unsigned int *a, b[];\nchar (*f)(int x);\n', 'a.h')
+        self.assertIsNone(result.error)
+        self.assertEqual(result.declarations, ('unsigned int *a, b[]', 'char (*f)(int x)'))
+        self.assertEqual(pickle.loads(pickle.dumps(result)), result)
+
+        result = parse_source('int a;\nint b c;', 'b.h')
+        self.assertEqual(result.declarations, ())
+        self.assertTrue(result.error.startswith('b.h:2:7: '))
+
+    def test_parse_files(self):
+        paths = [self.write_file('%d.h' % number, 'int x%d;' % number) for number in range(5)]
+        paths.append(self.write_file('bad.h', 'int a b;'))
+        paths.append(os.path.join(self.directory, 'missing.h'))
+        results = dict((result.path, result) for result in parse_files(paths, workers=2, chunk_size=2))
+        self.assertEqual(sorted(results), sorted(paths))
+        for number in range(5):
+            self.assertEqual(results[paths[number]].declarations, ('int x%d' % number,))
+        self.assertTrue(results[paths[-2]].error.startswith(paths[-2] + ':1:7: '))
+        self.assertIsNotNone(results[paths[-1]].error)
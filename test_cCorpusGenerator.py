@@ -0,0 +1,25 @@
+# -*- encoding: utf-8 -*-
+from unittest import TestCase
+from batch_parser import parse_source
+from c_corpus_generator import generate_corpus
+from token_array import TokenArray
+
+
+__author__ = 'Christian Mönch'
+
+
+class TestCCorpusGenerator(TestCase):
+    def test_deterministic(self):
+        self.assertEqual(generate_corpus(10000, 7), generate_corpus(10000, 7))
+        self.assertNotEqual(generate_corpus(10000, 7), generate_corpus(10000, 8))
+        self.assertGreaterEqual(len(generate_corpus(10000)), 10000)
+
+    def test_lexable(self):
+        source = generate_corpus(20000, 1)
+        self.assertIn('\\x4a', source)
+        self.assertGreater(len(TokenArray.from_source(source)), 0)
+
+    def test_parsable(self):
+        result = parse_source(generate_corpus(20000, 1, strings=False), '<corpus>')
+        self.assertIsNone(result.error)
+        self.assertGreater(len(result.declarations), 0)
@@ -0,0 +1,47 @@
+# -*- encoding: utf-8 -*-
+import io
+import os
+import tempfile
+from unittest import TestCase
+from character_input import FileCharacterInput, MappedFileCharacterInput
+
+
+__author__ = 'Christian Mönch'
+
+
+class TestFileCharacterInput(TestCase):
+    def read_all(self, character_input):
+        result = []
+        character = character_input.get_next_object()
+        while character is not None:
+            result.append(character)
+            character = character_input.get_next_object()
+        return result
+
+    def test_text_file(self):
+        characters = self.read_all(FileCharacterInput(io.StringIO('ab\ncd'), buffer_size=2))
+        self.assertEqual(''.join(c.value for c in characters), 'ab\ncd')
+        self.assertEqual((characters[4].coordinate.line, characters[4].coordinate.column), (2, 2))
+        self.assertEqual(self.read_all(FileCharacterInput(io.StringIO(''))), [])
+
+    def test_binary_file(self):
+        # The two byte encoding of 'ö' is split across buffers
+        characters = self.read_all(FileCharacterInput(io.BytesIO('aöb'.encode('utf-8')), buffer_size=2))
+        self.assertEqual(''.join(c.value for c in characters), 'aöb')
+        self.assertEqual([c.offset for c in characters], [0, 1, 2])
+
+    def test_mapped_file(self):
+        handle, file_name = tempfile.mkstemp()
+        try:
+            with os.fdopen(handle, 'wb') as output_file:
+                output_file.write('x\nöy'.encode('utf-8'))
+            character_input = MappedFileCharacterInput(file_name)
+            characters = self.read_all(character_input)
+            self.assertEqual(''.join(c.value for c in characters), 'x\nöy')
+            self.assertEqual(characters[3].coordinate, (file_name, 2, 2))
+
+            with open(file_name, 'wb'):
+                pass
+            self.assertEqual(self.read_all(MappedFileCharacterInput(file_name)), [])
+        finally:
+            os.remove(file_name)
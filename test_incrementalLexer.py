@@ -0,0 +1,109 @@
+# -*- encoding: utf-8 -*-
+import random
+from unittest import TestCase
+from incremental_lexer import relex, relex_edit
+from character_input import LineIndex
+from token_array import TokenArray
+
+
+__author__ = 'Christian Mönch'
+
+
+class TestIncrementalLexer(TestCase):
+
+    def token_tuples(self, tokens):
+        return [(t.type, t.value, t.start_offset, t.end_offset) for t in tokens]
+
+    def assertRelexed(self, source, offset, removed_length, inserted_text):
+        new_source = source[:offset] + inserted_text + source[offset + removed_length:]
+        try:
+            expected = TokenArray.from_source(new_source)
+        except Exception:
+            self.assertRaises(Exception, relex, TokenArray.from_source(source), offset, removed_length, inserted_text)
+            return
+        tokens = relex(TokenArray.from_source(source), offset, removed_length, inserted_text)
+        self.assertEqual(tokens.source, new_source)
+        self.assertEqual(self.token_tuples(tokens), self.token_tuples(expected))
+        line_index = tokens.line_index
+        self.assertEqual([line_index.line_start(line) for line in range(len(line_index.line_starts))],
+                         expected.line_index.line_starts)
+        return tokens
+
+    def test_edits(self):
+        source = 'int a;\n/* comment */\nchar *b = "x";\n#define X 1\nlong c\\\nd;\n'
+        for offset, removed_length, inserted_text in (
+                (4, 1, 'abc'),          # change an identifier
+                (5, 0, 'b'),            # extend an identifier
+                (3, 1, ''),             # merge two tokens
+                (0, 0, '/*'),           # open a block comment
+                (18, 2, ''),            # remove the end of a block comment
+                (7, 0, '\n\n'),         # insert lines
+                (20, 1, ' '),           # join two lines
+                (37, 0, ' '),           # indent a directive
+                (37, 0, 'x '),          # put code in front of a directive
+                (len(source), 0, 'x'),  # append
+                (0, len(source), '')):  # remove everything
+            self.assertRelexed(source, offset, removed_length, inserted_text)
+
+    def test_changed_range(self):
+        source = 'int a;\nint b;\nint c;\nint d;\n'
+        result = relex_edit(TokenArray.from_source(source), 11, 1, 'xyz')
+        self.assertEqual(result.tokens[result.new_end_index - 1].end_offset, 14)
+        self.assertEqual(self.token_tuples(result.tokens[:result.first_index]),
+                         self.token_tuples(TokenArray.from_source(source)[:result.first_index]))
+        self.assertLess(result.old_end_index, 16)
+
+    def test_random_edits(self):
+        generator = random.Random(5)
+        alphabet = ['a', 'b', '1', ' ', '\n', '\\\n', '/', '*', '+', '=', '"', "'", '#', '(', ')', 'x']
+        for _ in range(300):
+            source = ''.join(generator.choice(alphabet) for _ in range(generator.randint(0, 30)))
+            try:
+                TokenArray.from_source(source)
+            except Exception:
+                continue
+            offset = generator.randint(0, len(source))
+            removed_length = generator.randint(0, len(source) - offset)
+            inserted_text = ''.join(generator.choice(alphabet) for _ in range(generator.randint(0, 4)))
+            self.assertRelexed(source, offset, removed_length, inserted_text)
+
+    def test_edit_sequences(self):
+        generator = random.Random(7)
+        alphabet = ['a', 'b', '1', ' ', '\n', '\\\n', '/', '*', '+', '=', '"x\\ty"', '#', '(', ')', ';']
+        for _ in range(100):
+            source = ''.join(generator.choice(alphabet) for _ in range(generator.randint(0, 60)))
+            try:
+                tokens = TokenArray.from_source(source)
+            except Exception:
+                continue
+            for _ in range(8):
+                offset = generator.randint(0, len(tokens.source))
+                removed_length = generator.randint(0, min(3, len(tokens.source) - offset))
+                inserted_text = ''.join(generator.choice(alphabet) for _ in range(generator.randint(0, 3)))
+                try:
+                    relexed = relex(tokens, offset, removed_length, inserted_text)
+                except Exception:
+                    continue
+                expected = TokenArray.from_source(relexed.source)
+                self.assertEqual(self.token_tuples(relexed), self.token_tuples(expected))
+                self.assertEqual([tuple(token.location.start) for token in relexed],
+                                 [tuple(token.location.start) for token in expected])
+                self.assertIs(relexed.values, tokens.values)
+                tokens = relexed
+            tokens.apply_shift()
+            tokens.line_index.apply_shift()
+            self.assertEqual(list(tokens.starts), list(TokenArray.from_source(tokens.source).starts))
+            self.assertEqual(tokens.line_index.line_starts, LineIndex.from_string('', tokens.source).line_starts)
+
+    def test_pending_shift(self):
+        source = 'int a;\n' * 1000
+        tokens = relex(TokenArray.from_source(source), 4, 1, 'bc')
+        self.assertEqual((tokens.shift_index, tokens.shift_delta), (4, 1))
+        self.assertEqual(tokens.starts[-1], len(source) - 1)
+        self.assertEqual(tokens[-1].start_offset, len(source))
+        self.assertEqual(tuple(tokens[-1].location.start), ('<memory string>', 1000, 7))
+        # A following edit shifts only the tokens in between
+        tokens = relex(tokens, 20, 0, '\n')
+        self.assertEqual(tokens.shift_delta, 2)
+        self.assertEqual(tokens.line_index.shift_delta, 2)
+        self.assertEqual(tuple(tokens[-1].location.start), ('<memory string>', 1001, 7))
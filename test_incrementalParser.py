@@ -0,0 +1,98 @@
+# -*- encoding: utf-8 -*-
+import random
+import time
+from unittest import TestCase
+from c_generator import CGenerator
+from incremental_parser import IncrementalParser
+from token_array import TokenArray
+
+
+__author__ = 'Christian Mönch'
+
+
+class TestIncrementalParser(TestCase):
+    def setUp(self):
+        self.generator = CGenerator()
+
+    def show(self, parser):
+        return [self.generator.show_declaration_list(declaration_list.basic_type, declaration_list.modifier_list)
+                for declaration_list in parser.declarations()]
+
+    def assertEdited(self, source, offset, removed_length, inserted_text):
+        new_source = source[:offset] + inserted_text + source[offset + removed_length:]
+        parser = IncrementalParser(TokenArray.from_source(source))
+        try:
+            expected = IncrementalParser(TokenArray.from_source(new_source))
+        except Exception:
+            self.assertRaises(Exception, parser.edit, offset, removed_length, inserted_text)
+            return None
+        reparsed = parser.edit(offset, removed_length, inserted_text)
+        self.assertEqual(self.show(parser), self.show(expected))
+        self.assertEqual(list(parser.first_indices), list(expected.first_indices))
+        self.assertEqual(list(parser.end_indices), list(expected.end_indices))
+        return reparsed
+
+    def test_ranges(self):
+        parser = IncrementalParser(TokenArray.from_source('int a;\n#define X\nchar *b;\n'))
+        self.assertEqual(list(parser.first_indices), [0, 5, 7])
+        self.assertEqual(list(parser.end_indices), [5, 7, 13])
+        self.assertEqual(len(parser.external_declarations), 3)
+        self.assertEqual(self.show(parser), ['int a', 'char *b'])
+
+    def test_reuse(self):
+        source = ''.join('int a%d;\n' % i for i in range(100))
+        parser = IncrementalParser(TokenArray.from_source(source))
+        old_declarations = list(parser.external_declarations)
+        self.assertEqual(parser.edit(source.index('a50'), 3, 'xyz, *b'), 1)
+        self.assertIs(parser.external_declarations[0], old_declarations[0])
+        self.assertIs(parser.external_declarations[99], old_declarations[99])
+        self.assertEqual(self.show(parser)[50], 'int xyz, *b')
+
+    def test_edits(self):
+        source = 'int a;\n/* comment */\nchar *b, c[];\n#define X 1\nlong (*d)(int e);\n'
+        for offset, removed_length, inserted_text in (
+                (4, 1, 'abc'),          # rename
+                (6, 0, 'int z;'),       # insert a declaration
+                (0, 7, ''),             # remove a declaration
+                (5, 1, ''),             # merge two declarations
+                (7, 0, '/*'),           # comment out declarations
+                (35, 0, ' '),           # indent a directive
+                (len(source), 0, 'x'),  # append
+                (0, len(source), '')):  # remove everything
+            self.assertEdited(source, offset, removed_length, inserted_text)
+
+    def test_random_edits(self):
+        generator = random.Random(12)
+        parts = ['int a;', 'char *b;', 'long c[], *d;', ' ', '\n', '#x\n', '/*', '*/', ';', 'int', '*', 'e', ',',
+                 'typedef int T;', 'T e;', 'T', '(T)']
+        for _ in range(300):
+            source = ''.join(generator.choice(parts[:5] + parts[13:15]) for _ in range(generator.randint(0, 8)))
+            if 'T e;' in source:
+                source = 'typedef int T;' + source
+            offset = generator.randint(0, len(source))
+            removed_length = generator.randint(0, len(source) - offset)
+            inserted_text = ''.join(generator.choice(parts) for _ in range(generator.randint(0, 2)))
+            self.assertEdited(source, offset, removed_length, inserted_text)
+
+    def test_typedef_edits(self):
+        source = 'typedef int T;\nT a;\nint b;\nT (c);\n'
+        for offset, removed_length, inserted_text in (
+                (8, 3, 'long'),         # change the typedef
+                (0, 15, ''),            # remove the typedef
+                (12, 1, 'U'),           # rename the typedef
+                (15, 0, 'int T;')):     # hide the typedef
+            self.assertEdited(source, offset, removed_length, inserted_text)
+
+    def test_long_file_edits(self):
+        source = ''.join('typedef int t%d;\nt%d v%d;\n' % (i, i, i) if i % 10 == 0 else 'int a%d;\n' % i
+                         for i in range(4000))
+        start = time.time()
+        parser = IncrementalParser(TokenArray.from_source(source))
+        parse_time = time.time() - start
+        self.assertEqual(parser.edit(source.index('int a2005;') + 4, 1, 'b'), 1)
+        # A new typedef name changes the typedef names in front of every
+        # following declaration, all of them are parsed again in linear time
+        start = time.time()
+        self.assertEqual(parser.edit(0, 0, 'typedef int q;\n'), 4401)
+        self.assertLess(time.time() - start, 5 * parse_time + 0.5)
+        self.assertEqual(parser.edit(0, 15, ''), 4400)
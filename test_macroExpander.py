@@ -0,0 +1,116 @@
+# -*- encoding: utf-8 -*-
+from unittest import TestCase
+from c_lexer import CLexer, TokenEnum
+from character_input import StringCharacterInput
+from macro_expander import MacroExpander, MacroTable, spelling
+from object_stream import ObjectStream
+from token_array import TokenArray
+
+
+__author__ = 'Christian Mönch'
+
+
+class TestMacroExpander(TestCase):
+
+    def expand(self, source, macro_table=None):
+        return [token for token in MacroExpander(TokenArray.from_source(source), macro_table)
+                if token.type not in (TokenEnum.WHITESPACE, TokenEnum.COMMENT, TokenEnum.PREPROCESSOR_DIRECTIVE)]
+
+    def assertExpands(self, source, expected, macro_table=None):
+        self.assertEqual(''.join(spelling(token) for token in self.expand(source, macro_table)),
+                         expected.replace(' ', ''))
+
+    def test_object_like(self):
+        self.assertExpands('#define A 1 + B\n#define B 2\nA;', '1 + 2;')
+        self.assertExpands('#define x x + 1\nx', 'x + 1')
+        self.assertExpands('#define A B\n#define B A\nA B', 'A B')
+        self.assertExpands('#define EMPTY\nint EMPTY a;', 'int a;')
+        self.assertExpands('#define int long\nint a;', 'long a;')
+
+    def test_function_like(self):
+        self.assertExpands('#define f(a, b) b a\nf(1, (2, 3)) f (x,) f', '(2, 3) 1 x f')
+        self.assertExpands('#define f(a) a*g\n#define g(a) f(a)\nf(2)(9)', '2*9*g')
+        self.assertExpands('#define f() 1\n#define g(a) [a]\nf() g() g( )', '1 [] []')
+        self.assertExpands('#define f(x) [x]\n#define M f\nM(1) M M\n(2)', '[1] f [2]')
+        self.assertExpands('#define p(format, ...) f(format, __VA_ARGS__)\np(1, 2, 3) p(1,)',
+                           'f(1, 2, 3) f(1, )')
+
+    def test_stringize_and_paste(self):
+        tokens = self.expand('#define str(s) # s\nstr( a  +  "b\\n" ) str() str(\'"\')')
+        self.assertEqual([(token.type, token.value) for token in tokens],
+                         [(TokenEnum.STRING_CONSTANT, 'a + "b\\n"'), (TokenEnum.STRING_CONSTANT, ''),
+                          (TokenEnum.STRING_CONSTANT, '\'"\'')])
+        self.assertExpands('#define cat(a, b) a ## b\ncat(x, 1) cat(, y) cat(x,) cat(,) cat(+, =)', 'x1 y x +=')
+        tokens = self.expand('#define cat(a, b) a ## b\ncat(x, 1) cat(<<, =)')
+        self.assertEqual([(token.type, token.value) for token in tokens],
+                         [(TokenEnum.ID, 'x1'), (TokenEnum.LEFT_SHIFT_ASSIGN, '<<=')])
+        self.assertExpands('#define glue(a) a ## _suffix\n#define x_suffix 1\nglue(x)', '1')
+        self.assertExpands('#define join x ## y\njoin', 'xy')
+        tokens = self.expand('#define cat(a, b) a ## b\n#define N 0x1fUL + 1e+5\ncat(0, x1) N')
+        self.assertEqual([(token.type, token.value) for token in tokens],
+                         [(TokenEnum.INTEGER_CONSTANT, '0x1'), (TokenEnum.INTEGER_CONSTANT, '0x1fUL'),
+                          (TokenEnum.PLUS, '+'), (TokenEnum.INTEGER_CONSTANT, '1e+5')])
+        self.assertExpands('#define xstr(s) str(s)\n#define str(s) #s\n#define foo 4\nstr(foo) xstr(foo)',
+                           '"foo" "4"')
+
+    def test_standard_example(self):
+        # Example 3 of section 6.10.3.5 of the C standard
+        definitions = ('#define x 3\n#define f(a) f(x * (a))\n#undef x\n#define x 2\n#define g f\n'
+                       '#define z z[0]\n#define h g(~\n#define m(a) a(w)\n#define w 0,1\n#define t(a) a\n'
+                       '#define p() int\n#define q(x) x\n#define r(x,y) x ## y\n')
+        self.assertExpands(definitions + 'f(y+1) + f(f(z)) % t(t(g)(0) + t)(1);\n'
+                                         'g(x+(3,4)-w) | h 5) & m\n(f)^m(m);\n'
+                                         'p() i[q()] = { q(1), r(2,3), r(4,), r(,5), r(,) };',
+                           'f(2 * (y+1)) + f(2 * (f(2 * (z[0])))) % f(2 * (0)) + t(1);'
+                           'f(2 * (2+(3,4)-0,1)) | f(2 * (~ 5)) & f(2 * (0,1))^m(0,1);'
+                           'int i[] = { 1, 23, 4, 5, };')
+
+    def test_hash_hash_example(self):
+        # Example of section 6.10.3.3 of the C standard, the '##' that results
+        # from pasting is no operator
+        tokens = self.expand('#define hash_hash # ## #\n#define mkstr(a) # a\n#define in_between(a) mkstr(a)\n'
+                             '#define join(c, d) in_between(c hash_hash d)\nchar p[] = join(x, y);')
+        self.assertEqual([(token.type, token.value) for token in tokens[-3:]],
+                         [(TokenEnum.ASSIGN, '='), (TokenEnum.STRING_CONSTANT, 'x ## y'), (TokenEnum.SEMICOLON, ';')])
+        tokens = self.expand('#define hash_hash # ## #\n#define f(a, b) a b\nf(hash_hash, x)')
+        self.assertEqual([(token.type, token.value) for token in tokens],
+                         [(TokenEnum.UNKNOWN, '##'), (TokenEnum.ID, 'x')])
+
+    def test_memoized_expansions(self):
+        macro_table = MacroTable()
+        self.assertExpands('#define A B + C\n#define B 1\nA A', '1 + C 1 + C', macro_table)
+        expansion = macro_table.expansions['A'][0]
+        self.assertEqual([token.value for token in expansion], ['1', '+', 'C'])
+        self.assertExpands('#define B 1\nA', '1 + C', macro_table)
+        self.assertIs(macro_table.expansions['A'][0], expansion)
+        self.assertExpands('#define C 2\nA', '1 + 2', macro_table)
+        self.assertExpands('#undef B\nA', 'B + 2', macro_table)
+        self.assertExpands('#define B 3\nA\n#undef D\nA', '3 + 2 3 + 2', macro_table)
+        self.assertExpands('#define B 4\nA', '4 + 2', macro_table)
+        self.assertNotIn('D', macro_table.dependents)
+
+        # Expansions that need tokens after the invocation are not cached
+        macro_table = MacroTable()
+        self.assertExpands('#define h g(~\n#define g(a) [a]\nh 5)', '[~ 5]', macro_table)
+        self.assertNotIn('h', macro_table.expansions)
+
+    def test_clexer_input(self):
+        source = '#define DECLARE(type, name) type name\nDECLARE(int, *a);\n'
+        tokens = MacroExpander(CLexer(ObjectStream(StringCharacterInput(source))))
+        self.assertEqual([token.value for token in tokens if token.type not in (
+            TokenEnum.WHITESPACE, TokenEnum.PREPROCESSOR_DIRECTIVE)], ['int', '*', 'a', ';'])
+
+    def test_errors(self):
+        for source, message in (
+                ('#define f(a) a\nf(1, 2)', 'macro "f" expects 1 arguments, got 2'),
+                ('#define f(a, b) a\n\nf(1)', '<memory string>:3:1: macro "f" expects 2 arguments, got 1'),
+                ('#define f(a) a\nf(1', 'unterminated invocation of macro "f"'),
+                ('#define f(a) #b', '"#" is not followed by a parameter of macro "f"'),
+                ('#define f(a) ## a', '"##" at the border of macro "f"'),
+                ('#define f(a, a) a', 'invalid parameter list of macro "f"'),
+                ('#define f(a', 'missing ")" in the parameter list of macro "f"'),
+                ('#define cat(a, b) a ## b\ncat(+, /)', 'pasting "+" and "/" does not give a valid token'),
+                ('#define 1', 'invalid macro definition "#define 1"')):
+            with self.assertRaises(Exception) as context:
+                self.expand(source)
+            self.assertIn(message, str(context.exception))
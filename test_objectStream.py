@@ -31,8 +31,8 @@ class TestObjectStream(TestCase):
         self.assertEqual(os.get_current_object(), None)
 
     def test_get_next_object(self):
-        os = ObjectStream(self.ObjectProvider([x for x in xrange(4)]))
-        for i in xrange(4):
+        os = ObjectStream(self.ObjectProvider([x for x in range(4)]))
+        for i in range(4):
             self.assertEqual(os.get_next_object(), i)
         self.assertEqual(os.get_next_object(), None)
         self.assertEqual(os.get_next_object(), None)
@@ -47,9 +47,9 @@ class TestObjectStream(TestCase):
         self.assertEqual(os.get_next_object(), None)
 
     def test_look_ahead(self):
-        os = ObjectStream(self.ObjectProvider([x for x in xrange(4)]))
+        os = ObjectStream(self.ObjectProvider([x for x in range(4)]))
         self.assertEqual(os.get_next_object(), 0)
-        for i in xrange(4):
+        for i in range(4):
             self.assertEqual(os.look_ahead(i), i)
         self.assertEqual(os.look_ahead(4), None)
         self.assertEqual(os.look_ahead(5), None)
@@ -63,6 +63,25 @@ class TestObjectStream(TestCase):
         self.assertEqual(os.get_next_object(), None)
         self.assertEqual(os.get_next_object(), None)
 
+    def test_skip_objects(self):
+        os = ObjectStream(self.ObjectProvider([x for x in range(8)]))
+        self.assertEqual(os.skip_objects(0), None)
+        self.assertEqual(os.skip_objects(2), 1)
+        self.assertEqual(os.look_ahead(2), 3)
+        self.assertEqual(os.skip_objects(1), 2)
+        self.assertEqual(os.skip_objects(3), 5)
+        self.assertEqual(os.skip_objects(0), 5)
+        self.assertEqual(os.skip_objects(3), None)
+        self.assertEqual(os.get_next_object(), None)
+
+        # The source skips the objects that are not in the queue
+        os = ObjectStream(StringCharacterInput('abc\ndef'))
+        self.assertEqual(os.get_next_object().value, 'a')
+        self.assertEqual(os.look_ahead(1).value, 'b')
+        self.assertEqual(os.skip_objects(5).value, 'e')
+        self.assertEqual(os.object_stream.line_index.line_starts, [0, 4])
+        self.assertEqual(os.skip_objects(2), None)
+
     def test_push_object(self):
         os = ObjectStream(self.ObjectProvider([0]))
         self.assertEqual(os.get_current_object(), None)
@@ -71,3 +90,13 @@ class TestObjectStream(TestCase):
         self.assertEqual(os.get_next_object(), 0)
         self.assertEqual(os.get_current_object(), 0)
         self.assertEqual(os.get_next_object(), None)
+
+    def test_max_look_ahead(self):
+        os = ObjectStream(self.ObjectProvider([0, 1, 2, 3]), max_look_ahead=2)
+        self.assertEqual(os.get_next_object(), 0)
+        self.assertEqual(os.look_ahead(2), 2)
+        self.assertRaises(Exception, os.look_ahead, 3)
+        self.assertRaises(Exception, os.push_object, -1)
+        self.assertEqual(os.get_next_object(), 1)
+        os.push_object(0)
+        self.assertEqual(os.get_next_object(), 1)
@@ -0,0 +1,189 @@
+# -*- encoding: utf-8 -*-
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from c_generator import CGenerator
+from c_lexer import TokenEnum
+from c_parser import CParser
+from c_regex_lexer import CRegexLexer
+from preprocessor import Preprocessor, find_guard
+from token_cache import TokenCache
+from token_stream import TokenStream
+
+
+__author__ = 'Christian Mönch'
+
+
+class CountingPreprocessor(Preprocessor):
+    def __init__(self, include_paths=(), **kwargs):
+        super(CountingPreprocessor, self).__init__(include_paths, **kwargs)
+        self.read_paths = []
+
+    def read(self, path):
+        self.read_paths.append(os.path.basename(path))
+        return super(CountingPreprocessor, self).read(path)
+
+
+class TestPreprocessor(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, source):
+        path = os.path.join(self.directory, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as output_file:
+            output_file.write(source)
+        return path
+
+    def declarations(self, preprocessor, path):
+        fragments = []
+        CGenerator().write_translation_unit(fragments, CParser(TokenStream(preprocessor.lexer(path))).parse())
+        return ''.join(fragments).splitlines()
+
+    def test_find_guard(self):
+        for source, guard in (
+                ('/* c */\n#ifndef A_H\n#define A_H\nint a;\n#endif /* A_H */\n', 'A_H'),
+                ('#if !defined(A_H)\n#define A_H 1\n#ifdef X\nint a;\n#endif\n#endif\n', 'A_H'),
+                ('#if ! defined A_H\n#define A_H\n#endif', 'A_H'),
+                ('#ifndef A_H\n#define B_H\n#endif\n', None),
+                ('#ifndef A_H\n#define A_H\n#endif\nint a;\n', None),
+                ('int a;\n#ifndef A_H\n#define A_H\n#endif\n', None),
+                ('#ifndef A_H\n#define A_H\n#else\nint a;\n#endif\n', None),
+                ('#ifndef A_H\n#define A_H\n#endif\n#ifdef B\n#endif\n', None),
+                ('#ifdef A_H\n#define A_H\n#endif\n', None),
+                ('#ifndef A_H\n#endif\n', None),
+                ('  #ifndef A_H\n  # define A_H\n  #if X\n    #endif\nint a;\n\t#endif\n', 'A_H'),
+                ('#ifndef A_H\n#define A_H\n#endif\n  #ifdef B\n  #endif\n', None),
+                ('', None)):
+            self.assertEqual(find_guard(CRegexLexer(source)), guard, source)
+
+    def test_includes(self):
+        self.write('include/a.h', '#ifndef A_H\n#define A_H\nint a;\n#include "b.h"\n#endif\n')
+        self.write('include/b.h', '#pragma once\nchar b;\n')
+        self.write('include/c.h', 'long c;\n')
+        self.write('include/d.h', 'int global_d;\n')
+        self.write('d.h', 'int local_d;\n')
+        main_path = self.write('main.c', '#include <a.h>\n#include "a.h"\n#include "b.h"\n#include <c.h>\n'
+                                         '#include "c.h"\n#include "d.h"\n#include <d.h>\nint *main;\n')
+        preprocessor = CountingPreprocessor([os.path.join(self.directory, 'include')])
+        self.assertEqual(self.declarations(preprocessor, main_path),
+                         ['int a;', 'char b;', 'long c;', 'long c;', 'int local_d;', 'int global_d;', 'int *main;'])
+        self.assertEqual(sorted(preprocessor.read_paths), ['a.h', 'b.h', 'c.h', 'd.h', 'd.h', 'main.c'])
+        self.assertEqual(preprocessor.include_count, 8)
+        self.assertEqual(preprocessor.skipped_include_count, 2)
+
+        # A second translation unit uses the cached files
+        other_path = self.write('other.c', '#include <a.h>\n#include <a.h>\n')
+        del preprocessor.read_paths[:]
+        preprocessor.included_once.clear()
+        preprocessor.macros.clear()
+        self.assertEqual(self.declarations(preprocessor, other_path), ['int a;', 'char b;'])
+        self.assertEqual(preprocessor.read_paths, ['other.c'])
+
+    def test_undefined_guard(self):
+        self.write('a.h', '#ifndef A_H\n#define A_H\nint a;\n#endif\n')
+        main_path = self.write('main.c', '#include "a.h"\n#undef A_H\n#include "a.h"\n')
+        preprocessor = CountingPreprocessor()
+        self.assertEqual(self.declarations(preprocessor, main_path), ['int a;', 'int a;'])
+        self.assertEqual(preprocessor.read_paths, ['main.c', 'a.h'])
+
+    def test_directives(self):
+        self.write('a.h', 'int a;\n')
+        main_path = self.write('main.c', '#define X 1\n#include "a.h"\nint b;\n')
+        tokens = [(token.type, token.value) for token in CountingPreprocessor().tokens(main_path)
+                  if token.type is not TokenEnum.WHITESPACE]
+        self.assertEqual(tokens, [(TokenEnum.PREPROCESSOR_DIRECTIVE, 'define X 1'),
+                                  (TokenEnum.INT, 'int'), (TokenEnum.ID, 'a'), (TokenEnum.SEMICOLON, ';'),
+                                  (TokenEnum.INT, 'int'), (TokenEnum.ID, 'b'), (TokenEnum.SEMICOLON, ';')])
+
+    def test_errors(self):
+        main_path = self.write('main.c', '\n#include "missing.h"\n')
+        with self.assertRaises(Exception) as context:
+            list(Preprocessor().tokens(main_path))
+        self.assertIn('main.c:2:1: cannot find include file "missing.h"', str(context.exception))
+        recursive_path = self.write('recursive.h', '#include "recursive.h"\n')
+        with self.assertRaises(Exception) as context:
+            list(Preprocessor().tokens(recursive_path))
+        self.assertIn('includes nested too deeply', str(context.exception))
+
+    def test_macros(self):
+        self.write('a.h', '#ifndef A_H\n#define A_H\n#define SIZE 4\n#define ARRAY(type, name) type name[SIZE]\n'
+                          '#endif\n')
+        main_path = self.write('main.c', '#include "a.h"\nARRAY(int, a);\n#undef SIZE\n#define SIZE 8\n'
+                                         '#include "a.h"\nARRAY(char *, b), *c;\n')
+        self.assertEqual(self.declarations(Preprocessor(), main_path), ['int a[4];', 'char *b[8], *c;'])
+
+    def test_conditionals(self):
+        main_path = self.write('main.c', '#define A 2\n#define F(x) ((x) * 2)\n'
+                                         '#if 0\nint skipped /* #endif */ "#else" don\'t;\n#if 1\n#endif\n'
+                                         '#elif F(A) == 4 && !defined B\nint a;\n#else\nint b;\n#endif\n'
+                                         '#ifdef A\n# ifndef B\nint c;\n# else\nint d;\n# endif\n#endif\n'
+                                         '#if defined(B) || C\nint e;\n#elif A - 2\nint f;\n#else\nint g;\n#endif\n'
+                                         '#if (A > 1 ? -7 / 2 : 1) == -3 && -7 % 2 == -1 && 010 == 8 && \'a\' == 97\n'
+                                         'int h;\n#endif\n')
+        self.assertEqual(self.declarations(Preprocessor(), main_path), ['int a;', 'int c;', 'int g;', 'int h;'])
+
+        # Hexadecimal and suffixed constants
+        main_path = self.write('main.c', '#define VERSION 0x0201UL\n#if 0x10 > 2\nint a;\n#endif\n'
+                                         '#if 199901L >= 1\nint b;\n#endif\n#if 1u\nint c;\n#endif\n'
+                                         '#if VERSION == 513 && 0XfFu == 255 && 0ull == 0 && 017LU == 15\nint d;\n'
+                                         '#endif\n')
+        self.assertEqual(self.declarations(Preprocessor(), main_path), ['int a;', 'int b;', 'int c;', 'int d;'])
+
+    def test_indented_conditionals(self):
+        main_path = self.write('main.c', '#define A 1\n'
+                                         '  #if A\n'
+                                         '    #ifdef B\n'
+                                         'long skipped;\n'
+                                         '    #else\n'
+                                         '      #ifndef B\n'
+                                         'int a;\n'
+                                         '      #endif\n'
+                                         '    #endif\n'
+                                         '  #elif 1\n'
+                                         'int b;\n'
+                                         '\t#else /* #endif */\n'
+                                         '    #if 1\n'
+                                         'int c;\n'
+                                         '    #endif\n'
+                                         '  #  endif\n'
+                                         'int d;\n')
+        self.assertEqual(self.declarations(Preprocessor(), main_path), ['int a;', 'int d;'])
+        # Cached token arrays are sliced at the same directives
+        preprocessor = Preprocessor(token_cache=TokenCache(os.path.join(self.directory, 'cache')))
+        self.assertEqual(self.declarations(preprocessor, main_path), ['int a;', 'int d;'])
+
+    def test_skipped_regions_are_not_lexed(self):
+        # The inactive regions contain characters the lexer rejects
+        self.write('a.h', '#ifndef A_H\n#define A_H\n#ifdef WIDE\nlong a = "\n#else\nint a;\n#endif\n#endif\n')
+        main_path = self.write('main.c', '#include "a.h"\n#undef A_H\n#define WIDE\n#if 0\n"\n#endif\n'
+                                         '#include "a.h"\n')
+        preprocessor = Preprocessor()
+        with self.assertRaises(Exception) as context:
+            list(preprocessor.tokens(main_path))
+        self.assertIn('string terminated by new line or end of file', str(context.exception))
+        source_file = preprocessor.files[os.path.realpath(os.path.join(self.directory, 'a.h'))]
+        self.assertEqual(source_file.guard, 'A_H')
+        self.assertEqual(len(source_file.region_ends), 1)
+
+    def test_conditional_errors(self):
+        for source, message in (
+                ('#if 1\nint a;\n', 'main.c:1:1: unterminated "#if 1"'),
+                ('#endif\n', '"#endif" without "#if"'),
+                ('#if 0\n', 'end of file in conditional region'),
+                ('#if 1 +\n#endif\n', 'invalid expression in "#if 1 +"'),
+                ('#if 1 / 0\n#endif\n', 'division by zero'),
+                ('#if 08\n#endif\n', 'invalid integer constant "08"'),
+                ('#if 1lul\n#endif\n', 'invalid integer constant "1lul"'),
+                ('#if defined\n#endif\n', '"defined" without a macro name'),
+                ('#ifdef\n#endif\n', 'missing macro name in "#ifdef"')):
+            main_path = self.write('main.c', source)
+            with self.assertRaises(Exception) as context:
+                list(Preprocessor().tokens(main_path))
+            self.assertIn(message, str(context.exception))
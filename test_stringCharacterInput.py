@@ -1,6 +1,6 @@
 # -*- encoding: utf-8 -*-
 from unittest import TestCase
-from character_input import StringCharacterInput, Character
+from character_input import StringCharacterInput, Character, LineIndex
 
 
 __author__ = 'Christian Mönch'
@@ -29,3 +29,26 @@ class TestStringCharacterInput(TestCase):
         self.assertTrue(self.compare_coordinates(ci.get_next_object(), 1, 3))
         self.assertTrue(self.compare_coordinates(ci.get_next_object(), 2, 1))
         self.assertTrue(self.compare_coordinates(ci.get_next_object(), 2, 2))
+
+    def test_line_index(self):
+        ci = StringCharacterInput('ab\n\ncd')
+        characters = [ci.get_next_object() for _ in range(6)]
+        self.assertEqual(ci.line_index.line_starts, [0, 3, 4])
+        self.assertEqual([c.offset for c in characters], [0, 1, 2, 3, 4, 5])
+        self.assertTrue(self.compare_coordinates(characters[3], 2, 1))
+        self.assertTrue(self.compare_coordinates(characters[5], 3, 2))
+
+        line_index = LineIndex.from_string('<test>', 'ab\n\ncd')
+        self.assertEqual(line_index.line_starts, [0, 3, 4])
+        self.assertEqual(tuple(line_index.coordinate(4)), ('<test>', 3, 1))
+
+    def test_skip_objects(self):
+        ci = StringCharacterInput('ab\n\ncd\ne')
+        ci.get_next_object()
+        ci.skip_objects(4)
+        character = ci.get_next_object()
+        self.assertEqual((character.value, character.offset), ('d', 5))
+        self.assertTrue(self.compare_coordinates(character, 3, 2))
+        ci.skip_objects(10)
+        self.assertIsNone(ci.get_next_object())
+        self.assertEqual(ci.line_index.line_starts, [0, 3, 4, 7])
@@ -0,0 +1,72 @@
+# -*- encoding: utf-8 -*-
+from unittest import TestCase
+from c_lexer import CLexer, TokenEnum
+from c_regex_lexer import CRegexLexer
+from c_parser import CParser
+from character_input import StringCharacterInput
+from object_stream import ObjectStream
+from token_array import TokenArray
+from token_stream import TokenStream
+
+
+__author__ = 'Christian Mönch'
+
+
+class TestTokenArray(TestCase):
+    source = 'int *x[];\n"a\\tb" /* c */ y\\\nz'
+
+    def token_tuples(self, tokens):
+        return [(t.type, t.value, tuple(t.location.start), tuple(t.location.end)) for t in tokens]
+
+    def lexer_tokens(self):
+        lexer = CLexer(ObjectStream(StringCharacterInput(self.source)))
+        result = []
+        token = lexer.get_next_token()
+        while token is not None:
+            result.append(token)
+            token = lexer.get_next_token()
+        return result
+
+    def test_from_source(self):
+        tokens = TokenArray.from_source(self.source)
+        self.assertEqual(self.token_tuples(tokens), self.token_tuples(self.lexer_tokens()))
+        # Only the string constant and the continued identifier need a stored value
+        self.assertEqual(tokens.values, ['a\tb', 'yz'])
+
+        # Tokens with line continuations get the same values as from scan()
+        source = 'in\\\nt a\\\nb = 1\\\n2 \\\n+ "x";\n#define Y\\\n 3\n'
+        tokens = TokenArray.from_source(source)
+        self.assertEqual([(t.type, t.start_offset, t.end_offset, t.value) for t in tokens],
+                         [token[:4] for token in CRegexLexer(source).scan()])
+        self.assertEqual(tokens.values, ['int', 'ab', '12', 'x', 'define Y 3'])
+
+    def test_from_lexer(self):
+        character_input = StringCharacterInput(self.source)
+        tokens = TokenArray.from_lexer(
+            CLexer(ObjectStream(character_input), source=self.source), self.source, character_input.line_index)
+        self.assertEqual(self.token_tuples(tokens), self.token_tuples(self.lexer_tokens()))
+
+    def test_indexing(self):
+        tokens = TokenArray.from_source(self.source)
+        self.assertEqual(len(tokens), 13)
+        self.assertEqual(tokens[0].type, TokenEnum.INT)
+        self.assertEqual(tokens[-1].value, 'yz')
+        self.assertEqual((tokens[-1].start_offset, tokens[-1].end_offset), (25, 28))
+        self.assertRaises(IndexError, tokens.__getitem__, 13)
+        part = tokens[2:6]
+        self.assertEqual([t.value for t in part], ['*', 'x', '[', ']'])
+
+        # Slices do not share the value table
+        part = tokens[10:]
+        self.assertEqual(part.values, ['yz'])
+        part.append(TokenEnum.STRING_CONSTANT, 10, 15, 'a\nb')
+        self.assertEqual(part[-1].value, 'a\nb')
+        self.assertEqual(len(tokens), 13)
+        self.assertEqual(tokens.values, ['a\tb', 'yz'])
+
+    def test_token_stream(self):
+        token_stream = TokenStream(TokenArray.from_source('char**foo[][]').reader())
+        parser = CParser(token_stream)
+        parser.get_next_token()
+        type_spec, variable_spec_list = parser.declaration_list()
+        self.assertEqual(variable_spec_list[0][0].name, 'foo')
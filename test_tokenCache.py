@@ -0,0 +1,87 @@
+# -*- encoding: utf-8 -*-
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+from token_array import TokenArray
+from token_cache import TokenCache
+
+
+__author__ = 'Christian Mönch'
+
+
+class CountingTokenCache(TokenCache):
+    def __init__(self, directory, **kwargs):
+        super(CountingTokenCache, self).__init__(directory, **kwargs)
+        self.lex_count = 0
+        self.scan_count = 0
+
+    def lex(self, source, input_name):
+        self.lex_count += 1
+        return super(CountingTokenCache, self).lex(source, input_name)
+
+    def evict(self):
+        self.scan_count += 1
+        super(CountingTokenCache, self).evict()
+
+
+class TestTokenCache(TestCase):
+    source = 'int *x; /* comment */\n"a\\nb" y\\\nz'
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def token_tuples(self, tokens):
+        return [(t.type, t.value, t.start_offset, t.end_offset) for t in tokens]
+
+    def test_warm_load(self):
+        cache = CountingTokenCache(self.directory)
+        cold_tokens = cache.tokens_for(self.source, 'a.h')
+        warm_tokens = CountingTokenCache(self.directory).tokens_for(self.source, 'b.h')
+        self.assertEqual(cache.lex_count, 1)
+        self.assertEqual(self.token_tuples(warm_tokens), self.token_tuples(cold_tokens))
+        self.assertEqual(self.token_tuples(warm_tokens), self.token_tuples(TokenArray.from_source(self.source)))
+        self.assertEqual(warm_tokens[0].location.start, ('b.h', 1, 1))
+
+    def test_corrupted_file(self):
+        cache = CountingTokenCache(self.directory)
+        cache.tokens_for(self.source)
+        with open(cache.path(cache.key(self.source)), 'wb') as cache_file:
+            cache_file.write(b'CTA1 garbage')
+        tokens = cache.tokens_for(self.source)
+        self.assertEqual(cache.lex_count, 2)
+        self.assertEqual(self.token_tuples(tokens), self.token_tuples(TokenArray.from_source(self.source)))
+
+    def test_eviction(self):
+        cache = CountingTokenCache(self.directory)
+        cache.tokens_for('int a;')
+        file_size = os.path.getsize(cache.path(cache.key('int a;')))
+        cache.max_size = 2 * file_size
+        os.utime(cache.path(cache.key('int a;')), (0, 0))
+        cache.tokens_for('int b;')
+        cache.tokens_for('int c;')
+        self.assertFalse(os.path.exists(cache.path(cache.key('int a;'))))
+        self.assertTrue(os.path.exists(cache.path(cache.key('int b;'))))
+        self.assertTrue(os.path.exists(cache.path(cache.key('int c;'))))
+
+    def test_scan_interval(self):
+        cache = CountingTokenCache(self.directory, scan_interval=10)
+        for index in range(25):
+            cache.tokens_for('int a%d;' % index)
+        # The first store scans to learn the size of the directory
+        self.assertEqual(cache.scan_count, 3)
+        self.assertEqual(cache.estimated_size, sum(os.path.getsize(os.path.join(self.directory, name))
+                                                   for name in os.listdir(self.directory)))
+
+        # Another process fills the directory
+        other_cache = TokenCache(self.directory)
+        for index in range(10):
+            other_cache.tokens_for('int b%d;' % index)
+        cache.max_size = cache.estimated_size
+        cache.tokens_for('int c;')
+        self.assertEqual(cache.scan_count, 4)
+        self.assertLessEqual(cache.estimated_size, cache.max_size)
+        self.assertEqual(len(os.listdir(self.directory)), 25)
@@ -0,0 +1,44 @@
+# -*- encoding: utf-8 -*-
+from unittest import TestCase
+from c_lexer import CLexer, TokenEnum
+from c_parser import CParser
+from character_input import StringCharacterInput
+from object_stream import ObjectStream
+from token_filters import IteratorLexer, drop_comments, drop_token_types, drop_trivia, drop_whitespace
+from token_stream import TokenStream
+
+
+__author__ = 'Christian Mönch'
+
+
+class TestTokenFilters(TestCase):
+    source = 'int a; /* c */\n// d\nchar *b;\n'
+
+    def lexer(self):
+        return CLexer(ObjectStream(StringCharacterInput(self.source)))
+
+    def test_iteration(self):
+        tokens = list(self.lexer())
+        lexer = self.lexer()
+        token = lexer.get_next_token()
+        while token is not None:
+            expected = tokens.pop(0)
+            self.assertEqual((token.type, token.value), (expected.type, expected.value))
+            token = lexer.get_next_token()
+        self.assertEqual(tokens, [])
+
+    def test_stages(self):
+        self.assertEqual([token.value for token in drop_whitespace(self.lexer())],
+                         ['int', 'a', ';', '/* c */', '// d', 'char', '*', 'b', ';'])
+        self.assertEqual([token.value for token in drop_comments(drop_whitespace(self.lexer()))],
+                         ['int', 'a', ';', 'char', '*', 'b', ';'])
+        self.assertEqual([token.value for token in drop_trivia(self.lexer())],
+                         ['int', 'a', ';', 'char', '*', 'b', ';'])
+        self.assertEqual([token.value for token in drop_token_types(self.lexer(), (TokenEnum.ID, TokenEnum.WHITESPACE))],
+                         ['int', ';', '/* c */', '// d', 'char', '*', ';'])
+
+    def test_iterator_lexer(self):
+        parser = CParser(TokenStream(IteratorLexer(drop_trivia(self.lexer()))))
+        self.assertEqual(len(parser.parse()), 2)
+        lexer = IteratorLexer([])
+        self.assertIsNone(lexer.get_next_token())
@@ -29,8 +29,8 @@ class TestTokenStream(TestCase):
         self.assertEqual(ts.get_current_token(), None)
 
     def test_get_next_token(self):
-        ts = TokenStream(self.TokenProvider([x for x in xrange(4)]))
-        for i in xrange(4):
+        ts = TokenStream(self.TokenProvider([x for x in range(4)]))
+        for i in range(4):
             self.assertEqual(ts.get_next_token(), i)
         self.assertEqual(ts.get_next_token(), None)
         self.assertEqual(ts.get_next_token(), None)
@@ -45,9 +45,9 @@ class TestTokenStream(TestCase):
         self.assertEqual(ts.get_next_token(), None)
 
     def test_look_ahead(self):
-        ts = TokenStream(self.TokenProvider([x for x in xrange(4)]))
+        ts = TokenStream(self.TokenProvider([x for x in range(4)]))
         self.assertEqual(ts.get_next_token(), 0)
-        for i in xrange(4):
+        for i in range(4):
             self.assertEqual(ts.look_ahead(i), i)
         self.assertEqual(ts.look_ahead(4), None)
         self.assertEqual(ts.look_ahead(5), None)
@@ -69,3 +69,13 @@ class TestTokenStream(TestCase):
         self.assertEqual(ts.get_next_token(), 0)
         self.assertEqual(ts.get_current_token(), 0)
         self.assertEqual(ts.get_next_token(), None)
+
+    def test_max_look_ahead(self):
+        ts = TokenStream(self.TokenProvider([0, 1, 2, 3]), max_look_ahead=2)
+        self.assertEqual(ts.get_next_token(), 0)
+        self.assertEqual(ts.look_ahead(2), 2)
+        self.assertRaises(Exception, ts.look_ahead, 3)
+        self.assertRaises(Exception, ts.push_token, -1)
+        self.assertEqual(ts.get_next_token(), 1)
+        ts.push_token(0)
+        self.assertEqual(ts.get_next_token(), 1)
@@ -0,0 +1,240 @@
+# -*- encoding: utf-8 -*-
+"""
+Column wise storage for the tokens of a whole source.
+
+A TokenArray keeps the token types, the start and end offsets and a value
+reference of every token in parallel arrays. The value reference is -1 if
+the value is the source text between the offsets, otherwise it is an index
+into a table of distinct values (string constants, spliced continuations,
+preprocessor directives). Tokens are read through lightweight TokenView
+objects that provide the Token attributes type, value and location.
+
+The offsets of the tokens from shift_index on may lack a pending
+shift_delta. Edits leave the shift of the tokens behind them to be added
+when the offsets are read. start_offset(), end_offset() and bisect_start()
+add it, the columns starts and ends hold the offsets without it until
+apply_shift() is called.
+"""
+import struct
+from array import array
+from bisect import bisect_left
+from c_lexer import OffsetSpan, TokenTypeNumbers, TokenTypes
+from c_regex_lexer import CRegexLexer
+from character_input import LineIndex
+
+
+__author__ = 'Christian Mönch'
+
+
+HeaderFormat = '<4sBBII'
+HeaderMagic = b'CTA1'
+
+
+class TokenView(object):
+    __slots__ = ('tokens', 'index')
+
+    def __init__(self, tokens, index):
+        self.tokens = tokens
+        self.index = index
+
+    @property
+    def type(self):
+        return TokenTypes[self.tokens.types[self.index]]
+
+    @property
+    def value(self):
+        return self.tokens.value(self.index)
+
+    @property
+    def start_offset(self):
+        return self.tokens.start_offset(self.index)
+
+    @property
+    def end_offset(self):
+        return self.tokens.end_offset(self.index)
+
+    @property
+    def location(self):
+        tokens = self.tokens
+        return OffsetSpan(tokens.line_index, tokens.start_offset(self.index), tokens.end_offset(self.index))
+
+    def __repr__(self):
+        return 'Token(%s, %s, %s)' % (self.type, repr(self.value), repr(self.location))
+
+
+class TokenArrayReader(object):
+    """
+    Returns the tokens of a token array one by one, i.e. it can be used as a
+    lexer for TokenStream and CParser.
+    """
+    def __init__(self, tokens, position=0):
+        self.tokens = tokens
+        self.position = position
+
+    def get_next_token(self):
+        if self.position >= len(self.tokens):
+            return None
+        token = TokenView(self.tokens, self.position)
+        self.position += 1
+        return token
+
+
+class TokenArray(object):
+
+    def __init__(self, source, line_index=None, input_name='<memory string>'):
+        self.source = source
+        self.line_index = line_index if line_index is not None else LineIndex.from_string(input_name, source)
+        self.types = array('B')
+        self.starts = array('I')
+        self.ends = array('I')
+        self.value_references = array('i')
+        self.values = []
+        self.value_numbers = {}
+        self.shift_index = 0
+        self.shift_delta = 0
+
+    @classmethod
+    def from_source(cls, source, input_name='<memory string>'):
+        lexer = CRegexLexer(source, input_name)
+        tokens = cls(source, lexer.line_index)
+        lexer.scan_into(tokens)
+        return tokens
+
+    @classmethod
+    def from_lexer(cls, lexer, source, line_index=None):
+        """
+        Store the tokens of a lexer that creates tokens with offset spans,
+        e.g. a CLexer that was given the source.
+        """
+        tokens = cls(source, line_index)
+        token = lexer.get_next_token()
+        while token is not None:
+            tokens.append(token.type, token.location.start_offset, token.location.end_offset, token.value)
+            token = lexer.get_next_token()
+        return tokens
+
+    @classmethod
+    def from_bytes(cls, data, source, line_index=None, input_name='<memory string>'):
+        """
+        Load tokens that were stored with to_bytes() for the same source.
+        """
+        if len(data) < struct.calcsize(HeaderFormat):
+            raise ValueError('truncated token array')
+        magic, offset_size, reference_size, token_count, value_count = struct.unpack_from(HeaderFormat, data)
+        if magic != HeaderMagic:
+            raise ValueError('not a token array')
+        tokens = cls(source, line_index, input_name)
+        if offset_size != tokens.starts.itemsize or reference_size != tokens.value_references.itemsize:
+            raise ValueError('token array was stored with different item sizes')
+        position = struct.calcsize(HeaderFormat)
+        value_lengths = array('I')
+        for column, count in ((tokens.types, token_count), (tokens.starts, token_count), (tokens.ends, token_count),
+                              (tokens.value_references, token_count), (value_lengths, value_count)):
+            end = position + count * column.itemsize
+            if end > len(data):
+                raise ValueError('truncated token array')
+            column.frombytes(data[position:end])
+            position = end
+        for length in value_lengths:
+            tokens.value_number(data[position:position + length].decode('utf-8', 'surrogatepass'))
+            position += length
+        if position != len(data) or (token_count and max(tokens.ends) >= len(source)):
+            raise ValueError('token array does not match the source')
+        return tokens
+
+    def to_bytes(self):
+        self.apply_shift()
+        encoded_values = [value.encode('utf-8', 'surrogatepass') for value in self.values]
+        value_lengths = array('I', [len(value) for value in encoded_values])
+        return b''.join([
+            struct.pack(HeaderFormat, HeaderMagic, self.starts.itemsize, self.value_references.itemsize,
+                        len(self.types), len(self.values)),
+            self.types.tobytes(), self.starts.tobytes(), self.ends.tobytes(), self.value_references.tobytes(),
+            value_lengths.tobytes()] + encoded_values)
+
+    def append(self, token_type, start_offset, end_offset, value):
+        if self.shift_delta:
+            self.apply_shift()
+        self.types.append(TokenTypeNumbers[token_type])
+        self.starts.append(start_offset)
+        self.ends.append(end_offset)
+        if self.source[start_offset:end_offset + 1] == value:
+            self.value_references.append(-1)
+        else:
+            self.value_references.append(self.value_number(value))
+
+    def value_number(self, value):
+        number = self.value_numbers.get(value)
+        if number is None:
+            number = self.value_numbers[value] = len(self.values)
+            self.values.append(value)
+        return number
+
+    def value(self, index):
+        reference = self.value_references[index]
+        if reference == -1:
+            if index >= self.shift_index:
+                return self.source[self.starts[index] + self.shift_delta:self.ends[index] + self.shift_delta + 1]
+            return self.source[self.starts[index]:self.ends[index] + 1]
+        return self.values[reference]
+
+    def start_offset(self, index):
+        if index >= self.shift_index:
+            return self.starts[index] + self.shift_delta
+        return self.starts[index]
+
+    def end_offset(self, index):
+        if index >= self.shift_index:
+            return self.ends[index] + self.shift_delta
+        return self.ends[index]
+
+    def bisect_start(self, offset, low=0):
+        """
+        Return the index of the first token that starts at or behind offset.
+        """
+        starts, shift_index = self.starts, self.shift_index
+        if low < shift_index:
+            index = bisect_left(starts, offset, low, min(shift_index, len(starts)))
+            if index < shift_index:
+                return index
+            low = shift_index
+        return bisect_left(starts, offset - self.shift_delta, low)
+
+    def apply_shift(self):
+        """
+        Add the pending shift to the offset columns.
+        """
+        if self.shift_delta:
+            delta, shift_index = self.shift_delta, self.shift_index
+            self.starts[shift_index:] = array('I', [offset + delta for offset in self.starts[shift_index:]])
+            self.ends[shift_index:] = array('I', [offset + delta for offset in self.ends[shift_index:]])
+        self.shift_index, self.shift_delta = 0, 0
+
+    def reader(self, position=0):
+        return TokenArrayReader(self, position)
+
+    def __len__(self):
+        return len(self.types)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            self.apply_shift()
+            result = TokenArray(self.source, self.line_index)
+            result.types = self.types[index]
+            result.starts = self.starts[index]
+            result.ends = self.ends[index]
+            # The slice gets its own value table, appending to it must not
+            # change this array
+            values, value_number = self.values, result.value_number
+            result.value_references = array('i', [reference if reference == -1 else value_number(values[reference])
+                                                  for reference in self.value_references[index]])
+            return result
+        if index < 0:
+            index += len(self.types)
+        if not 0 <= index < len(self.types):
+            raise IndexError('token index out of range')
+        return TokenView(self, index)
+
+    def __iter__(self):
+        for index in range(len(self.types)):
+            yield TokenView(self, index)
@@ -0,0 +1,137 @@
+# -*- encoding: utf-8 -*-
+"""
+A persistent token cache.
+
+The tokens of a source are stored as a TokenArray file in a cache directory.
+The file name is a hash of the lexer version and the source contents, so
+unchanged sources are not lexed again, whatever file they come from. Files
+are written to a temporary name and renamed into place, several processes
+can therefore share one cache directory. If the files in the directory grow
+larger than max_size, the least recently used files are removed. The
+directory is not scanned on every store: the cache adds the sizes of the
+files it writes to the size found by the last scan, and scans again when
+this estimate exceeds max_size or after scan_interval stores. The latter
+picks up the files that other processes wrote.
+"""
+import hashlib
+import os
+import tempfile
+import time
+from c_lexer import CLexer, LexerVersion
+from character_input import StringCharacterInput
+from object_stream import ObjectStream
+from token_array import TokenArray
+
+
+__author__ = 'Christian Mönch'
+
+
+CacheFileSuffix = '.tokens'
+TemporaryFilePrefix = '.tmp-'
+
+
+class TokenCache(object):
+
+    def __init__(self, directory, max_size=256 * 1024 * 1024, stale_temporary_age=3600, scan_interval=256):
+        self.directory = directory
+        self.max_size = max_size
+        self.stale_temporary_age = stale_temporary_age
+        self.scan_interval = scan_interval
+        # The size of the cache files, None until the directory was scanned
+        self.estimated_size = None
+        self.stores_since_scan = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, source):
+        content_hash = hashlib.sha256(LexerVersion.encode('ascii') + b'\0')
+        content_hash.update(source.encode('utf-8', 'surrogatepass'))
+        return content_hash.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + CacheFileSuffix)
+
+    def lex(self, source, input_name):
+        character_input = StringCharacterInput(source, input_name)
+        lexer = CLexer(ObjectStream(character_input), source=source)
+        return TokenArray.from_lexer(lexer, source, character_input.line_index)
+
+    def tokens_for(self, source, input_name='<memory string>'):
+        key = self.key(source)
+        tokens = self.load(key, source, input_name)
+        if tokens is None:
+            tokens = self.lex(source, input_name)
+            self.store(key, tokens)
+        return tokens
+
+    def load(self, key, source, input_name):
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as cache_file:
+                data = cache_file.read()
+        except (IOError, OSError):
+            return None
+        try:
+            tokens = TokenArray.from_bytes(data, source, input_name=input_name)
+        except (ValueError, UnicodeDecodeError):
+            self.remove(path)
+            return None
+        # Mark as recently used
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return tokens
+
+    def store(self, key, tokens):
+        data = tokens.to_bytes()
+        handle, temporary_path = tempfile.mkstemp(prefix=TemporaryFilePrefix, dir=self.directory)
+        try:
+            with os.fdopen(handle, 'wb') as cache_file:
+                cache_file.write(data)
+            os.replace(temporary_path, self.path(key))
+        except BaseException:
+            self.remove(temporary_path)
+            raise
+        self.stores_since_scan += 1
+        if self.estimated_size is not None:
+            self.estimated_size += len(data)
+        if self.estimated_size is None or self.estimated_size > self.max_size or \
+                self.stores_since_scan >= self.scan_interval:
+            self.evict()
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def evict(self):
+        """
+        Scan the directory, remove stale temporary files and the least
+        recently used cache files until the cache fits into max_size.
+        """
+        entries = []
+        total_size = 0
+        now = time.time()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                status = os.stat(path)
+            except OSError:
+                # Removed by another process
+                continue
+            if name.startswith(TemporaryFilePrefix):
+                # Left behind by a writer that died
+                if now - status.st_mtime > self.stale_temporary_age:
+                    self.remove(path)
+            elif name.endswith(CacheFileSuffix):
+                entries.append((status.st_mtime, status.st_size, path))
+                total_size += status.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total_size <= self.max_size:
+                break
+            self.remove(path)
+            total_size -= size
+        self.estimated_size = total_size
+        self.stores_since_scan = 0
@@ -0,0 +1,56 @@
+# -*- encoding: utf-8 -*-
+"""
+Generator stages for token pipelines.
+
+Every stage takes an iterable of tokens and returns an iterator of tokens,
+so stages compose by nesting, e.g.
+
+    for token in drop_comments(drop_whitespace(CLexer(input_stream))):
+        ...
+
+IteratorLexer turns a pipeline back into an object with get_next_token(),
+which is what TokenStream and CParser expect.
+"""
+from c_lexer import TokenEnum
+
+
+__author__ = 'Christian Mönch'
+
+
+def drop_token_types(tokens, token_types):
+    token_types = frozenset(token_types)
+    for token in tokens:
+        if token.type not in token_types:
+            yield token
+
+
+def drop_whitespace(tokens):
+    whitespace = TokenEnum.WHITESPACE
+    for token in tokens:
+        if token.type is not whitespace:
+            yield token
+
+
+def drop_comments(tokens):
+    comment = TokenEnum.COMMENT
+    for token in tokens:
+        if token.type is not comment:
+            yield token
+
+
+def drop_trivia(tokens):
+    return drop_token_types(tokens, (TokenEnum.WHITESPACE, TokenEnum.COMMENT))
+
+
+class IteratorLexer(object):
+    """
+    Provides get_next_token() on top of an iterable of tokens.
+    """
+    def __init__(self, tokens):
+        self.tokens = iter(tokens)
+
+    def __iter__(self):
+        return self.tokens
+
+    def get_next_token(self):
+        return next(self.tokens, None)
@@ -2,10 +2,20 @@
 __author__ = 'Christian Mönch'
 
 
+from collections import deque
+
+
 class TokenStream(object):
-    def __init__(self, lexer):
+    """
+    Provides look ahead and push back on top of a lexer. The queue holds the
+    current token followed by the tokens that were looked at in advance. If
+    max_look_ahead is given, the queue never holds more than
+    max_look_ahead + 1 tokens.
+    """
+    def __init__(self, lexer, max_look_ahead=None):
         self.lexer = lexer
-        self.token_queue = []
+        self.token_queue = deque()
+        self.max_look_ahead = max_look_ahead
 
     def get_current_token(self):
         if len(self.token_queue) == 0:
@@ -14,7 +24,7 @@ class TokenStream(object):
 
     def get_next_token(self):
         if self.token_queue:
-            del self.token_queue[0]
+            self.token_queue.popleft()
         if len(self.token_queue) == 0:
             token = self.lexer.get_next_token()
             if token is None:
@@ -25,6 +35,8 @@ class TokenStream(object):
             return self.token_queue[0]
 
     def look_ahead(self, count):
+        if self.max_look_ahead is not None and count > self.max_look_ahead:
+            raise Exception('look ahead of %d exceeds the maximum of %d' % (count, self.max_look_ahead))
         while len(self.token_queue) < count + 1:
             token = self.lexer.get_next_token()
             if token is None:
@@ -33,4 +45,6 @@ class TokenStream(object):
         return self.token_queue[count]
 
     def push_token(self, token):
-        self.token_queue.insert(0, token)
+        if self.max_look_ahead is not None and len(self.token_queue) > self.max_look_ahead:
+            raise Exception('push back exceeds the maximum look ahead of %d' % self.max_look_ahead)
+        self.token_queue.appendleft(token)